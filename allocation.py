@@ -0,0 +1,400 @@
+# allocation.py
+"""
+Capacity-constrained export allocation.
+
+Routing picks the nearest open port for every (product, destination) lane. Here the
+lane's volume is instead spread over all its candidate ports (the successful route
+options) as a minimum-cost flow with port throughput limits:
+
+    minimize    sum  cost[a] * x[a]  +  penalty * sum u[k]
+    subject to  sum over arcs a of demand k  x[a] + u[k] = demand_kg[k]
+                sum over arcs a at port p    x[a]        <= PORT_CAPACITY_KG[p]
+                x, u >= 0
+
+where an arc a is one (product, port, destination) option, cost is kg CO2e (or km) per
+kg shipped, and u is the volume that cannot be shipped at all. With inland legs
+(INLAND_PORT_CHOICE, inland.py) a product with production regions has one demand per
+(region, destination) instead, holding the region's PRODUCT_REGIONS share, and its arcs
+add the road or rail leg from the region to the port. The penalty is above
+every arc cost, so volume is only left unshipped when no port has room for it.
+
+The LP is solved with HiGHS (scipy.optimize.linprog). An Allocator solves its first
+problem whole and warm-starts later ones by column generation: a restricted problem
+over the arcs the previous solution used plus the cheapest arc of every lane, whose
+duals price every other arc, growing by the most negative arc of each lane until no
+arc has a negative reduced cost. A scenario that differs from the last one by a closure
+starts from its neighbour's flows and needs a few solves of a fraction of the arcs.
+Allocators are never shared between callers: where optima tie, the flows returned
+depend on the warm start, so each run (a scenario and its baseline, one sweep) uses its
+own and gets the same answer whatever else the process is running.
+
+    python allocation.py --scenario "TOTAL PORT BLACKOUT" --out flows.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+
+from config import (
+    CO2_FACTORS, PORT_CAPACITY_KG, ALLOCATION_OBJECTIVE, SCENARIO_RESTRICTIONS, PRODUCT_REGIONS, INLAND_PORT_CHOICE
+)
+from emissions import DEFAULT_CO2_FACTOR, build_emissions_frame
+from inland import inland_legs
+from lane_results import GeometryBuffer, LaneRecord
+import perf
+
+FLOW_COLUMNS = ["product", "origin", "destination", "distance_km", "volume_kg"]
+UNSHIPPED_COLUMNS = ["product", "destination", "nearest_origin", "demand_kg", "unshipped_kg"]
+INLAND_COLUMNS = ["product", "inland_co2_kg"]
+
+# Column generation stops adding arcs once no reduced cost is below -_TOLERANCE * penalty
+_TOLERANCE = 1e-9
+_MAX_ROUNDS = 50
+
+
+# --- PROBLEM ---
+def _region_legs(product, lanes, inland):
+    """
+    [(region, share, {port: (inland km, inland kg CO2e per tonne)})] of a product's
+    demands: one per production region with inland legs, else one loaded at the port.
+    """
+    shares = PRODUCT_REGIONS.get(product) if inland else None
+    if not shares:
+        return [(None, 1.0, None)]
+    ports = list(dict.fromkeys(o["origin_name"] for lane in lanes for o in lane["route_options"]))
+    regions = list(shares)
+    km, co2, _ = inland_legs(regions, ports)
+    total = sum(shares.values())
+    return [
+        (region, shares[region] / total, {port: (km[r, p], co2[r, p]) for p, port in enumerate(ports)})
+        for r, region in enumerate(regions)
+    ]
+
+
+def build_problem(routes_by_product, capacities=PORT_CAPACITY_KG, objective=ALLOCATION_OBJECTIVE,
+                  inland=INLAND_PORT_CHOICE):
+    """
+    The allocation LP of one scenario as arrays. `routes_by_product` maps product ->
+    LaneRecords (calculate_routes_batch output); every lane with volume is a demand, or
+    one per production region of its product with `inland`.
+    """
+    if objective not in ("co2", "distance"):
+        raise ValueError(f"Unknown objective: {objective}")
+
+    demands, nearest, demand_kg = [], [], []
+    arc_demand, arc_port, arc_km, arc_factor, arc_inland_km, arc_inland_co2 = [], [], [], [], [], []
+    ports = {}
+    for product, lanes in routes_by_product.items():
+        factor = CO2_FACTORS.get(product, DEFAULT_CO2_FACTOR)
+        lanes = [lane for lane in lanes if lane.get("selected") and lane.get("volume_kg", 0) > 0]
+        legs = _region_legs(product, lanes, inland)
+        for lane in lanes:
+            for region, share, inland_by_port in legs:
+                k = len(demands)
+                demands.append((product, lane["dest_name"]) if region is None else (product, lane["dest_name"], region))
+                nearest.append(lane["origin_name"])
+                demand_kg.append(lane["volume_kg"] * share)
+                for option in lane["route_options"]:
+                    if option["success"]:
+                        leg_km, leg_co2 = inland_by_port[option["origin_name"]] if region is not None else (0.0, 0.0)
+                        arc_demand.append(k)
+                        arc_port.append(ports.setdefault(option["origin_name"], len(ports)))
+                        arc_km.append(option["distance_km"])
+                        arc_factor.append(factor)
+                        arc_inland_km.append(leg_km)
+                        arc_inland_co2.append(leg_co2)
+
+    arc_km = np.array(arc_km, dtype=float)
+    arc_inland_km = np.array(arc_inland_km, dtype=float)
+    arc_inland_co2 = np.array(arc_inland_co2, dtype=float)
+    # kg CO2e per kg shipped: km * (kg CO2e per tonne-km) / 1000
+    if objective == "co2":
+        cost = (arc_km * np.array(arc_factor, dtype=float) + arc_inland_co2) / 1000
+    else:
+        cost = arc_km + arc_inland_km
+    port_names = list(ports)
+    return {
+        "objective": objective,
+        "demands": demands,
+        "nearest": nearest,
+        "demand_kg": np.array(demand_kg, dtype=float),
+        "ports": port_names,
+        "capacity_kg": np.array([capacities.get(p, np.inf) if capacities else np.inf for p in port_names]),
+        "arc_demand": np.array(arc_demand, dtype=np.intp),
+        "arc_port": np.array(arc_port, dtype=np.intp),
+        "arc_km": arc_km,
+        "arc_inland_co2": arc_inland_co2,
+        "cost": cost
+    }
+
+
+def _arc_keys(problem, arcs):
+    demands, ports = problem["demands"], problem["ports"]
+    return {
+        (*demands[k], ports[p])
+        for k, p in zip(problem["arc_demand"][arcs], problem["arc_port"][arcs])
+    }
+
+
+def _cheapest_arcs(problem):
+    """Boolean mask of the lowest-cost arc of every demand."""
+    mask = np.zeros(len(problem["cost"]), dtype=bool)
+    if len(mask):
+        order = np.lexsort((problem["cost"], problem["arc_demand"]))
+        first = np.r_[True, problem["arc_demand"][order][1:] != problem["arc_demand"][order][:-1]]
+        mask[order[first]] = True
+    return mask
+
+
+# --- SOLVER ---
+def _solve_restricted(problem, columns, penalty, scale):
+    """HiGHS on the arcs in `columns` plus one unshipped slack per demand: (x, u, demand duals, port duals)."""
+    arcs = np.flatnonzero(columns)
+    n, demands = len(arcs), len(problem["demand_kg"])
+    capped = np.flatnonzero(np.isfinite(problem["capacity_kg"]))
+    port_row = np.full(len(problem["ports"]), -1)
+    port_row[capped] = np.arange(len(capped))
+
+    c = np.concatenate([problem["cost"][arcs], np.full(demands, penalty)])
+    a_eq = sparse.hstack([
+        sparse.csr_matrix((np.ones(n), (problem["arc_demand"][arcs], np.arange(n))), shape=(demands, n)),
+        sparse.identity(demands, format="csr")
+    ], format="csr")
+
+    rows = port_row[problem["arc_port"][arcs]]
+    on_capped = rows >= 0
+    a_ub = sparse.csr_matrix(
+        (np.ones(on_capped.sum()), (rows[on_capped], np.flatnonzero(on_capped))), shape=(len(capped), n + demands)
+    )
+
+    res = linprog(
+        c, A_ub=a_ub if len(capped) else None, b_ub=problem["capacity_kg"][capped] / scale if len(capped) else None,
+        A_eq=a_eq, b_eq=problem["demand_kg"] / scale, bounds=(0, None), method="highs"
+    )
+    if res.status != 0:
+        raise RuntimeError(f"Allocation LP failed: {res.message}")
+
+    port_duals = np.zeros(len(problem["ports"]))
+    if len(capped):
+        port_duals[capped] = res.ineqlin.marginals
+    return res.x[:n], res.x[n:], res.eqlin.marginals, port_duals
+
+
+class Allocator:
+    """
+    Solves a sequence of allocation problems, each warm-started from the arcs used by
+    the previous solution with the same objective (the first one is solved whole).
+    One caller's sequence, not shared between threads.
+    """
+
+    def __init__(self):
+        self._support = {}
+
+    def solve(self, problem):
+        """
+        Optimal flows of `problem` (see build_problem): {"flow_kg": per arc, "unshipped_kg":
+        per demand, "rounds": restricted solves, "columns": arcs they used}.
+        """
+        cost = problem["cost"]
+        demand_kg = problem["demand_kg"]
+        if not len(demand_kg):
+            return {"flow_kg": np.zeros(len(cost)), "unshipped_kg": np.zeros(0), "rounds": 0, "columns": 0}
+
+        # Solve in units of the largest demand and price unshipped volume above every arc
+        scale = float(demand_kg.max())
+        penalty = 10 * float(cost.max()) if len(cost) else 1.0
+        tolerance = _TOLERANCE * penalty
+
+        previous = self._support.get(problem["objective"])
+        if previous is None:
+            columns = np.ones(len(cost), dtype=bool)
+        else:
+            columns = _cheapest_arcs(problem)
+            keys = zip(
+                (problem["demands"][k] for k in problem["arc_demand"]),
+                (problem["ports"][p] for p in problem["arc_port"])
+            )
+            columns |= np.fromiter(((*d, p) in previous for d, p in keys), dtype=bool, count=len(cost))
+
+        for rounds in range(1, _MAX_ROUNDS + 1):
+            x, u, demand_duals, port_duals = _solve_restricted(problem, columns, penalty, scale)
+            reduced = cost - demand_duals[problem["arc_demand"]] - port_duals[problem["arc_port"]]
+            # Partial pricing: only the most negative arc of each demand enters
+            candidates = np.flatnonzero(~columns & (reduced < -tolerance))
+            if not len(candidates):
+                break
+            order = candidates[np.lexsort((reduced[candidates], problem["arc_demand"][candidates]))]
+            first = np.r_[True, problem["arc_demand"][order][1:] != problem["arc_demand"][order][:-1]]
+            columns[order[first]] = True
+        else:
+            raise RuntimeError(f"Allocation did not converge in {_MAX_ROUNDS} rounds")
+
+        flow_kg = np.zeros(len(cost))
+        flow_kg[columns] = x * scale
+        used = flow_kg > demand_kg[problem["arc_demand"]] * 1e-9
+        self._support[problem["objective"]] = _arc_keys(problem, used)
+
+        perf.count("allocation_solves")
+        perf.count("allocation_rounds", rounds)
+        return {
+            "flow_kg": np.where(used, flow_kg, 0.0),
+            "unshipped_kg": np.where(u * scale > demand_kg * 1e-9, u * scale, 0.0),
+            "rounds": rounds,
+            "columns": int(columns.sum())
+        }
+
+
+# --- RESULTS ---
+def allocate_routes(routes_by_product, capacities=PORT_CAPACITY_KG, objective=ALLOCATION_OBJECTIVE, allocator=None,
+                    route_lookup=None, inland=INLAND_PORT_CHOICE):
+    """
+    Allocate one scenario's lanes (product -> LaneRecords) over its open ports, with the
+    inland legs from the production regions in the cost when `inland`.
+
+    Returns {"routes": the shipped lanes (product -> LaneRecords, one per product, port
+    and destination, with the allocated volume), "frame": their emissions frame, "flows":
+    the same as a table, "unshipped": volume no port could take, per lane, "inland": the
+    inland legs' CO2 per product, "ports": load against capacity, "arcs", "rounds",
+    "columns"}. `route_lookup(origin_coords,
+    dest_coords)` gives the geometry of lanes moved off their nearest port; without it
+    they are drawn with none. Pass the caller's `allocator` to warm-start from its last
+    solve; by default the problem is solved whole.
+    """
+    problem = build_problem(routes_by_product, capacities, objective, inland)
+    solution = (allocator or Allocator()).solve(problem)
+
+    used = np.flatnonzero(solution["flow_kg"])
+    demands = problem["demands"]
+    flows = pd.DataFrame({
+        "product": [demands[k][0] for k in problem["arc_demand"][used]],
+        "origin": [problem["ports"][p] for p in problem["arc_port"][used]],
+        "destination": [demands[k][1] for k in problem["arc_demand"][used]],
+        "distance_km": problem["arc_km"][used],
+        "volume_kg": solution["flow_kg"][used]
+    }, columns=FLOW_COLUMNS)
+    # Regions of one lane shipping through the same port are one flow
+    split = any(len(demand) > 2 for demand in demands)
+    if split:
+        flows = flows.groupby(["product", "origin", "destination"], sort=False, as_index=False).agg(
+            distance_km=("distance_km", "first"), volume_kg=("volume_kg", "sum")
+        )[FLOW_COLUMNS]
+
+    inland_co2 = pd.DataFrame({
+        "product": [demands[k][0] for k in problem["arc_demand"][used]],
+        "inland_co2_kg": solution["flow_kg"][used] / 1000 * problem["arc_inland_co2"][used]
+    }, columns=INLAND_COLUMNS)
+    inland_co2 = inland_co2[inland_co2["inland_co2_kg"] > 0].groupby(
+        "product", sort=False, as_index=False
+    )["inland_co2_kg"].sum()
+
+    routes = shipped_lanes(routes_by_product, flows, route_lookup)
+
+    short = np.flatnonzero(solution["unshipped_kg"])
+    unshipped = pd.DataFrame({
+        "product": [demands[k][0] for k in short],
+        "destination": [demands[k][1] for k in short],
+        "nearest_origin": [problem["nearest"][k] for k in short],
+        "demand_kg": problem["demand_kg"][short],
+        "unshipped_kg": solution["unshipped_kg"][short]
+    }, columns=UNSHIPPED_COLUMNS)
+    if split:
+        lane_kg = {}
+        for demand, kg in zip(demands, problem["demand_kg"]):
+            lane_kg[demand[:2]] = lane_kg.get(demand[:2], 0.0) + kg
+        unshipped = unshipped.groupby(["product", "destination"], sort=False, as_index=False).agg(
+            nearest_origin=("nearest_origin", "first"), unshipped_kg=("unshipped_kg", "sum")
+        )
+        unshipped["demand_kg"] = [lane_kg[lane] for lane in zip(unshipped["product"], unshipped["destination"])]
+        unshipped = unshipped[UNSHIPPED_COLUMNS]
+
+    load = np.bincount(problem["arc_port"], weights=solution["flow_kg"], minlength=len(problem["ports"]))
+    ports = pd.DataFrame(
+        {"load_kg": load, "capacity_kg": problem["capacity_kg"]}, index=pd.Index(problem["ports"], name="port")
+    )
+
+    return {
+        "routes": routes,
+        "frame": build_emissions_frame(routes),
+        "flows": flows,
+        "unshipped": unshipped,
+        "inland": inland_co2,
+        "ports": ports,
+        "arcs": len(problem["cost"]),
+        "rounds": solution["rounds"],
+        "columns": solution["columns"]
+    }
+
+
+def shipped_lanes(routes_by_product, flows, route_lookup=None):
+    """
+    One LaneRecord per flow, carrying its allocated volume. A flow from the lane's nearest
+    port shares the lane's stored route; one from another port takes its distance from the
+    route option and its geometry from `route_lookup`.
+    """
+    lanes = {(lane["product"], lane["dest_name"]): lane for by_product in routes_by_product.values() for lane in by_product}
+    routes = {product: [] for product in routes_by_product}
+    buffers = {}
+    # add_route() dedupes by object identity, so looked-up routes must outlive the buffer's assembly
+    found = []
+    for row in flows.itertuples(index=False):
+        lane = lanes[(row.product, row.destination)]
+        if row.origin == lane["origin_name"]:
+            buffer, ranges = lane.geometry
+            routes[row.product].append(LaneRecord(
+                lane["product"], lane["origin_name"], lane["origin_coords"], lane["dest_name"], lane["dest_coords"],
+                lane, row.volume_kg, lane["route_options"], buffer, ranges
+            ))
+            continue
+
+        option = next(o for o in lane["route_options"] if o["origin_name"] == row.origin)
+        route = {**option, "passages": []}
+        looked_up = route_lookup(option["origin_coords"], lane["dest_coords"]) if route_lookup is not None else None
+        if looked_up is not None and looked_up["success"]:
+            found.append(looked_up)
+            route.update(route_coords=looked_up["route_coords"], route_lods=looked_up.get("route_lods"),
+                         passages=looked_up.get("passages", []))
+        buffer = buffers.setdefault(row.product, GeometryBuffer())
+        routes[row.product].append(LaneRecord(
+            lane["product"], option["origin_name"], option["origin_coords"], lane["dest_name"], lane["dest_coords"],
+            route, row.volume_kg, lane["route_options"], buffer
+        ))
+
+    for buffer in buffers.values():
+        buffer.freeze()
+    return routes
+
+
+def main(argv=None):
+    from scenarios import run_scenario
+
+    parser = argparse.ArgumentParser(description="Allocate a scenario's exports over ports with throughput limits.")
+    parser.add_argument("--scenario", choices=list(SCENARIO_RESTRICTIONS), default=None,
+                        help="built-in scenario; defaults to the baseline")
+    parser.add_argument("--objective", choices=["co2", "distance"], default=ALLOCATION_OBJECTIVE)
+    parser.add_argument("--out", default=None, help="per-flow table (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    result = run_scenario(args.scenario, capacities=None)
+    allocation = allocate_routes(result["routes"]["current"], objective=args.objective)
+
+    ports = allocation["ports"]
+    print((ports.assign(utilization_pct=ports["load_kg"] / ports["capacity_kg"] * 100)
+           .assign(load_kg=ports["load_kg"] / 1e9, capacity_kg=ports["capacity_kg"] / 1e9)
+           .round(1).to_string()))
+    unshipped = allocation["unshipped"]
+    print(f"{result['scenario']}: {allocation['flows']['volume_kg'].sum() / 1e9:,.1f} B kg shipped, "
+          f"{unshipped['unshipped_kg'].sum() / 1e9:,.1f} B kg unshipped "
+          f"({allocation['rounds']} LP rounds over {allocation['columns']} of {allocation['arcs']} arcs)")
+    if len(unshipped):
+        print((unshipped.groupby("product")["unshipped_kg"].sum() / 1e9).round(2).to_string())
+    if args.out:
+        if args.out.lower().endswith(".parquet"):
+            allocation["flows"].to_parquet(args.out, index=False)
+        else:
+            allocation["flows"].to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
-from config import PRODUCTS, ORIGINS, PRODUCT_COLORS
-from route_calculator import calculate_routes_for_product, calculate_total_emissions
+import perf
+from config import PRODUCTS, PRODUCT_COLORS, UNCERTAINTY_PERCENTILES, UNCERTAINTY_SAMPLES, INLAND_PORT_CHOICE
+from scenarios import select_products, routing_failures
+from route_calculator import ERROR_KINDS
+from scenario_cache import get_scenario_cache, scenario_result, start_prewarm
+from figure_cache import cached_figure, static_figure, get_figure_cache
+from export import export_bytes
+from uncertainty import simulate_scenario
+from emissions import format_emissions_table
 from visualizer import (
     create_route_map,
     create_sankey_diagram,
@@ -12,6 +19,9 @@ from visualizer import (
 # --- PAGE CONFIGURATION ---
 st.set_page_config(layout="wide", page_title="BRAZIL STRATEGIC TRADE CENTER", initial_sidebar_state="expanded")
 
+# Fill the shared scenario cache once per server process, in the background
+start_prewarm()
+
 # --- CLEAN CSS ---
 st.markdown("""
 <style>
@@ -60,123 +70,103 @@ scenario = st.sidebar.radio(
     index=0
 )
 
-# --- LOGIC ENGINE ---
-baseline_restrictions = ['northwest', 'northeast', 'bering']
-baseline_origins = ORIGINS.copy()
-
-active_restrictions = ['northwest', 'northeast', 'bering']
-active_origins = ORIGINS.copy()
+# Ports chosen by road/rail leg from the production regions plus sea leg (inland.py)
+inland_legs = st.sidebar.checkbox(
+    "INLAND LEGS IN PORT CHOICE", value=INLAND_PORT_CHOICE,
+    help="Choose each region's export port by inland plus sea CO2, within port capacity"
+)
 
-alert_html = '<div class="status-box status-normal">SYSTEM NORMAL: OPTIMAL ROUTING</div>'
+# --- LOGIC ENGINE ---
+# Restrictions and port closures per scenario live in config; see scenarios.py
+alert_level, alert_text = "normal", "SYSTEM NORMAL: OPTIMAL ROUTING"
 
 if scenario == "THE GREAT CANAL COLLAPSE":
-    active_restrictions += ['suez', 'panama', 'babelmandeb']
-    alert_html = '<div class="status-box status-danger">GLOBAL CRISIS: SUEZ & PANAMA CLOSED. ROUTES FORCED AROUND CAPES.</div>'
+    alert_level, alert_text = "danger", "GLOBAL CRISIS: SUEZ & PANAMA CLOSED. ROUTES FORCED AROUND CAPES."
 
 elif scenario == "ATLANTIC BLOCKADE (GIBRALTAR)":
-    active_restrictions += ['gibraltar']
-    alert_html = '<div class="status-box status-warn">EUROPEAN CRISIS: GIBRALTAR STRAIT CLOSED. NORTHERN ROUTES DIVERTED.</div>'
+    alert_level, alert_text = "warn", "EUROPEAN CRISIS: GIBRALTAR STRAIT CLOSED. NORTHERN ROUTES DIVERTED."
 
 elif scenario == "TOTAL PORT BLACKOUT":
-    if "Santos Port (São Paulo)" in active_origins: del active_origins["Santos Port (São Paulo)"]
-    if "Tubarão Port (Vitoria)" in active_origins: del active_origins["Tubarão Port (Vitoria)"]
-    alert_html = '<div class="status-box status-danger">CATASTROPHIC FAILURE: SANTOS & TUBARÃO OFFLINE. EXPORT CAPACITY CRITICAL.</div>'
+    alert_level, alert_text = "danger", "CATASTROPHIC FAILURE: SANTOS & TUBARÃO OFFLINE. EXPORT CAPACITY CRITICAL."
 
-st.sidebar.markdown("---")
-product_options = ["All Commodities"] + PRODUCTS
-selected_product_view = st.sidebar.selectbox("PRODUCT FILTER", options=product_options)
+# --- DATA FLOW ---
+# scenario (radio) -> scenario result: routing + emissions for every product, once per
+#   scenario per process (full rerun)
+# product filter (selectbox) -> product view: a slice of the scenario result -> metrics,
+#   map and analytics (fragment rerun: nothing above it runs again)
+filter_slot = st.sidebar.container()
+filter_slot.markdown("---")
+
+# Stage timings for this rerun, shown in the PERFORMANCE panel at the bottom of the sidebar
+perf_trace = perf.start_trace(scenario)
 
 # --- MAIN PAGE ---
 st.title("BRAZIL LOGISTICS IMPACT CENTER")
-st.markdown(alert_html, unsafe_allow_html=True)
+# Filled once the scenario is routed, so it can report routing failures too
+status_slot = st.empty()
 
 # --- IMPACT CALCULATION ---
-with st.spinner("CALCULATING STRATEGIC IMPACT..."):
-    products_to_process = PRODUCTS if selected_product_view == "All Commodities" else [selected_product_view]
-
-    current_routes = []
-    current_emissions = []
-    curr_co2 = 0
-    curr_kg = 0
-
-    # Baseline vars
-    base_co2 = 0
-    base_kg = 0
-
-    for prod in products_to_process:
-        # Run Current Scenario
-        r_curr = calculate_routes_for_product(prod, active_restrictions, active_origins)
-        e_curr, _, c_co2, c_kg = calculate_total_emissions(r_curr, prod)
-
-        # Run Baseline (Normal) Scenario
-        r_base = calculate_routes_for_product(prod, baseline_restrictions, baseline_origins)
-        _, _, b_co2, b_kg = calculate_total_emissions(r_base, prod)
-
-        if selected_product_view == "All Commodities":
-            for r in r_curr: r['product_group'] = prod
-            for e in e_curr: e['product_group'] = prod
-
-        current_routes.extend(r_curr)
-        current_emissions.extend(e_curr)
-        curr_co2 += c_co2
-        curr_kg += c_kg
-        base_co2 += b_co2
-        base_kg += b_kg
-
-    # --- INTELLIGENT DELTA CALCULATION ---
-    # 1. Efficiency Delta (Positive is BAD)
-    curr_efficiency = (curr_co2 / curr_kg) if curr_kg > 0 else 0
-    base_efficiency = (base_co2 / base_kg) if base_kg > 0 else 0
-    eff_diff = curr_efficiency - base_efficiency
-    eff_percent = (eff_diff / base_efficiency * 100) if base_efficiency > 0 else 0
-
-    # 2. Volume Delta (Negative is BAD)
-    vol_diff = curr_kg - base_kg
-    vol_percent = (vol_diff / base_kg * 100) if base_kg > 0 else 0
-
-    # 3. CO2 Total Delta
-    co2_diff = curr_co2 - base_co2
-    co2_percent = (co2_diff / base_co2 * 100) if base_co2 > 0 else 0
-
-# --- METRICS ROW ---
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.metric(
-        "TOTAL CO2 EMISSIONS",
-        f"{curr_co2 / 1_000_000:,.1f} M t",
-        f"{co2_percent:+.1f}% Impact",
-        delta_color="inverse"
+with st.spinner("CALCULATING STRATEGIC IMPACT..."), perf.span("impact"):
+    # The scenario and the baseline for every product, routed in one pass; shared lanes are computed once
+    routing_stats = {}
+    result = scenario_result(scenario, stats=routing_stats, cache=get_scenario_cache(), inland=inland_legs)
+
+# --- ROUTING HEALTH ---
+# Failed origin/destination pairs by kind (route_calculator.ERROR_KINDS); lanes use their next best port.
+# Timeouts and errors are retried on a later rerun, past their negative-cache TTL
+failures = routing_failures(result)
+if failures:
+    alert_text += "<br>ROUTING DEGRADED: " + " · ".join(
+        f"{failures[kind]} {kind.replace('_', ' ').upper()}" for kind in ERROR_KINDS if failures.get(kind)
     )
-
-with col2:
-    st.metric(
-        "TRADE VOLUME",
-        f"{curr_kg / 1_000_000_000:,.1f} B kg",
-        f"{vol_percent:+.1f}% Volume" if abs(vol_percent) > 0.1 else "Stable",
-        delta_color="normal"
+    if alert_level == "normal":
+        alert_level = "warn"
+status_slot.markdown(f'<div class="status-box status-{alert_level}">{alert_text}</div>', unsafe_allow_html=True)
+
+# --- ROUTING REUSE ---
+# Counts describe this rerun; a warm server usually serves the whole scenario from its caches
+routes_reused = sum(routing_stats.get(k, 0) for k in ("routes_precomputed", "routes_cached", "routes_reused"))
+routes_looked_up = routes_reused + sum(
+    routing_stats.get(k, 0) for k in ("routes_recomputed", "routes_unroutable", "routes_skipped")
+)
+st.sidebar.markdown("---")
+if routes_looked_up:
+    routing_caption = (
+        f"ROUTES REUSED: {routes_reused} · RECOMPUTED: {routing_stats.get('routes_recomputed', 0)}"
+        + (f" · LANES RESELECTED: {routing_stats['lanes_reselected']}" if routing_stats.get('lanes_reselected') else "")
+        + (f" · KNOWN FAILURES: {routing_stats['routes_unroutable']}" if routing_stats.get('routes_unroutable') else "")
+        + (f" · OVER BUDGET: {routing_stats['routes_skipped']}" if routing_stats.get('routes_skipped') else "")
     )
+elif routing_stats.get("scenario_result_hits"):
+    routing_caption = "ROUTES: NONE THIS RERUN · SCENARIO RESULT CACHED"
+else:
+    routing_caption = f"ROUTES: NONE THIS RERUN · {routing_stats.get('scenario_cache_hits', 0)} LANE SETS FROM SCENARIO CACHE"
+st.sidebar.caption(routing_caption)
+cache_stats = get_scenario_cache().stats()
+st.sidebar.caption(
+    f"SCENARIO CACHE: {cache_stats['hits']} HITS · {cache_stats['misses']} MISSES · "
+    f"{cache_stats['entries']} ENTRIES · {cache_stats['approx_bytes'] / 1_048_576:,.1f} MB · PREWARM {cache_stats['prewarm'].upper()}"
+)
 
-with col3:
-    st.metric(
-        "ACTIVE VECTORS",
-        f"{len([r for r in current_routes if r.get('volume_kg', 0) > 0])}",
-        delta="\xa0",  # Use a non-breaking space character
-        delta_color="off"
+# --- EXPORT ---
+# Files are built only when a button is clicked, for the whole scenario whatever the product filter
+export_name = scenario.lower().replace(" ", "_").replace("(", "").replace(")", "")
+with st.sidebar.expander("EXPORT"):
+    st.download_button(
+        "LANE TABLE (PARQUET)", data=lambda: export_bytes(result, "lanes"),
+        file_name=f"{export_name}_lanes.parquet", mime="application/vnd.apache.parquet", on_click="ignore"
     )
-
-with col4:
-    st.metric(
-        "LOGISTICS EFFICIENCY",
-        f"{curr_efficiency:.4f} kg/kg",
-        f"{eff_percent:+.1f}% Intensity" if abs(eff_percent) > 0.1 else "Stable",
-        delta_color="inverse"
+    st.download_button(
+        "ROUTES (GEOJSONL)", data=lambda: export_bytes(result, "routes"),
+        file_name=f"{export_name}_routes.geojsonl", mime="application/geo+json-seq", on_click="ignore"
+    )
+    st.download_button(
+        "ROUTES (GEOPARQUET)", data=lambda: export_bytes(result, "routes", "geoparquet"),
+        file_name=f"{export_name}_routes.parquet", mime="application/vnd.apache.parquet", on_click="ignore"
     )
 
-# --- MAP ---
-st.markdown("### 🗺️ GLOBAL NETWORK MAP")
-fig_map = create_route_map(current_routes, "Dark", False, False)
-st.plotly_chart(fig_map, use_container_width=True, key=f"map_{scenario}")
+# Filled by render_product_view below; the methodology section between them never changes
+view_slot = st.container()
 
 # app.py
 from config import EMISSIONS_DATA_SOURCE, SOURCE_NAME
@@ -194,8 +184,9 @@ with col_method_1:
     st.caption("Comparison of CO₂ emissions per ton-km based on vessel type used for each commodity.")
 
     # CALL THE NEW VISUALIZER FUNCTION
-    fig_factors = create_emissions_factor_chart()
-    st.plotly_chart(fig_factors, use_container_width=True)
+    fig_factors = static_figure(create_emissions_factor_chart)
+    with perf.span("render.factor_chart"):
+        st.plotly_chart(fig_factors, use_container_width=True)
 
 with col_method_2:
     st.info("ℹ️ **SOURCE DATA**")
@@ -209,29 +200,8 @@ with col_method_2:
 
     *Note: Factors are specific to the vessel class typically used for these commodities (e.g., Capesize for Ore vs. Reefer for Beef).*
     """)
-# --- ANALYTICS ---
-st.markdown("### 📊 STRATEGIC ANALYSIS")
-col_left, col_right = st.columns(2)
-valid_data = [d for d in current_emissions if d.get('Export Volume (kg)', 0) > 0]
-
-with col_left:
-    tab_flow, tab_matrix = st.tabs(["TRADE FLOW", "CARBON MATRIX"])
-    with tab_flow:
-        fig_sankey = create_sankey_diagram(valid_data)
-        st.plotly_chart(fig_sankey, use_container_width=True)
-    with tab_matrix:
-        fig_heat = create_heatmap(valid_data)
-        st.plotly_chart(fig_heat, use_container_width=True)
-
-with col_right:
-    tab_radar, tab_data = st.tabs(["RISK RADAR", "RAW DATA"])
-    with tab_radar:
-        fig_radar = create_bubble_radar(valid_data)
-        st.plotly_chart(fig_radar, use_container_width=True)
-    with tab_data:
-        df_disp = pd.DataFrame(valid_data)[
-            ['Destination', 'Distance (NM)', 'Export Volume (tons)', 'CO₂ Emissions (tons)']]
-        st.dataframe(df_disp, use_container_width=True, height=350)
+
+analytics_slot = st.container()
 
 
 # --- CLEAN CSS ---
@@ -251,4 +221,178 @@ st.markdown("""
 
     /* ... rest of css ... */
 </style>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+
+# --- PRODUCT VIEW ---
+@st.fragment
+def render_product_view(scenario, result, filter_slot, view_slot, analytics_slot):
+    """
+    The product filter and everything that depends on it. Changing the filter reruns
+    only this function, against the scenario result of the last full rerun.
+    """
+    # On a full rerun this joins the page trace; a filter change gets a trace of its own
+    trace = perf.current_trace() or perf.start_trace(f"{scenario} (filter)")
+
+    product_options = ["All Commodities"] + PRODUCTS
+    with filter_slot:
+        selected_product_view = st.selectbox("PRODUCT FILTER", options=product_options)
+        show_bands = st.checkbox("CO2 UNCERTAINTY BANDS", value=True)
+    if trace is not None:
+        trace.label = f"{trace.label} | {selected_product_view}"
+
+    with perf.span("product_view"):
+        products_to_process = PRODUCTS if selected_product_view == "All Commodities" else [selected_product_view]
+        view = select_products(result, products_to_process)
+
+        # Route results are shared with other sessions through the cache; tag copies, never the originals
+        current_routes = []
+        for prod in products_to_process:
+            r_curr = view["shipped"]["current"][prod]
+            if selected_product_view == "All Commodities":
+                r_curr = [{**r, 'product_group': prod} for r in r_curr]
+            current_routes.extend(r_curr)
+
+        current_emissions = format_emissions_table(
+            view["frames"]["current"], group_by_product=selected_product_view == "All Commodities"
+        )
+
+        # --- INTELLIGENT DELTA CALCULATION ---
+        deltas = view["deltas"]
+        curr_co2 = deltas["co2_kg"]["current"]
+        curr_kg = deltas["volume_kg"]["current"]
+        curr_efficiency = deltas["efficiency"]["current"]
+        # Volume no open port had capacity for (allocation.py)
+        unshipped_kg = deltas["unshipped_kg"]["current"]
+        # Road and rail CO2 from the production regions; zero unless they choose the ports
+        inland_co2 = deltas["inland_co2_kg"]
+
+        co2_percent = deltas["co2_kg"]["percent"]        # Positive is BAD
+        vol_percent = deltas["volume_kg"]["percent"]     # Negative is BAD
+        eff_percent = deltas["efficiency"]["percent"]    # Positive is BAD
+
+    # Monte Carlo over emission, load and detour factors; see uncertainty.py
+    bands = None
+    if show_bands:
+        with perf.span("uncertainty"):
+            bands = simulate_scenario(view)
+        band_low, band_high = f"p{min(UNCERTAINTY_PERCENTILES):g}", f"p{max(UNCERTAINTY_PERCENTILES):g}"
+
+    with view_slot:
+        # --- METRICS ROW ---
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric(
+                "TOTAL CO2 EMISSIONS",
+                f"{curr_co2 / 1_000_000_000:,.1f} M t",
+                f"{co2_percent:+.1f}% Impact",
+                delta_color="inverse"
+            )
+            if bands is not None:
+                co2_band = bands["current"]["total"]
+                impact_low, impact_high = (f"{bands['co2_percent'][p]:+.1f}%" for p in (band_low, band_high))
+                # Both scenarios share the factor draws, so without detours the impact barely
+                # moves between samples; a band that rounds to one value says nothing
+                impact = f" · IMPACT {impact_low} TO {impact_high}" if impact_low != impact_high else ""
+                st.caption(
+                    f"{band_low.upper()}–{band_high.upper()}: {co2_band[band_low] / 1_000_000_000:,.1f}–"
+                    f"{co2_band[band_high] / 1_000_000_000:,.1f} M t{impact}"
+                )
+            if inland_co2["current"] or inland_co2["baseline"]:
+                st.caption(
+                    f"+ INLAND LEGS: {inland_co2['current'] / 1_000_000_000:,.2f} M t "
+                    f"({inland_co2['percent']:+.1f}%) · ROAD/RAIL TO PORT"
+                )
+
+        with col2:
+            st.metric(
+                "TRADE VOLUME",
+                f"{curr_kg / 1_000_000_000:,.1f} B kg",
+                f"{vol_percent:+.1f}% Volume" if abs(vol_percent) > 0.1 else "Stable",
+                delta_color="normal"
+            )
+            if unshipped_kg > 0:
+                st.caption(f"UNSHIPPED: {unshipped_kg / 1_000_000_000:,.1f} B kg · PORT CAPACITY REACHED")
+
+        with col3:
+            st.metric(
+                "ACTIVE VECTORS",
+                f"{len([r for r in current_routes if r.get('volume_kg', 0) > 0])}",
+                delta="\xa0",  # Use a non-breaking space character
+                delta_color="off"
+            )
+
+        with col4:
+            st.metric(
+                "LOGISTICS EFFICIENCY",
+                f"{curr_efficiency:.4f} kg/kg",
+                f"{eff_percent:+.1f}% Intensity" if abs(eff_percent) > 0.1 else "Stable",
+                delta_color="inverse"
+            )
+
+        # --- MAP ---
+        st.markdown("### 🗺️ GLOBAL NETWORK MAP")
+        fig_map = cached_figure(create_route_map, current_routes, "Dark", False, False)
+        with perf.span("render.route_map"):
+            st.plotly_chart(fig_map, use_container_width=True, key=f"map_{scenario}")
+
+    with analytics_slot:
+        # --- ANALYTICS ---
+        st.markdown("### 📊 STRATEGIC ANALYSIS")
+        col_left, col_right = st.columns(2)
+        valid_data = [d for d in current_emissions if d.get('Export Volume (kg)', 0) > 0]
+
+        with col_left:
+            tab_flow, tab_matrix = st.tabs(["TRADE FLOW", "CARBON MATRIX"])
+            with tab_flow:
+                fig_sankey = cached_figure(create_sankey_diagram, valid_data)
+                with perf.span("render.sankey"):
+                    st.plotly_chart(fig_sankey, use_container_width=True)
+            with tab_matrix:
+                fig_heat = cached_figure(create_heatmap, valid_data)
+                with perf.span("render.heatmap"):
+                    st.plotly_chart(fig_heat, use_container_width=True)
+
+        with col_right:
+            tab_radar, tab_data, tab_bands = st.tabs(["RISK RADAR", "RAW DATA", "CO2 BANDS"])
+            with tab_radar:
+                fig_radar = cached_figure(create_bubble_radar, valid_data)
+                with perf.span("render.bubble_radar"):
+                    st.plotly_chart(fig_radar, use_container_width=True)
+            with tab_data:
+                df_disp = pd.DataFrame(valid_data)[
+                    ['Destination', 'Distance (NM)', 'Export Volume (tons)', 'CO₂ Emissions (tons)']]
+                st.dataframe(df_disp, use_container_width=True, height=350)
+            with tab_bands:
+                if bands is None:
+                    st.caption("Enable CO2 UNCERTAINTY BANDS in the sidebar.")
+                else:
+                    st.caption(f"CO₂ (M t) per product over {UNCERTAINTY_SAMPLES:,} sampled factor sets.")
+                    band_table = bands["current"]["products"].div(1_000_000_000).round(2)
+                    band_table.columns = [c.upper() if c != "co2_kg" else "POINT" for c in band_table.columns]
+                    st.dataframe(band_table, use_container_width=True)
+
+    # --- PERFORMANCE PANEL ---
+    # Drawn here so that filter changes, which only rerun this fragment, update it too
+    perf.end_trace(trace)
+    if trace is not None:
+        with st.sidebar.expander("PERFORMANCE"):
+            figure_stats = get_figure_cache().stats()
+            st.caption(
+                f"RERUN: {trace.duration_ms:,.0f} ms · FIGURE CACHE: {figure_stats['entries']} "
+                f"({figure_stats['bytes'] / 1_048_576:,.1f} MB JSON)"
+            )
+            stage_rows = [
+                {"STAGE": name, "CALLS": calls, "MS": round(ms, 1)}
+                for name, (calls, ms) in perf.stage_totals(trace).items()
+            ]
+            st.dataframe(pd.DataFrame(stage_rows), hide_index=True)
+            if trace.counters:
+                st.dataframe(
+                    pd.DataFrame([{"COUNTER": k, "VALUE": v} for k, v in sorted(trace.counters.items())]),
+                    hide_index=True
+                )
+
+
+render_product_view(scenario, result, filter_slot, view_slot, analytics_slot)
@@ -0,0 +1,77 @@
+# benchmarks/bench_charts.py
+"""
+Scaling of the analytics chart builders with lane count, against the per-lane
+bubble radar they replaced (one trace per lane, max() recomputed inside the loop).
+
+    python -m benchmarks.bench_charts
+"""
+import time
+import numpy as np
+import plotly.graph_objects as go
+from config import PRODUCTS, PRODUCT_COLORS, ORIGINS, DESTINATIONS
+from visualizer import create_bubble_radar, create_sankey_diagram, create_heatmap
+
+
+def synthetic_chart_data(n_lanes, seed=0):
+    """Emission records shaped like emissions.format_emissions_table output."""
+    rng = np.random.default_rng(seed)
+    origins = list(ORIGINS)
+    destinations = list(DESTINATIONS)
+    volume = rng.lognormal(13, 2, n_lanes)
+    distance = rng.uniform(3000, 14000, n_lanes)
+    return [{
+        "Destination": f"{destinations[i % len(destinations)]} #{i // len(destinations)}",
+        "Origin": origins[rng.integers(len(origins))],
+        "Distance (NM)": distance[i],
+        "Export Volume (kg)": volume[i] * 1000,
+        "Export Volume (tons)": volume[i],
+        "CO₂ Emissions (tons)": distance[i] * 1.852 * volume[i] * 0.003 / 1000,
+        "product_group": PRODUCTS[i % len(PRODUCTS)]
+    } for i in range(n_lanes)]
+
+
+def legacy_bubble_radar(chart_data):
+    fig = go.Figure()
+    for d in chart_data:
+        color = PRODUCT_COLORS.get(d.get('product_group', 'Unknown'), '#3b82f6')
+        fig.add_trace(go.Scatter(
+            x=[d['Distance (NM)']], y=[d['Export Volume (tons)']],
+            mode='markers',
+            marker=dict(size=d['CO₂ Emissions (tons)'] / max(x['CO₂ Emissions (tons)'] for x in chart_data) * 40 + 5,
+                        color=color, opacity=0.7, line=dict(width=0.5, color='white')),
+            name=d['Destination'].split('(')[0],
+            hovertemplate=f"<b>{d['Destination']}</b><br>Vol: {d['Export Volume (tons)']:,.0f}t<br>CO2: {d['CO₂ Emissions (tons)']:,.0f}t<extra></extra>"
+        ))
+    return fig
+
+
+def timed(fn, data, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    builders = [
+        ("bubble (legacy)", legacy_bubble_radar, 1000),
+        ("bubble", create_bubble_radar, None),
+        ("sankey", create_sankey_diagram, None),
+        ("heatmap", create_heatmap, None),
+    ]
+    sizes = [25, 250, 1000, 10000]
+    print(f"{'builder':<18}" + "".join(f"{n:>12,}" for n in sizes) + "   (ms per build)")
+    for label, fn, max_lanes in builders:
+        row = f"{label:<18}"
+        for n in sizes:
+            if max_lanes is not None and n > max_lanes:
+                row += f"{'-':>12}"
+                continue
+            row += f"{timed(fn, synthetic_chart_data(n), repeat=1 if max_lanes else 3) * 1000:>12.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
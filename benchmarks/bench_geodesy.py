@@ -0,0 +1,68 @@
+# benchmarks/bench_geodesy.py
+"""
+Vectorized WGS-84 route length vs the per-segment geopy loop it replaces.
+
+    python -m benchmarks.bench_geodesy
+"""
+import time
+import numpy as np
+from geopy.distance import geodesic
+from config import ORIGINS, DESTINATIONS, BASELINE_RESTRICTIONS
+from geodesy import route_length_km, route_lengths_km, segment_lengths_km
+
+
+def geopy_route_km(route_coords):
+    """The loop route_calculator used before geodesy.py."""
+    total_km = 0
+    for k in range(len(route_coords) - 1):
+        start = (route_coords[k][1], route_coords[k][0])
+        end = (route_coords[k + 1][1], route_coords[k + 1][0])
+        total_km += geodesic(start, end).km
+    return total_km
+
+
+def sample_routes():
+    from sea_network import get_sea_network
+    network = get_sea_network()
+    routes = []
+    for origin in ORIGINS.values():
+        results = network.route_many(origin, list(DESTINATIONS.values()), BASELINE_RESTRICTIONS)
+        routes.extend(r["route_coords"] for r in results if r["success"])
+    return routes
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    routes = sample_routes()
+    n_segments = sum(len(r) - 1 for r in routes)
+    print(f"{len(routes)} routes, {n_segments} segments")
+
+    # Accuracy: every segment, plus random long segments up to ~10,000 km
+    rng = np.random.default_rng(7)
+    lon1, lat1 = rng.uniform(-180, 180, 2000), rng.uniform(-80, 80, 2000)
+    lon2, lat2 = lon1 + rng.uniform(-60, 60, 2000), np.clip(lat1 + rng.uniform(-60, 60, 2000), -89, 89)
+    ours = segment_lengths_km(lon1, lat1, lon2, lat2)
+    ref = np.array([geodesic((b, a), (d, c)).km for a, b, c, d in zip(lon1, lat1, lon2, lat2)])
+    print(f"max |error| vs geopy, random segments: {np.max(np.abs(ours - ref)) * 1e6:.3f} mm")
+
+    errors = [abs(route_length_km(r) - geopy_route_km(r)) for r in routes]
+    print(f"max |error| vs geopy, whole routes:    {max(errors) * 1e6:.3f} mm")
+
+    t_loop = timed(lambda: [geopy_route_km(r) for r in routes], repeat=1)
+    t_single = timed(lambda: [route_length_km(r) for r in routes])
+    t_batch = timed(lambda: route_lengths_km(routes))
+    print(f"geopy per-segment loop: {t_loop * 1000:9.2f} ms")
+    print(f"route_length_km each:   {t_single * 1000:9.2f} ms  ({t_loop / t_single:,.0f}x)")
+    print(f"route_lengths_km batch: {t_batch * 1000:9.2f} ms  ({t_loop / t_batch:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/bench_visualizer.py
+"""
+Route map build time and serialized size: per-lane traces vs batched traces.
+
+    python -m benchmarks.bench_visualizer
+"""
+import time
+import plotly.io as pio
+from config import PRODUCTS, ORIGINS, BASELINE_RESTRICTIONS
+from route_calculator import calculate_routes_batch
+from visualizer import create_route_map
+
+
+def all_commodity_routes(copies=1):
+    """The 'All Commodities' lane list, optionally repeated to mimic a larger network."""
+    batch = calculate_routes_batch(PRODUCTS, {"current": (BASELINE_RESTRICTIONS, ORIGINS)})["current"]
+    routes = []
+    for product, lanes in batch.items():
+        for lane in lanes:
+            routes.append({**lane, "product_group": product})
+    return routes * copies
+
+
+def measure(routes, batched, repeat=5):
+    best_build = best_json = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = create_route_map(routes, "Dark", False, False, batched=batched)
+        built = time.perf_counter()
+        payload = pio.to_json(fig, validate=False)
+        best_build = min(best_build, built - start)
+        best_json = min(best_json, time.perf_counter() - built)
+    return len(fig.data), best_build, best_json, len(payload)
+
+
+def main():
+    for copies in (1, 10):
+        routes = all_commodity_routes(copies)
+        print(f"\n{len(routes)} lanes")
+        print(f"{'mode':<10}{'traces':>8}{'build ms':>11}{'to_json ms':>12}{'JSON KB':>10}")
+        for label, batched in (("per-lane", False), ("batched", True)):
+            traces, build, encode, size = measure(routes, batched)
+            print(f"{label:<10}{traces:>8}{build * 1000:>11.1f}{encode * 1000:>12.1f}{size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
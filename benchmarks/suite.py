@@ -0,0 +1,202 @@
+# benchmarks/suite.py
+"""
+Benchmark suite: routing, emissions and figure builders at 1x, 10x, 100x (and 1000x)
+the size of config.py, on synthetic data with an offline router.
+
+Each case reports its best wall time over repeated runs (up to 25, about 0.5 s) and its peak traced memory
+(tracemalloc, measured in a separate run so it does not distort the timing).
+
+    python -m benchmarks.suite                      # run and print
+    python -m benchmarks.suite --save               # write benchmarks/baselines.json
+    python -m benchmarks.suite --check              # fail on regressions against it
+    python -m benchmarks.suite --scales 1000 --latency-ms 2
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from config import PRODUCTS, ORIGINS, BASELINE_RESTRICTIONS
+from route_calculator import calculate_routes_batch, calculate_routes_for_product, calculate_total_emissions
+from emissions import build_emissions_frame, summarize_emissions, format_emissions_table
+from visualizer import (
+    create_route_map, create_sankey_diagram, create_heatmap, create_bubble_radar, create_emissions_factor_chart
+)
+from benchmarks.synthetic import FakeRouter, offline_routing, reset_route_state, synthetic_store
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SCALES = [1, 10, 100]
+
+# A case regresses when it is this much slower (or larger) than its baseline ...
+DEFAULT_THRESHOLD = 1.5
+# ... and the difference is above the noise floor
+MIN_SECONDS_DELTA = 0.010
+MIN_PEAK_KB_DELTA = 256
+
+
+# --- CASES ---
+def _cases(routes_by_product):
+    """(name, setup, run) triples; setup() returns run's argument and is not timed."""
+    scenarios = {"current": (BASELINE_RESTRICTIONS, ORIGINS)}
+    all_routes = [{**r, "product_group": p} for p, routes in routes_by_product.items() for r in routes]
+    records = format_emissions_table(build_emissions_frame(routes_by_product), group_by_product=True)
+
+    def cold(value=None):
+        reset_route_state()
+        return value
+
+    return [
+        ("routing.batch", cold, lambda _: calculate_routes_batch(PRODUCTS, scenarios, workers=0)),
+        ("routing.for_product", cold,
+         lambda _: [calculate_routes_for_product(p, BASELINE_RESTRICTIONS, ORIGINS) for p in PRODUCTS]),
+        ("routing.warm", lambda: None, lambda _: calculate_routes_batch(PRODUCTS, scenarios, workers=0)),
+        ("emissions.frame", lambda: routes_by_product,
+         lambda r: summarize_emissions(build_emissions_frame(r))),
+        ("emissions.total", lambda: routes_by_product,
+         lambda r: [calculate_total_emissions(routes, p) for p, routes in r.items()]),
+        ("figures.route_map", lambda: all_routes, lambda r: create_route_map(r, "Dark", False, False)),
+        ("figures.sankey", lambda: records, create_sankey_diagram),
+        ("figures.heatmap", lambda: records, create_heatmap),
+        ("figures.bubble_radar", lambda: records, create_bubble_radar),
+    ]
+
+
+def _time_case(setup, run, min_total_s=0.5, max_repeat=25):
+    best = float("inf")
+    spent = 0.0
+    repeat = 0
+    while repeat < max_repeat and (repeat == 0 or spent < min_total_s):
+        arg = setup()
+        # Like timeit: no collector pauses triggered by garbage from earlier cases
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run(arg)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = min(best, elapsed)
+        spent += elapsed
+        repeat += 1
+    return best
+
+
+def _peak_kb(setup, run):
+    arg = setup()
+    tracemalloc.start()
+    try:
+        run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_suite(scales=DEFAULT_SCALES, latency_s=0.0, only=None, progress=print):
+    """{"<scale>x/<case>": {"seconds": ..., "peak_kb": ..., "lanes": ...}}"""
+    results = {}
+    for scale in scales:
+        router = FakeRouter(latency_s=latency_s)
+        with offline_routing(router, synthetic_store(scale)):
+            routes_by_product = calculate_routes_batch(PRODUCTS, {"current": (BASELINE_RESTRICTIONS, ORIGINS)}, workers=0)["current"]
+            lanes = sum(len(r) for r in routes_by_product.values())
+            for name, setup, run in _cases(routes_by_product):
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                key = f"{scale}x/{name}"
+                results[key] = {
+                    "seconds": _time_case(setup, run),
+                    "peak_kb": _peak_kb(setup, run),
+                    "lanes": lanes
+                }
+                if progress:
+                    progress(_format_row(key, results[key]))
+
+    if scales and 1 in scales and (not only or any("figures.factor_chart".startswith(p) for p in only)):
+        results["1x/figures.factor_chart"] = {
+            "seconds": _time_case(lambda: None, lambda _: create_emissions_factor_chart()),
+            "peak_kb": _peak_kb(lambda: None, lambda _: create_emissions_factor_chart()),
+            "lanes": 0
+        }
+        if progress:
+            progress(_format_row("1x/figures.factor_chart", results["1x/figures.factor_chart"]))
+    return results
+
+
+def _format_row(key, row):
+    return f"{key:<30}{row['seconds'] * 1000:>12.1f} ms{row['peak_kb']:>12,.0f} KB"
+
+
+# --- BASELINES ---
+def save_baselines(results, path=BASELINES_PATH):
+    payload = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def load_baselines(path=BASELINES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def check_regressions(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """Cases slower or hungrier than `threshold` x their baseline, beyond the noise floor."""
+    regressions = []
+    for key, current in sorted(results.items()):
+        base = baselines.get(key)
+        if base is None:
+            continue
+        for metric, floor in (("seconds", MIN_SECONDS_DELTA), ("peak_kb", MIN_PEAK_KB_DELTA)):
+            before, after = base[metric], current[metric]
+            if after > before * threshold and after - before > floor:
+                regressions.append((key, metric, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="comma-separated multiples of config.py's dataset (e.g. 1,10,100,1000)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fake router latency per routed pair")
+    parser.add_argument("--only", action="append", default=None, help="case name prefix, e.g. figures; repeatable")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baselines")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any case regressed against the baselines")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown ratio")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--json", default=None, help="also write the raw results here")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    print(f"{'case':<30}{'best time':>15}{'peak memory':>15}")
+    results = run_suite(scales, latency_s=args.latency_ms / 1000, only=args.only)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save:
+        print(f"Saved baselines to {save_baselines(results, args.baselines)}")
+    if args.check:
+        regressions = check_regressions(results, load_baselines(args.baselines), args.threshold)
+        for key, metric, before, after in regressions:
+            print(f"REGRESSION {key} {metric}: {before:,.4f} -> {after:,.4f} ({after / before:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baselines} (threshold {args.threshold:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic workloads and an offline stand-in for searoute.
+
+synthetic_trade_table(scale) grows config.py's dataset by `scale`: every product
+ships to scale x as many destinations (real ports plus jittered copies), with
+volumes drawn around the real ones. Origins stay the real Brazilian ports, which is
+how the real data grows too.
+
+FakeRouter answers routing requests with straight lines at a controllable latency,
+so benchmarks measure our own overhead rather than searoute's. offline_routing()
+swaps it, a fresh cache and passage index and a trade store into route_calculator
+for the duration of a with-block.
+"""
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pyarrow as pa
+
+import route_calculator
+from config import DESTINATIONS, EXPORT_VOLUMES, ROUTE_CACHE_SIZE, ROUTE_NEGATIVE_TTL_S
+from geodesy import route_lengths_km
+from passage_index import PassageIndex
+from route_cache import RouteCache, NegativeCache
+from trade_data import TradeFlowStore, set_trade_store
+
+KM_TO_NM = 0.539957
+
+
+def synthetic_trade_table(scale, seed=0):
+    """Flow table with len(DESTINATIONS) * scale destinations and ~25 * scale lanes."""
+    rng = np.random.default_rng(seed)
+    names = list(DESTINATIONS)
+    base = np.array(list(DESTINATIONS.values()), dtype=float)
+
+    n_dest = len(names) * scale
+    copy = np.arange(n_dest) // len(names)
+    dest_names = [names[i % len(names)] if c == 0 else f"{names[i % len(names)]} #{c}" for i, c in enumerate(copy)]
+    coords = base[np.arange(n_dest) % len(names)] + np.where(copy[:, None] > 0, rng.uniform(-2, 2, (n_dest, 2)), 0)
+
+    products, destinations, volumes, lons, lats = [], [], [], [], []
+    for product, by_dest in EXPORT_VOLUMES.items():
+        real = np.array(list(by_dest.values()), dtype=float)
+        picks = rng.choice(n_dest, size=min(len(real) * scale, n_dest), replace=False)
+        drawn = real[np.arange(len(picks)) % len(real)] * rng.lognormal(0, 0.5, len(picks)) / scale
+        for i, kg in zip(picks, drawn):
+            products.append(product)
+            destinations.append(dest_names[i])
+            volumes.append(float(kg))
+            lons.append(float(coords[i, 0]))
+            lats.append(float(coords[i, 1]))
+
+    return pa.table({
+        "product": products, "destination": destinations, "volume_kg": volumes,
+        "dest_lon": lons, "dest_lat": lats
+    })
+
+
+class FakeRouter:
+    """
+    Drop-in for route_calculator._search_missing: straight lines of `points` vertices,
+    after sleeping `latency_s` per routed pair.
+    """
+
+    def __init__(self, latency_s=0.0, points=40):
+        self.latency_s = latency_s
+        self.points = points
+        self.calls = 0
+        self.routes = 0
+
+    def __call__(self, origin_coords, dest_coords_list, restrictions):
+        self.calls += 1
+        self.routes += len(dest_coords_list)
+        if self.latency_s:
+            time.sleep(self.latency_s * len(dest_coords_list))
+
+        t = np.linspace(0, 1, self.points)[:, None]
+        origin = np.asarray(origin_coords, dtype=float)
+        lines = [origin + t * (np.asarray(dest, dtype=float) - origin) for dest in dest_coords_list]
+        lengths = route_lengths_km(lines)
+        return [{
+            "success": True,
+            "distance_km": float(km),
+            "distance_nm": float(km) * KM_TO_NM,
+            "route_coords": line.tolist(),
+            "passages": [],
+            "error": None
+        } for line, km in zip(lines, lengths)]
+
+
+@contextmanager
+def offline_routing(router=None, store=None):
+    """Route through `router` (default FakeRouter()) with empty caches; restores everything on exit."""
+    router = router or FakeRouter()
+    saved = {
+        name: getattr(route_calculator, name)
+        for name in ("_search_missing", "_ROUTE_CACHE", "_ROUTE_MATRIX", "_PASSAGE_INDEX", "_NEGATIVE_CACHE")
+    }
+    previous_store = set_trade_store(store) if store is not None else None
+    route_calculator._search_missing = router
+    route_calculator._ROUTE_MATRIX = None
+    reset_route_state()
+    try:
+        yield router
+    finally:
+        for name, value in saved.items():
+            setattr(route_calculator, name, value)
+        if store is not None:
+            set_trade_store(previous_store)
+
+
+def reset_route_state():
+    """Empty in-memory route cache, passage index and negative cache, so the next batch routes everything again."""
+    route_calculator._ROUTE_CACHE = RouteCache(None, ROUTE_CACHE_SIZE, memory_only_fields=("route_lods",))
+    route_calculator._PASSAGE_INDEX = PassageIndex()
+    route_calculator._NEGATIVE_CACHE = NegativeCache(ROUTE_NEGATIVE_TTL_S)
+
+
+def synthetic_store(scale, seed=0):
+    return TradeFlowStore(synthetic_trade_table(scale, seed))
@@ -14,6 +14,24 @@ CO2_FACTORS = {
     "Beef": 0.01306        # Refrigerated cargo (Reefer)
 }
 
+# --- EMISSIONS UNCERTAINTY ---
+# Relative standard deviations (coefficient of variation) of the multipliers sampled
+# around each lane's point estimate. Factor and load-factor spreads are per product and
+# shared by all its lanes; detour spread is per lane. 0 leaves that multiplier out.
+CO2_FACTOR_UNCERTAINTY = {
+    "Iron Ore": 0.10,
+    "Soybean": 0.12,
+    "Crude Oil": 0.10,
+    "Coffee": 0.20,  # Container factors average over very different ship sizes
+    "Beef": 0.20
+}
+DEFAULT_CO2_FACTOR_UNCERTAINTY = 0.15
+LOAD_FACTOR_UNCERTAINTY = 0.10
+DETOUR_UNCERTAINTY = 0.0
+UNCERTAINTY_SAMPLES = 10000
+UNCERTAINTY_PERCENTILES = (5, 50, 95)
+UNCERTAINTY_SEED = 42
+
 # --- VESSEL MAPPING ---
 PRODUCT_VESSEL_MAPPING = {
     "Iron Ore": "Bulk Carrier (200k+ dwt)",
@@ -43,6 +61,16 @@ MAP_STYLES = {
     }
 }
 
+# --- ROUTE RENDERING ---
+# World map zoom and approximate drawn width; used to pick a level of detail per route
+MAP_PROJECTION_SCALE = 1.1
+MAP_WIDTH_PX = 1200
+# Douglas-Peucker tolerances (degrees) precomputed for every route
+ROUTE_LOD_TOLERANCES_DEG = [0.05, 0.15, 0.5]
+# Built figures kept per process as parsed JSON, keyed by a content hash of their inputs;
+# bounds their total JSON size
+FIGURE_CACHE_MAX_MB = 64
+
 # --- GEOGRAPHIC DATA ---
 ORIGINS = {
     "Tubarão Port (Vitoria)": [-40.24, -20.29],
@@ -95,7 +123,138 @@ EXPORT_VOLUMES = {
     "Coffee": { "USA (New York/NJ - Gen)": 467_000_000, "Germany (Hamburg)": 445_000_000, "Belgium (Antwerp)": 259_000_000, "Italy (Genoa)": 233_000_000, "Japan (Kimitsu/Tokyo)": 135_000_000 }
 }
 
+# --- INLAND LOGISTICS ---
+# Where each product is produced ([lon, lat]) and the share of its exports from there.
+# Products without regions (offshore crude) are loaded at the port.
+PRODUCTION_REGIONS = {
+    "Carajás (Parauapebas)": [-49.90, -6.07],
+    "Quadrilátero Ferrífero (Itabira)": [-43.23, -19.62],
+    "Mato Grosso (Sorriso)": [-55.71, -12.54],
+    "MATOPIBA (Luís Eduardo Magalhães)": [-45.79, -12.09],
+    "Goiás (Rio Verde)": [-50.93, -17.79],
+    "Paraná (Cascavel)": [-53.46, -24.96],
+    "Rio Grande do Sul (Passo Fundo)": [-52.41, -28.26],
+    "Mato Grosso do Sul (Campo Grande)": [-54.62, -20.47],
+    "Sul de Minas (Varginha)": [-45.43, -21.55],
+    "Cerrado Mineiro (Patrocínio)": [-46.99, -18.94]
+}
+
+PRODUCT_REGIONS = {
+    "Iron Ore": {"Carajás (Parauapebas)": 0.6, "Quadrilátero Ferrífero (Itabira)": 0.4},
+    "Soybean": {
+        "Mato Grosso (Sorriso)": 0.35, "MATOPIBA (Luís Eduardo Magalhães)": 0.15, "Goiás (Rio Verde)": 0.15,
+        "Paraná (Cascavel)": 0.2, "Rio Grande do Sul (Passo Fundo)": 0.15
+    },
+    "Beef": {"Mato Grosso (Sorriso)": 0.4, "Mato Grosso do Sul (Campo Grande)": 0.35, "Goiás (Rio Verde)": 0.25},
+    "Coffee": {"Sul de Minas (Varginha)": 0.6, "Cerrado Mineiro (Patrocínio)": 0.4}
+}
+
+# kg CO2e per tonne-km (DEFRA 2024 freighting goods: average laden HGV, freight train)
+INLAND_CO2_FACTORS = {"road": 0.107, "rail": 0.028}
+
+# Network distance over great-circle distance, per mode
+INLAND_CIRCUITY = {"road": 1.3, "rail": 1.25}
+
+# (region, port) pairs with a freight railway; every pair is reachable by road
+INLAND_RAIL_LINKS = [
+    ("Carajás (Parauapebas)", "Ponta da Madeira (São Luís)"),           # Estrada de Ferro Carajás
+    ("Quadrilátero Ferrífero (Itabira)", "Tubarão Port (Vitoria)"),     # Estrada de Ferro Vitória a Minas
+    ("MATOPIBA (Luís Eduardo Magalhães)", "Ponta da Madeira (São Luís)"),  # Norte-Sul to Carajás
+    ("Mato Grosso (Sorriso)", "Santos Port (São Paulo)"),               # Rumo Malha Norte/Paulista
+    ("Goiás (Rio Verde)", "Santos Port (São Paulo)"),
+    ("Paraná (Cascavel)", "Paranaguá Port")
+]
+
+# Bounds the (regions x ports x destinations) array of the min-plus composition
+INLAND_MAX_CELLS = 4_000_000
+
+# Default for scenario runs and the dashboard: choose export ports by inland + sea cost
+# rather than by sea leg only (inland.py, allocation.py)
+INLAND_PORT_CHOICE = False
+
+# --- PORT CAPACITY ---
+# Annual throughput (kg) of each export port, shared by all its products. Ports left out
+# are unconstrained; None in run_scenario(capacities=...) keeps the nearest-port choice.
+PORT_CAPACITY_KG = {
+    "Tubarão Port (Vitoria)": 360_000_000_000,
+    "Ponta da Madeira (São Luís)": 200_000_000_000,
+    "Santos Port (São Paulo)": 150_000_000_000,
+    "Paranaguá Port": 60_000_000_000,
+    "Rio Grande Port": 45_000_000_000,
+    "Port of Rio de Janeiro": 20_000_000_000,
+    "Port of Açu (Rio)": 90_000_000_000
+}
+
+# "co2" (kg CO2e per kg shipped) or "distance" (km per kg shipped)
+ALLOCATION_OBJECTIVE = "co2"
+
+# --- TRADE DATA ---
+# CSV or Parquet export flows (product, origin, destination, period, volume_kg);
+# None serves EXPORT_VOLUMES above as a built-in dataset
+TRADE_DATA_PATH = None
+# Periods (e.g. "2024-01") to aggregate; None sums every period in the data
+TRADE_PERIODS = None
+# Parsed CSV sources are cached here as memory-mappable Arrow files
+TRADE_CACHE_DIR = ".cache/trade"
+
 AVAILABLE_RESTRICTIONS = [
     'suez', 'panama', 'northwest', 'northeast', 'bering',
     'gibraltar', 'babelmandeb', 'malacca', 'sunda', 'ormuz'
-]
\ No newline at end of file
+]
+
+# --- SCENARIOS ---
+# Passages closed in every scenario (Arctic routes are not commercially viable)
+BASELINE_RESTRICTIONS = ['northwest', 'northeast', 'bering']
+
+SCENARIO_RESTRICTIONS = {
+    "BUSINESS AS USUAL": BASELINE_RESTRICTIONS,
+    "THE GREAT CANAL COLLAPSE": BASELINE_RESTRICTIONS + ['suez', 'panama', 'babelmandeb'],
+    "ATLANTIC BLOCKADE (GIBRALTAR)": BASELINE_RESTRICTIONS + ['gibraltar'],
+    "TOTAL PORT BLACKOUT": BASELINE_RESTRICTIONS
+}
+
+# Origin ports taken offline by each scenario
+SCENARIO_CLOSED_PORTS = {
+    "BUSINESS AS USUAL": [],
+    "THE GREAT CANAL COLLAPSE": [],
+    "ATLANTIC BLOCKADE (GIBRALTAR)": [],
+    "TOTAL PORT BLACKOUT": ["Santos Port (São Paulo)", "Tubarão Port (Vitoria)"]
+}
+
+# --- ROUTE CACHE ---
+# In-memory LRU size and on-disk store (survives restarts, wiped when the searoute network changes)
+ROUTE_CACHE_SIZE = 1024
+ROUTE_CACHE_PATH = ".cache/routes.sqlite"
+
+# --- PERFORMANCE TRACING ---
+# Per-rerun stage timings for the sidebar panel; off means instrumented code is a no-op
+PERF_ENABLED = True
+# One JSON line per traced rerun; None disables the log
+PERF_LOG_PATH = ".cache/perf.jsonl"
+
+# --- SCENARIO CACHE ---
+# Per-product scenario results shared by all sessions of one server process
+SCENARIO_CACHE_SIZE = 256
+
+# --- PRECOMPUTED ROUTES ---
+# Built offline with `python route_matrix.py`; loaded at startup when present
+ROUTE_MATRIX_PATH = "data/route_matrix.npz"
+
+# --- ROUTING ENGINE ---
+# "native": one-to-many Dijkstra over searoute's network (sea_network.py)
+# "searoute": one searoute.searoute call per origin/destination pair
+ROUTING_ENGINE = "native"
+
+# --- PARALLEL ROUTING ---
+# 0 keeps routing in-process; > 0 sends live searches to a process pool of that size
+ROUTE_WORKERS = 0
+# Each live search call (in-process or pooled) fails with a timeout error after this many seconds
+ROUTE_CALL_TIMEOUT_S = 30
+
+# --- ROUTING FAILURES ---
+# Routing for one page render gets this many seconds, counted from the request and
+# including any wait for a computation already running; once it is spent the remaining
+# pairs fail as timeouts without being searched
+ROUTE_BATCH_BUDGET_S = 60
+# Seconds a failed (pair, restriction set) is remembered per error kind; reruns skip it meanwhile
+ROUTE_NEGATIVE_TTL_S = {"no_path": 3600, "bad_input": 3600, "timeout": 300, "error": 300}
@@ -0,0 +1,89 @@
+# emissions.py
+"""
+Columnar emissions engine.
+
+All selected lanes of a scenario, across every product, live in one pandas frame and
+emissions are computed with whole-column operations:
+
+    co2_kg = distance_km * volume_tons * co2_factor    (factors are kg CO2e per tonne-km)
+
+Display names ("CO₂ Emissions (tons)", ...) are only applied by format_emissions_table.
+"""
+import numpy as np
+import pandas as pd
+from config import CO2_FACTORS
+
+# Used for products without a DEFRA factor in config.CO2_FACTORS
+DEFAULT_CO2_FACTOR = 0.00463
+
+EMISSIONS_COLUMNS = [
+    "product", "origin", "destination", "distance_km", "distance_nm",
+    "volume_kg", "volume_tons", "co2_factor", "co2_kg", "co2_tons"
+]
+
+DISPLAY_COLUMNS = {
+    "destination": "Destination",
+    "origin": "Origin",
+    "distance_nm": "Distance (NM)",
+    "volume_kg": "Export Volume (kg)",
+    "volume_tons": "Export Volume (tons)",
+    "co2_tons": "CO₂ Emissions (tons)"
+}
+
+
+def build_emissions_frame(routes_by_product):
+    """
+    One row per selected lane with a positive volume.
+    `routes_by_product` maps product -> route results, as returned by calculate_routes_batch.
+    """
+    lanes = [
+        route
+        for routes in routes_by_product.values()
+        for route in routes
+        if route.get("selected") and route.get("volume_kg", 0) > 0
+    ]
+
+    frame = pd.DataFrame({
+        "product": pd.Categorical([r["product"] for r in lanes]),
+        "origin": [r["origin_name"] for r in lanes],
+        "destination": [r["dest_name"] for r in lanes],
+        "distance_km": np.array([r["distance_km"] for r in lanes], dtype=float),
+        "volume_kg": np.array([r["volume_kg"] for r in lanes], dtype=float)
+    })
+
+    frame["distance_nm"] = frame["distance_km"] * 0.539957
+    frame["volume_tons"] = frame["volume_kg"] / 1000
+    frame["co2_factor"] = frame["product"].astype(object).map(CO2_FACTORS).fillna(DEFAULT_CO2_FACTOR).astype(float)
+    frame["co2_kg"] = frame["distance_km"] * frame["volume_tons"] * frame["co2_factor"]
+    frame["co2_tons"] = frame["co2_kg"] / 1000
+    return frame[EMISSIONS_COLUMNS]
+
+
+def summarize_emissions(frame):
+    """Scenario totals: CO2 (kg), cargo volume (kg) and intensity (kg CO2 per kg cargo)."""
+    co2_kg = float(frame["co2_kg"].sum())
+    volume_kg = float(frame["volume_kg"].sum())
+    return {
+        "co2_kg": co2_kg,
+        "volume_kg": volume_kg,
+        "efficiency": co2_kg / volume_kg if volume_kg > 0 else 0.0,
+        "lanes": int(len(frame))
+    }
+
+
+def summarize_by_product(frame):
+    """Per-product CO2, volume and intensity."""
+    grouped = frame.groupby("product", observed=True)[["co2_kg", "volume_kg"]].sum()
+    grouped["efficiency"] = np.where(grouped["volume_kg"] > 0, grouped["co2_kg"] / grouped["volume_kg"], 0.0)
+    return grouped
+
+
+def format_emissions_table(frame, group_by_product=False):
+    """
+    Display records with the labels the dashboard tables and charts use. Records carry
+    their product as "product_group" only with group_by_product (the all-commodities view).
+    """
+    display = frame[list(DISPLAY_COLUMNS)].rename(columns=DISPLAY_COLUMNS)
+    if group_by_product:
+        display["product_group"] = frame["product"].astype(object).to_numpy()
+    return display.to_dict("records")
@@ -0,0 +1,310 @@
+# export.py
+"""
+Streaming scenario export for GIS and BI tools.
+
+Each scenario adds to two files:
+  * the lane table (scenarios.lane_table: baseline next to current for every lane), as
+    one Parquet file with scenario and restrictions columns;
+  * the current route polylines, one LineString feature per shipped lane (a lane split
+    over ports by the capacity allocation gives one per port) with its product, origin,
+    destination, distance, allocated volume and CO2, as line-delimited GeoJSON
+    (.geojsonl) or GeoParquet (.parquet, WKB geometry in OGC:CRS84).
+
+Scenarios are written one at a time. A result becomes an Arrow record batch (route
+geometry as one flat coordinate buffer plus offsets), is appended to the open writers,
+and is dropped before the next one is computed, so a sweep of hundreds of sets never
+holds more than one scenario in memory.
+
+    python export.py --all --lanes out/lanes.parquet --routes out/routes.geojsonl
+    python export.py --passages suez,panama,gibraltar --max-closed 2 --routes out/sweep.parquet
+"""
+import argparse
+import io
+import json
+import os
+import struct
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import PRODUCTS, SCENARIO_RESTRICTIONS
+from scenarios import LANE_COLUMNS, run_scenario
+from sweep import power_set, set_label
+
+_TEXT_LANE_COLUMNS = {"product", "destination", "origin_baseline", "origin_current"}
+
+LANE_SCHEMA = pa.schema(
+    [("scenario", pa.string()), ("restrictions", pa.string())]
+    + [(c, pa.string() if c in _TEXT_LANE_COLUMNS else pa.float64()) for c in LANE_COLUMNS]
+)
+
+# Geometry is [[lon, lat], ...] per lane; writers encode it for their format
+ROUTE_SCHEMA = pa.schema([
+    ("scenario", pa.string()),
+    ("restrictions", pa.string()),
+    ("product", pa.string()),
+    ("origin", pa.string()),
+    ("destination", pa.string()),
+    ("distance_km", pa.float64()),
+    ("volume_kg", pa.float64()),
+    ("co2_kg", pa.float64()),
+    ("geometry", pa.list_(pa.list_(pa.float64(), 2)))
+])
+
+GEOPARQUET_METADATA = {
+    "version": "1.0.0",
+    "primary_column": "geometry",
+    # No "crs" member means OGC:CRS84, i.e. lon/lat on WGS84
+    "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["LineString"]}}
+}
+
+
+# --- RECORD BATCHES ---
+def _restrictions_label(result):
+    return ",".join(result["restrictions"])
+
+
+def lane_batch(result, label=None):
+    """The lane table of a run_scenario result as a LANE_SCHEMA record batch."""
+    lanes = result["lanes"].assign(
+        scenario=label or result["scenario"],
+        restrictions=_restrictions_label(result)
+    )
+    return pa.RecordBatch.from_pandas(lanes, schema=LANE_SCHEMA, preserve_index=False)
+
+
+def route_batch(result, label=None):
+    """The current scenario's shipped lanes (one per product, port and destination) as a ROUTE_SCHEMA record batch."""
+    frame = result["frames"]["current"]
+    keys = zip(frame["product"].astype(object), frame["destination"], frame["origin"])
+    co2_by_lane = dict(zip(keys, frame["co2_kg"]))
+    lanes = [
+        lane
+        for routes in result["shipped"]["current"].values()
+        for lane in routes
+        if lane.get("volume_kg", 0) > 0 and len(lane["route_coords"]) > 0
+    ]
+
+    coords = [np.asarray(lane["route_coords"], dtype=float).reshape(-1, 2) for lane in lanes]
+    offsets = np.zeros(len(coords) + 1, dtype=np.int32)
+    np.cumsum([len(c) for c in coords], out=offsets[1:])
+    flat = np.concatenate(coords).ravel() if coords else np.empty(0)
+    geometry = pa.ListArray.from_arrays(pa.array(offsets), pa.FixedSizeListArray.from_arrays(pa.array(flat), 2))
+
+    n = len(lanes)
+    return pa.RecordBatch.from_arrays([
+        pa.array([label or result["scenario"]] * n, pa.string()),
+        pa.array([_restrictions_label(result)] * n, pa.string()),
+        pa.array([lane["product"] for lane in lanes], pa.string()),
+        pa.array([lane["origin_name"] for lane in lanes], pa.string()),
+        pa.array([lane["dest_name"] for lane in lanes], pa.string()),
+        pa.array([lane["distance_km"] for lane in lanes], pa.float64()),
+        pa.array([lane["volume_kg"] for lane in lanes], pa.float64()),
+        pa.array([
+            co2_by_lane.get((lane["product"], lane["dest_name"], lane["origin_name"]), 0.0) for lane in lanes
+        ], pa.float64()),
+        geometry.cast(ROUTE_SCHEMA.field("geometry").type)
+    ], schema=ROUTE_SCHEMA)
+
+
+def _coordinate_runs(geometry):
+    """(flat [lon, lat] rows, offsets) of a geometry column."""
+    offsets = geometry.offsets.to_numpy()
+    flat = geometry.values.flatten().to_numpy(zero_copy_only=False).reshape(-1, 2)
+    return flat, offsets
+
+
+# --- WRITERS ---
+def _open_binary(where):
+    """(file, owned): a path is opened here, a file object is written to as given."""
+    if isinstance(where, (str, os.PathLike)):
+        directory = os.path.dirname(os.fspath(where))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(where, "wb"), True
+    return where, False
+
+
+class _GeoJsonLinesWriter:
+    def __init__(self, where):
+        self._file, self._owned = _open_binary(where)
+
+    def write_batch(self, batch):
+        flat, offsets = _coordinate_runs(batch.column("geometry"))
+        properties = batch.drop_columns(["geometry"]).to_pylist()
+        for i, props in enumerate(properties):
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": flat[offsets[i]:offsets[i + 1]].tolist()},
+                "properties": props
+            }
+            self._file.write(json.dumps(feature, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+class _GeoParquetWriter:
+    def __init__(self, where):
+        self._file, self._owned = _open_binary(where)
+        index = ROUTE_SCHEMA.get_field_index("geometry")
+        self.schema = ROUTE_SCHEMA.set(index, pa.field("geometry", pa.binary())).with_metadata(
+            {b"geo": json.dumps(GEOPARQUET_METADATA).encode()}
+        )
+        self._writer = pq.ParquetWriter(self._file, self.schema)
+
+    def write_batch(self, batch):
+        flat, offsets = _coordinate_runs(batch.column("geometry"))
+        wkb = pa.array([
+            # Little-endian WKB LineString: byte order, type 2, point count, then x/y doubles
+            struct.pack("<BII", 1, 2, end - start) + flat[start:end].astype("<f8").tobytes()
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ], pa.binary())
+        columns = batch.columns[:-1] + [wkb]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+        if self._owned:
+            self._file.close()
+
+
+def routes_format(path):
+    """'geoparquet' for .parquet paths, 'geojsonl' otherwise."""
+    return "geoparquet" if os.fspath(path).lower().endswith(".parquet") else "geojsonl"
+
+
+class ScenarioExporter:
+    """
+    Appends run_scenario results to a lane table (Parquet) and a route file (GeoJSONL
+    or GeoParquet); either target may be None. Targets are paths or binary file objects.
+    Use as a context manager so the Parquet footers get written.
+    """
+
+    def __init__(self, lanes=None, routes=None, fmt=None):
+        self._lanes_file = None
+        self._lanes = None
+        if lanes is not None:
+            self._lanes_file, self._owns_lanes = _open_binary(lanes)
+            self._lanes = pq.ParquetWriter(self._lanes_file, LANE_SCHEMA)
+
+        self._routes = None
+        if routes is not None:
+            fmt = fmt or routes_format(routes if isinstance(routes, (str, os.PathLike)) else "")
+            if fmt not in ("geojsonl", "geoparquet"):
+                raise ValueError(f"Unknown routes format: {fmt}")
+            self._routes = _GeoParquetWriter(routes) if fmt == "geoparquet" else _GeoJsonLinesWriter(routes)
+
+        self.scenarios = 0
+        self.lanes = 0
+        self.routes = 0
+
+    def write(self, result, label=None):
+        """Append one scenario; `label` replaces the result's scenario name (e.g. a sweep set)."""
+        if self._lanes is not None:
+            batch = lane_batch(result, label)
+            self._lanes.write_batch(batch)
+            self.lanes += batch.num_rows
+        if self._routes is not None:
+            batch = route_batch(result, label)
+            self._routes.write_batch(batch)
+            self.routes += batch.num_rows
+        self.scenarios += 1
+
+    def close(self):
+        if self._lanes is not None:
+            self._lanes.close()
+            if self._owns_lanes:
+                self._lanes_file.close()
+            self._lanes = None
+        if self._routes is not None:
+            self._routes.close()
+            self._routes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# --- PIPELINE ---
+def iter_results(scenario_names=(), restriction_sets=(), products=PRODUCTS, cache=None):
+    """
+    Yield (label, run_scenario result) one scenario at a time: built-in scenarios by
+    name, then restriction sets, each closed on top of the baseline (as scenarios.py
+    --restrict does) and labelled as in the sweep table: by the closures it adds, or
+    BASELINE when it adds none.
+    """
+    for name in scenario_names:
+        yield name, run_scenario(name, products, cache=cache)
+    for restrictions in restriction_sets:
+        yield set_label(restrictions), run_scenario(None, products, sorted(restrictions), cache=cache)
+
+
+def export_scenarios(results, lanes=None, routes=None, fmt=None, progress=None):
+    """Stream (label, result) pairs into the export files. Returns the exporter's counts."""
+    with ScenarioExporter(lanes, routes, fmt) as exporter:
+        for label, result in results:
+            exporter.write(result, label)
+            if progress:
+                progress(exporter.scenarios, label)
+    return {"scenarios": exporter.scenarios, "lanes": exporter.lanes, "routes": exporter.routes}
+
+
+def export_bytes(result, kind, fmt=None):
+    """One scenario's lane table ('lanes') or route file ('routes') as bytes, for downloads."""
+    buffer = io.BytesIO()
+    if kind == "lanes":
+        export_scenarios([(None, result)], lanes=buffer)
+    elif kind == "routes":
+        export_scenarios([(None, result)], routes=buffer, fmt=fmt or "geojsonl")
+    else:
+        raise ValueError(f"Unknown export: {kind}")
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export scenario lane tables and route geometries.")
+    parser.add_argument("--scenario", action="append", default=[], choices=list(SCENARIO_RESTRICTIONS),
+                        help="built-in scenario; repeatable")
+    parser.add_argument("--all", action="store_true", help="every built-in scenario")
+    parser.add_argument("--passages", default=None,
+                        help="comma-separated passages; exports every combination of their closures")
+    parser.add_argument("--max-closed", type=int, default=None, help="largest number of simultaneous closures")
+    parser.add_argument("--set", action="append", default=[], help="comma-separated restriction set; repeatable")
+    parser.add_argument("--product", action="append", default=None, help="product to include; repeatable. Defaults to all")
+    parser.add_argument("--lanes", default=None, help="lane table output (.parquet)")
+    parser.add_argument("--routes", default=None, help="route output (.geojsonl or .parquet for GeoParquet)")
+    parser.add_argument("--routes-format", choices=["geojsonl", "geoparquet"], default=None,
+                        help="overrides the extension")
+    args = parser.parse_args(argv)
+
+    if not args.lanes and not args.routes:
+        parser.error("nothing to write: give --lanes and/or --routes")
+
+    names = list(SCENARIO_RESTRICTIONS) if args.all else list(dict.fromkeys(args.scenario))
+    sets = [frozenset(r for r in item.split(",") if r) for item in args.set]
+    if args.passages:
+        sets += power_set(args.passages.split(","), args.max_closed)
+    if not names and not sets:
+        parser.error("nothing to export: give --scenario, --all, --set or --passages")
+
+    total = len(names) + len(sets)
+    counts = export_scenarios(
+        iter_results(names, sets, args.product or PRODUCTS),
+        lanes=args.lanes, routes=args.routes, fmt=args.routes_format,
+        progress=lambda done, label: print(f"[{done}/{total}] {label}", flush=True)
+    )
+    print(f"Exported {counts['scenarios']} scenarios: {counts['lanes']} lane rows"
+          + (f" -> {args.lanes}" if args.lanes else "")
+          + f", {counts['routes']} routes" + (f" -> {args.routes}" if args.routes else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# figure_cache.py
+"""
+Process-wide cache of built Plotly figures.
+
+Figures are keyed by the builder and a content hash of its arguments, and stored as
+the plain dict of their JSON, parsed once when the figure is built, in an LRU bounded
+by total JSON size (FIGURE_CACHE_MAX_MB; the dicts take about three times that in
+memory). A hit is that dict, shared by every session: no builder, no validation, no
+to_dict() deep copy and no parsing. The one serialization left is st.plotly_chart's
+own plotly.io.to_json, which encodes whatever figure it is given and cannot take
+stored JSON.
+
+Figures that depend on nothing but config (the methodology chart) are built once
+per process with static_figure().
+"""
+import hashlib
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from config import FIGURE_CACHE_MAX_MB
+import perf
+
+# Route result fields no figure builder reads; route_lods derive from route_coords
+_UNRENDERED_FIELDS = frozenset(["route_options", "route_lods"])
+
+
+# --- FINGERPRINTS ---
+def _strip(obj):
+    """Drop unrendered fields from mappings (dicts, lane records) and lists of them; anything else is hashed as is."""
+    if isinstance(obj, Mapping):
+        return {k: _strip(obj[k]) for k in obj if k not in _UNRENDERED_FIELDS}
+    if isinstance(obj, (list, tuple)) and obj and isinstance(obj[0], Mapping):
+        return [_strip(v) for v in obj]
+    return obj
+
+
+def fingerprint(*args, **kwargs):
+    """
+    Content hash of builder arguments (route results, emission records, plain values).
+    Hashes the pickled arguments: equal bytes mean equal content, so a hit is never stale.
+    The same content built differently (e.g. other dict order) can hash differently,
+    which only costs a rebuild.
+    """
+    payload = pickle.dumps(([_strip(a) for a in args], _strip(kwargs)), protocol=4)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+# --- CACHED FIGURES ---
+class SerializedFigure(go.Figure):
+    """
+    A figure served from the cache. It only carries the cached dict, which is what
+    st.plotly_chart and plotly.io.to_json read; it has no data or layout objects.
+    The dict is shared: never modify it.
+    """
+
+    def __init__(self, fig_dict):
+        super().__init__()
+        self._fig_dict = fig_dict
+
+    def to_dict(self):
+        return self._fig_dict
+
+    def to_plotly_json(self):
+        return self._fig_dict
+
+
+class FigureCache:
+    """LRU of figure dicts bounded by the total size of their JSON."""
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, fig_dict, json_bytes):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if json_bytes > self.max_bytes:
+                return
+            self._entries[key] = (fig_dict, json_bytes)
+            self._bytes += json_bytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_CACHE = FigureCache()
+_STATIC = {}
+_STATIC_LOCK = threading.Lock()
+
+
+def get_figure_cache():
+    return _CACHE
+
+
+def cached_figure(builder, *args, cache=None, **kwargs):
+    """builder(*args, **kwargs), served from the cache when the same inputs were built before."""
+    cache = cache or _CACHE
+    key = (builder.__name__, fingerprint(*args, **kwargs))
+
+    fig_dict = cache.get(key)
+    if fig_dict is not None:
+        perf.count("figure_cache_hits")
+        return SerializedFigure(fig_dict)
+
+    perf.count("figure_cache_misses")
+    fig = builder(*args, **kwargs)
+    if fig is None:
+        return None
+    payload = pio.to_json(fig, validate=False)
+    cache.put(key, json.loads(payload), len(payload))
+    return fig
+
+
+def static_figure(builder):
+    """A figure that depends only on config: built on first use, then served for the life of the process."""
+    with _STATIC_LOCK:
+        fig_dict = _STATIC.get(builder.__name__)
+        if fig_dict is None:
+            fig_dict = json.loads(pio.to_json(builder(), validate=False))
+            _STATIC[builder.__name__] = fig_dict
+    return SerializedFigure(fig_dict)
@@ -0,0 +1,253 @@
+# inland.py
+"""
+Inland-leg aware port selection.
+
+Cargo travels production region -> (road or rail) -> export port -> (sea) -> destination.
+For one product the legs are two cost matrices:
+
+    inland[region, port]    cheapest mode per pair (INLAND_RAIL_LINKS, else road),
+                            great-circle distance times INLAND_CIRCUITY
+    sea[port, destination]  the routed sea distance of every candidate port, read from
+                            the lanes' route options (inf where a port cannot serve)
+
+and the best path for every (region, destination) is their min-plus product,
+
+    best[r, d] = min over p of inland[r, p] + sea[p, d]
+
+evaluated as one broadcast (regions x ports x destinations) array, in region chunks
+of at most INLAND_MAX_CELLS cells. The objective is CO2 per tonne by default (each leg's
+km times its mode's factor: INLAND_CO2_FACTORS on land, CO2_FACTORS at sea) or plain km.
+
+Each destination's volume is split over the product's regions by PRODUCT_REGIONS share.
+Products without regions are loaded at the port, as before.
+
+With INLAND_PORT_CHOICE (or run_scenario(inland=True), the dashboard's INLAND LEGS
+switch) scenario runs choose ports this way too: port_flows() is their uncapped port
+choice, and allocation.py adds the inland legs to its arc costs within port capacity.
+Their CO2 totals stay the sea leg's; the inland legs are reported next to them.
+
+    python inland.py --scenario "TOTAL PORT BLACKOUT" --out flows.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    PRODUCTS, ORIGINS, CO2_FACTORS, SCENARIO_RESTRICTIONS, PRODUCTION_REGIONS, PRODUCT_REGIONS,
+    INLAND_CO2_FACTORS, INLAND_CIRCUITY, INLAND_RAIL_LINKS, INLAND_MAX_CELLS
+)
+from emissions import DEFAULT_CO2_FACTOR
+from geodesy import segment_lengths_km
+
+FLOW_COLUMNS = [
+    "product", "region", "port", "destination", "inland_mode", "inland_km", "sea_km", "volume_kg",
+    "inland_co2_kg", "sea_co2_kg", "co2_kg", "sea_only_port", "sea_only_co2_kg"
+]
+
+AT_PORT = "(at port)"
+
+
+# --- COST MATRICES ---
+def inland_legs(regions, ports, region_coords=PRODUCTION_REGIONS, port_coords=ORIGINS, rail_links=INLAND_RAIL_LINKS):
+    """
+    (km, kg CO2 per tonne, mode) arrays of shape (regions x ports) for the lowest-CO2
+    mode of every pair.
+    """
+    r = np.array([region_coords[name] for name in regions], dtype=float).reshape(-1, 2)
+    p = np.array([port_coords[name] for name in ports], dtype=float).reshape(-1, 2)
+    crow_km = segment_lengths_km(r[:, None, 0], r[:, None, 1], p[None, :, 0], p[None, :, 1])
+
+    modes = list(INLAND_CO2_FACTORS)
+    available = np.ones((len(modes), len(regions), len(ports)), dtype=bool)
+    if "rail" in modes:
+        # Links encoded as flat (region, port) cell numbers
+        region_index = {name: i for i, name in enumerate(regions)}
+        port_index = {name: i for i, name in enumerate(ports)}
+        linked = [region_index[r] * len(ports) + port_index[p] for r, p in rail_links
+                  if r in region_index and p in port_index]
+        available[modes.index("rail")] = np.isin(np.arange(len(regions) * len(ports)), linked).reshape(
+            len(regions), len(ports)
+        )
+
+    km = np.stack([crow_km * INLAND_CIRCUITY.get(mode, 1.0) for mode in modes])
+    co2 = np.where(available, km * np.array([INLAND_CO2_FACTORS[m] for m in modes])[:, None, None], np.inf)
+    best = co2.argmin(axis=0)
+    pick = best[None]
+    return (
+        np.take_along_axis(km, pick, axis=0)[0],
+        np.take_along_axis(co2, pick, axis=0)[0],
+        np.array(modes, dtype=object)[best]
+    )
+
+
+def sea_legs(lanes, ports):
+    """(ports x destinations) sea km from the route options of one product's lanes, and the destination names."""
+    destinations = [lane["dest_name"] for lane in lanes]
+    index = {name: i for i, name in enumerate(ports)}
+    km = np.full((len(ports), len(lanes)), np.inf)
+
+    # Every lane's options flattened, then written with one scatter
+    options = [option for lane in lanes for option in lane["route_options"]]
+    lane_of = np.repeat(np.arange(len(lanes)), [len(lane["route_options"]) for lane in lanes])
+    port_of = np.array([index.get(option["origin_name"], -1) for option in options], dtype=np.intp)
+    distance = np.array([option["distance_km"] if option["success"] else np.inf for option in options], dtype=float)
+    keep = (port_of >= 0) & np.isfinite(distance)
+    km[port_of[keep], lane_of[keep]] = distance[keep]
+    return km, destinations
+
+
+def min_plus(a, b, max_cells=INLAND_MAX_CELLS):
+    """
+    Min-plus matrix product of (R x P) and (P x D): (C, argmin) with
+    C[r, d] = min over p of a[r, p] + b[p, d], broadcast in chunks of rows.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    rows, inner = a.shape
+    cols = b.shape[1]
+    cost = np.empty((rows, cols))
+    arg = np.empty((rows, cols), dtype=np.intp)
+    chunk = max(1, max_cells // max(inner * cols, 1))
+    for start in range(0, rows, chunk):
+        block = a[start:start + chunk, :, None] + b[None, :, :]
+        best = block.argmin(axis=1)
+        arg[start:start + chunk] = best
+        cost[start:start + chunk] = np.take_along_axis(block, best[:, None, :], axis=1)[:, 0, :]
+    return cost, arg
+
+
+# --- FLOWS ---
+def plan_product(product, lanes, objective="co2"):
+    """
+    Flows of one product from its production regions to every served destination, by
+    the best combined port. `lanes` are the product's LaneRecords from a scenario run.
+    """
+    if objective not in ("co2", "distance"):
+        raise ValueError(f"Unknown objective: {objective}")
+    lanes = [lane for lane in lanes if lane["volume_kg"] > 0]
+    shares = PRODUCT_REGIONS.get(product)
+    if not lanes:
+        return pd.DataFrame(columns=FLOW_COLUMNS)
+    if not shares:
+        return _at_port_flows(product, lanes)
+
+    ports = list(dict.fromkeys(o["origin_name"] for lane in lanes for o in lane["route_options"]))
+    regions = list(shares)
+    weights = np.array([shares[r] for r in regions], dtype=float)
+    weights /= weights.sum()
+
+    sea_factor = CO2_FACTORS.get(product, DEFAULT_CO2_FACTOR)
+    inland_km, inland_co2, inland_mode = inland_legs(regions, ports)
+    sea_km, destinations = sea_legs(lanes, ports)
+    if objective == "co2":
+        cost, port_index = min_plus(inland_co2, sea_km * sea_factor)
+    else:
+        cost, port_index = min_plus(inland_km, sea_km)
+
+    # What the sea-only choice (the lane's own origin) costs from each region
+    sea_only = np.array([ports.index(lane["origin_name"]) for lane in lanes])
+
+    r, d = np.meshgrid(np.arange(len(regions)), np.arange(len(destinations)), indexing="ij")
+    r, d = r.ravel(), d.ravel()
+    p = port_index.ravel()
+    reachable = np.isfinite(cost.ravel())
+    r, d, p = r[reachable], d[reachable], p[reachable]
+
+    volume_kg = np.array([lane["volume_kg"] for lane in lanes])[d] * weights[r]
+    tonnes = volume_kg / 1000
+    leg_km = inland_km[r, p]
+    leg_co2 = inland_co2[r, p] * tonnes
+    sea_co2 = sea_km[p, d] * sea_factor * tonnes
+    p_sea = sea_only[d]
+    sea_only_co2 = (inland_co2[r, p_sea] + sea_km[p_sea, d] * sea_factor) * tonnes
+
+    return pd.DataFrame({
+        "product": product,
+        "region": np.array(regions, dtype=object)[r],
+        "port": np.array(ports, dtype=object)[p],
+        "destination": np.array(destinations, dtype=object)[d],
+        "inland_mode": inland_mode[r, p],
+        "inland_km": leg_km,
+        "sea_km": sea_km[p, d],
+        "volume_kg": volume_kg,
+        "inland_co2_kg": leg_co2,
+        "sea_co2_kg": sea_co2,
+        "co2_kg": leg_co2 + sea_co2,
+        "sea_only_port": np.array(ports, dtype=object)[p_sea],
+        "sea_only_co2_kg": sea_only_co2
+    })[FLOW_COLUMNS]
+
+
+def _at_port_flows(product, lanes):
+    sea_factor = CO2_FACTORS.get(product, DEFAULT_CO2_FACTOR)
+    rows = []
+    for lane in lanes:
+        co2 = lane["distance_km"] * lane["volume_kg"] / 1000 * sea_factor
+        rows.append({
+            "product": product, "region": AT_PORT, "port": lane["origin_name"], "destination": lane["dest_name"],
+            "inland_mode": None, "inland_km": 0.0, "sea_km": lane["distance_km"], "volume_kg": lane["volume_kg"],
+            "inland_co2_kg": 0.0, "sea_co2_kg": co2, "co2_kg": co2,
+            "sea_only_port": lane["origin_name"], "sea_only_co2_kg": co2
+        })
+    return pd.DataFrame(rows, columns=FLOW_COLUMNS)
+
+
+def plan_scenario(result, objective="co2", key="current"):
+    """Flows for every product of a run_scenario result (its "current" lanes by default)."""
+    frames = [plan_product(product, lanes, objective) for product, lanes in result["routes"][key].items()]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FLOW_COLUMNS)
+
+
+def port_flows(routes_by_product, objective="co2"):
+    """
+    Uncapped port choice with inland legs for one scenario side (product -> LaneRecords):
+    the volume of every (product, port, destination) as allocation.FLOW_COLUMNS, each
+    region shipping through its best combined port, and the inland CO2 per product as
+    allocation.INLAND_COLUMNS.
+    """
+    frames = [plan_product(product, lanes, objective) for product, lanes in routes_by_product.items()]
+    plan = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FLOW_COLUMNS)
+    flows = plan.groupby(["product", "port", "destination"], sort=False, as_index=False).agg(
+        distance_km=("sea_km", "first"), volume_kg=("volume_kg", "sum")
+    ).rename(columns={"port": "origin"})
+    inland_co2 = plan[plan["inland_co2_kg"] > 0].groupby("product", sort=False, as_index=False)["inland_co2_kg"].sum()
+    return flows[["product", "origin", "destination", "distance_km", "volume_kg"]], inland_co2
+
+
+def summarize_flows(flows):
+    """Per product: volume, CO2 with inland legs, CO2 of the sea-only port choice, and rerouted volume."""
+    rerouted = flows["port"] != flows["sea_only_port"]
+    grouped = flows.assign(rerouted_kg=np.where(rerouted, flows["volume_kg"], 0.0)).groupby("product", sort=False)
+    summary = grouped[["volume_kg", "inland_co2_kg", "co2_kg", "sea_only_co2_kg", "rerouted_kg"]].sum()
+    summary["saving_pct"] = np.where(
+        summary["sea_only_co2_kg"] > 0, (1 - summary["co2_kg"] / summary["sea_only_co2_kg"]) * 100, 0.0
+    )
+    return summary
+
+
+def main(argv=None):
+    from scenarios import run_scenario
+
+    parser = argparse.ArgumentParser(description="Best export port per production region, inland legs included.")
+    parser.add_argument("--scenario", choices=list(SCENARIO_RESTRICTIONS), default=None,
+                        help="built-in scenario; defaults to the baseline")
+    parser.add_argument("--product", action="append", default=None, help="product to plan; repeatable. Defaults to all")
+    parser.add_argument("--objective", choices=["co2", "distance"], default="co2")
+    parser.add_argument("--out", default=None, help="per-flow table (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    result = run_scenario(args.scenario, args.product or PRODUCTS)
+    flows = plan_scenario(result, args.objective)
+    summary = summarize_flows(flows)
+    print((summary[["volume_kg", "inland_co2_kg", "co2_kg", "sea_only_co2_kg", "rerouted_kg"]] / 1e9).round(3)
+          .join(summary["saving_pct"].round(1)).to_string())
+    if args.out:
+        if args.out.lower().endswith(".parquet"):
+            flows.to_parquet(args.out, index=False)
+        else:
+            flows.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
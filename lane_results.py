@@ -0,0 +1,204 @@
+# lane_results.py
+"""
+Compact lane results.
+
+calculate_routes_batch returns one LaneRecord per served lane instead of a dict. Lane
+attributes live in __slots__, and the winning route's geometry (and its levels of
+detail) is copied once into a GeometryBuffer shared by every lane of a product in the
+batch: float64 [lon, lat] rows referenced by offset, as in the precomputed route
+matrix. route_coords and route_lods are read-only NumPy views into it.
+
+The candidate origins of a lane are RouteOptions that keep only their distance, unless
+the batch was asked for option geometry. Lanes therefore no longer keep every
+candidate's polyline alive after the route cache has dropped it.
+
+Records read like the dicts they replace (record["distance_km"], record.get(...),
+{**record}), so emissions, figures and the dashboard use them unchanged. They pickle
+as self-contained records carrying only their own geometry.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+_NO_COORDS = np.empty((0, 2))
+_NO_COORDS.flags.writeable = False
+
+
+class GeometryBuffer:
+    """
+    Polylines stored once as float64 [lon, lat] rows. add() and add_route() while a
+    batch assembles, then freeze() once; records read views through (start, end) ranges.
+    """
+
+    __slots__ = ("coords", "_chunks", "_size", "_routes")
+
+    def __init__(self):
+        self.coords = None
+        self._chunks = []
+        self._size = 0
+        self._routes = {}
+
+    def add(self, coords):
+        """Append a polyline; returns its (start, end) rows."""
+        points = np.asarray(coords, dtype=float).reshape(-1, 2)
+        start = self._size
+        self._chunks.append(points)
+        self._size += len(points)
+        return start, self._size
+
+    def add_route(self, route):
+        """
+        (coords range, ((tolerance, range), ...)) of a route result's geometry and LODs.
+        A result added again (another scenario, product or option) is stored once; results
+        must stay alive until freeze(), as the route lookups of a batch do.
+        """
+        key = id(route["route_coords"])
+        ranges = self._routes.get(key)
+        if ranges is None:
+            lods = tuple((t, self.add(coords)) for t, coords in sorted((route.get("route_lods") or {}).items()))
+            ranges = (self.add(route["route_coords"]), lods)
+            self._routes[key] = ranges
+        return ranges
+
+    def freeze(self):
+        self.coords = np.concatenate(self._chunks) if self._chunks else np.empty((0, 2))
+        self.coords.flags.writeable = False
+        self._chunks = None
+        self._routes = None
+        return self
+
+    def view(self, start, end):
+        return self.coords[start:end]
+
+
+class _Record(Mapping):
+    """Dict-style read access to a slotted record: record[key], record.get(key), {**record}."""
+
+    __slots__ = ()
+    _KEYS = ()
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    # Values include NumPy arrays, so equality is identity, as for any other object
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.get('dest_name', '')!r}, origin={self['origin_name']!r})"
+
+
+def _views(buffer, ranges):
+    """(route_coords, route_lods) views for stored ranges; no geometry when ranges is None."""
+    if ranges is None:
+        return _NO_COORDS, {}
+    (start, end), lods = ranges
+    return buffer.view(start, end), {t: buffer.view(s, e) for t, (s, e) in lods}
+
+
+def _own_geometry(values):
+    """A one-record buffer holding the route_coords/route_lods of `values`."""
+    buffer = GeometryBuffer()
+    ranges = buffer.add_route(values)
+    return buffer.freeze(), ranges
+
+
+class RouteOption(_Record):
+    """One candidate origin of a lane: its distance, and geometry only when asked for."""
+
+    __slots__ = (
+        "origin_name", "origin_coords", "success", "distance_nm", "distance_km", "error", "error_kind",
+        "_buffer", "_ranges"
+    )
+    _KEYS = ("origin_name", "origin_coords", "success", "distance_nm", "distance_km", "error", "error_kind", "route_coords")
+
+    def __init__(self, origin_name, origin_coords, route, buffer=None, ranges=None):
+        self.origin_name = origin_name
+        self.origin_coords = origin_coords
+        self.success = route["success"]
+        self.distance_nm = route["distance_nm"]
+        self.distance_km = route["distance_km"]
+        self.error = route["error"]
+        self.error_kind = route.get("error_kind")
+        if buffer is not None and ranges is None and route["success"]:
+            ranges = buffer.add_route(route)
+        self._buffer = buffer if ranges is not None else None
+        self._ranges = ranges
+
+    @property
+    def route_coords(self):
+        return _views(self._buffer, self._ranges)[0]
+
+    def __reduce__(self):
+        return _restore_option, (dict(self),)
+
+
+class LaneRecord(_Record):
+    """A served lane: the winning route of one product to one destination, with its options."""
+
+    __slots__ = (
+        "product", "origin_name", "origin_coords", "dest_name", "dest_coords",
+        "success", "distance_nm", "distance_km", "passages", "error",
+        "volume_kg", "volume_tons", "route_options", "_buffer", "_ranges"
+    )
+    _KEYS = (
+        "product", "origin_name", "origin_coords", "dest_name", "dest_coords",
+        "success", "distance_nm", "distance_km", "passages", "error",
+        "volume_kg", "volume_tons", "selected", "route_coords", "route_lods", "route_options"
+    )
+    selected = True
+
+    def __init__(self, product, origin_name, origin_coords, dest_name, dest_coords, route, volume_kg,
+                 route_options, buffer, ranges=None):
+        self.product = product
+        self.origin_name = origin_name
+        self.origin_coords = origin_coords
+        self.dest_name = dest_name
+        self.dest_coords = dest_coords
+        self.success = route["success"]
+        self.distance_nm = route["distance_nm"]
+        self.distance_km = route["distance_km"]
+        self.passages = route.get("passages", [])
+        self.error = route["error"]
+        self.volume_kg = volume_kg
+        self.volume_tons = volume_kg / 1000
+        self.route_options = route_options
+        self._buffer = buffer
+        self._ranges = ranges if ranges is not None else buffer.add_route(route)
+
+    @property
+    def route_coords(self):
+        return _views(self._buffer, self._ranges)[0]
+
+    @property
+    def route_lods(self):
+        return _views(self._buffer, self._ranges)[1]
+
+    @property
+    def geometry(self):
+        """(buffer, ranges), to build another lane over the same stored route."""
+        return self._buffer, self._ranges
+
+    def __reduce__(self):
+        return _restore_lane, (dict(self),)
+
+
+def _restore_option(values):
+    buffer, ranges = _own_geometry(values) if len(values["route_coords"]) else (None, None)
+    return RouteOption(values["origin_name"], values["origin_coords"], values, buffer, ranges)
+
+
+def _restore_lane(values):
+    buffer, ranges = _own_geometry(values)
+    return LaneRecord(
+        values["product"], values["origin_name"], values["origin_coords"], values["dest_name"], values["dest_coords"],
+        values, values["volume_kg"], values["route_options"], buffer, ranges
+    )
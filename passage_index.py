@@ -0,0 +1,59 @@
+# passage_index.py
+import threading
+from route_cache import normalize_restrictions
+
+
+class PassageIndex:
+    """
+    Records, for every routed (origin, destination) pair, the restriction sets it was
+    routed under and the passages (chokepoints) each resulting path crosses.
+
+    A route that was shortest under restriction set A stays shortest under any
+    superset B of A as long as it crosses none of the passages in B: closing more
+    passages only removes edges, and the path survives the removal. So moving from
+    "BUSINESS AS USUAL" to a Gibraltar closure only re-routes lanes through Gibraltar.
+
+    Only the passage names are kept; the route itself is fetched from where it is
+    stored (precomputed matrix, route cache) when it is reused, so the index never
+    holds geometry. An entry whose route can no longer be fetched is dropped.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, result):
+        """Remember the passages of a successful route for key = (origin, dest, restriction frozenset)."""
+        if not result.get("success") or "passages" not in result:
+            return
+        origin, dest, restrictions = key
+        passages = frozenset(result["passages"])
+        with self._lock:
+            entries = self._entries.setdefault((origin, dest), {})
+            entries[restrictions] = passages
+
+    def find_reusable(self, key, fetch):
+        """
+        Return a recorded route that is still optimal for `key`, or None.
+        fetch(restrictions) returns the stored route of the pair under a recorded
+        restriction set, or None when it has been evicted.
+        """
+        origin, dest, restrictions = key
+        restrictions = normalize_restrictions(restrictions)
+        with self._lock:
+            entries = self._entries.get((origin, dest)) or {}
+            candidates = [
+                routed_under for routed_under, passages in entries.items()
+                if routed_under <= restrictions and not (passages & restrictions)
+            ]
+        for routed_under in candidates:
+            result = fetch(routed_under)
+            if result is not None:
+                return result
+            with self._lock:
+                self._entries.get((origin, dest), {}).pop(routed_under, None)
+        return None
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
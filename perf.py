@@ -0,0 +1,159 @@
+# perf.py
+"""
+Lightweight per-rerun performance tracing.
+
+A trace covers one script run (one Streamlit rerun, one CLI call). Code marks stages
+with `with perf.span("routing.search"):` and tallies events with perf.count(...).
+Both are no-ops unless a trace is active on the current thread, so instrumented code
+costs one attribute lookup when tracing is off (PERF_ENABLED = False, or code running
+outside a trace such as the prewarm thread and pool workers).
+
+end_trace() appends the finished trace as one JSON line to PERF_LOG_PATH.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+from config import PERF_ENABLED, PERF_LOG_PATH
+
+_LOCAL = threading.local()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.depth = 0
+        self.duration_ms = None
+
+    def to_record(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": self.spans,
+            "counters": self.counters
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.trace.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        trace = self.trace
+        trace.depth -= 1
+        record = {
+            "name": self.name,
+            "depth": trace.depth,
+            "start_ms": (self.start - trace._t0) * 1000,
+            "duration_ms": (end - self.start) * 1000
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        trace.spans.append(record)
+        return False
+
+
+def current_trace():
+    return getattr(_LOCAL, "trace", None)
+
+
+def attach(trace):
+    """Make `trace` (or None) current on this thread, for helper threads working for a traced run."""
+    _LOCAL.trace = trace
+
+
+def start_trace(label, enabled=PERF_ENABLED):
+    """Begin a trace on this thread (replacing any unfinished one). Returns None when disabled."""
+    trace = Trace(label) if enabled else None
+    _LOCAL.trace = trace
+    return trace
+
+
+def end_trace(trace, log_path=PERF_LOG_PATH):
+    """Close `trace`, detach it from this thread and append it to the JSONL log."""
+    if trace is None:
+        return None
+    trace.duration_ms = (time.perf_counter() - trace._t0) * 1000
+    if current_trace() is trace:
+        _LOCAL.trace = None
+    if log_path:
+        _append_jsonl(log_path, trace.to_record())
+    return trace
+
+
+def _append_jsonl(path, record):
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+    except OSError:
+        # A read-only deployment must never break the page over a log line
+        pass
+
+
+def span(name, **attrs):
+    """Time a block as a stage of the current trace."""
+    trace = getattr(_LOCAL, "trace", None)
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name, attrs)
+
+
+def timed(name):
+    """Decorator form of span() for whole functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = getattr(_LOCAL, "trace", None)
+            if trace is None:
+                return fn(*args, **kwargs)
+            with _Span(trace, name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add `n` to a counter of the current trace."""
+    trace = getattr(_LOCAL, "trace", None)
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + n
+
+
+def stage_totals(trace):
+    """{span name: (calls, total ms)} for spans of a finished trace, in first-seen order."""
+    totals = {}
+    for s in trace.spans:
+        calls, ms = totals.get(s["name"], (0, 0.0))
+        totals[s["name"]] = (calls + 1, ms + s["duration_ms"])
+    return totals
@@ -0,0 +1,232 @@
+# route_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def normalize_restrictions(restrictions):
+    """Canonical, order-independent form of a restriction list."""
+    return frozenset(str(r).strip().lower() for r in (restrictions or []) if r)
+
+
+def make_route_key(origin_coords, dest_coords, restrictions):
+    """
+    Cache key for one routing request.
+    Coordinates are rounded so that [-46.33, -24.0] and (-46.33, -24) hit the same entry.
+    """
+    origin = tuple(round(float(c), 6) for c in origin_coords)
+    dest = tuple(round(float(c), 6) for c in dest_coords)
+    return origin, dest, normalize_restrictions(restrictions)
+
+
+def _serialize_key(key):
+    origin, dest, restrictions = key
+    return json.dumps([list(origin), list(dest), sorted(restrictions)], separators=(",", ":"))
+
+
+class RouteCache:
+    """
+    Two-tier cache for route results.
+
+    Tier 1 is an in-memory LRU of result dicts. Tier 2 is a SQLite file that
+    survives restarts. The disk tier is stamped with the routing network
+    version and is wiped whenever that version changes. Fields listed in
+    `memory_only_fields` (derived data such as render LODs) are never written to disk.
+    Inside batch() disk writes are held and committed together when the outermost batch
+    ends; outside one, every put is committed at once.
+    """
+
+    def __init__(self, path=None, max_entries=512, network_version=None, memory_only_fields=()):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_only_fields = tuple(memory_only_fields)
+        self.network_version = str(network_version) if network_version is not None else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending = {}
+        self._batches = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            self._open_disk(path)
+
+    # --- DISK TIER ---
+    def _open_disk(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, value TEXT)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'network_version'").fetchone()
+            stored_version = row[0] if row else None
+            if stored_version != self.network_version:
+                conn.execute("DELETE FROM routes")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('network_version', ?)",
+                    (self.network_version,)
+                )
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error:
+            # A read-only or corrupt cache file must never break routing
+            self._conn = None
+
+    def _disk_get(self, skey):
+        if self._conn is None:
+            return None
+        if skey in self._pending:
+            return json.loads(self._pending[skey])
+        try:
+            row = self._conn.execute("SELECT value FROM routes WHERE key = ?", (skey,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, skey, value):
+        if self._conn is None:
+            return
+        self._pending[skey] = json.dumps(value, separators=(",", ":"))
+        if not self._batches:
+            self._flush()
+
+    def _flush(self):
+        if self._conn is None or not self._pending:
+            return
+        rows = list(self._pending.items())
+        self._pending.clear()
+        try:
+            self._conn.executemany("INSERT OR REPLACE INTO routes (key, value) VALUES (?, ?)", rows)
+            self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    # --- PUBLIC API ---
+    def get(self, key):
+        """Return the cached result for `key`, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            value = self._disk_get(_serialize_key(key))
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self.memory_only_fields:
+                value = {k: v for k, v in value.items() if k not in self.memory_only_fields}
+            self._disk_put(_serialize_key(key), value)
+
+    @contextmanager
+    def batch(self):
+        """Hold disk writes until the outermost batch (of any thread) ends, then write them in one transaction."""
+        with self._lock:
+            self._batches += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batches -= 1
+                if not self._batches:
+                    self._flush()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def invalidate(self, network_version=None):
+        """Drop every entry. Optionally re-stamp the disk tier with a new network version."""
+        with self._lock:
+            self._memory.clear()
+            self._pending.clear()
+            if network_version is not None:
+                self.network_version = str(network_version)
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM routes")
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('network_version', ?)",
+                        (self.network_version,)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+
+class NegativeCache:
+    """
+    Failed route results, each forgotten `ttl_s[error_kind]` seconds after it was stored
+    (kinds without a TTL are not kept). Memory only: a restart retries every pair.
+    """
+
+    def __init__(self, ttl_s, max_entries=4096, clock=time.monotonic):
+        self.ttl_s = dict(ttl_s)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, key):
+        """The failed result stored for `key` while its TTL runs, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        ttl = self.ttl_s.get(result.get("error_kind"), 0)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Live entries per error kind, and hits."""
+        with self._lock:
+            now = self._clock()
+            kinds = {}
+            for expires_at, result in self._entries.values():
+                if expires_at > now:
+                    kinds[result.get("error_kind")] = kinds.get(result.get("error_kind"), 0) + 1
+            return {"entries": sum(kinds.values()), "kinds": kinds, "hits": self.hits}
@@ -1,30 +1,382 @@
-import streamlit as st
-import searoute as sr
-from geopy.distance import geodesic
-from config import DESTINATIONS, CO2_FACTORS, EXPORT_VOLUMES, PRODUCT_ORIGINS
+import concurrent.futures
+import functools
+import math
+import multiprocessing
+import threading
+import time
+from config import (
+    PRODUCT_ORIGINS, TRADE_PERIODS, AVAILABLE_RESTRICTIONS,
+    ROUTE_CACHE_PATH, ROUTE_CACHE_SIZE, ROUTE_MATRIX_PATH, ROUTING_ENGINE,
+    ROUTE_WORKERS, ROUTE_CALL_TIMEOUT_S, ROUTE_BATCH_BUDGET_S, ROUTE_NEGATIVE_TTL_S
+)
+from route_cache import RouteCache, NegativeCache, make_route_key, normalize_restrictions
+from route_matrix import load_route_matrix
+from passage_index import PassageIndex
+import perf
+from trade_data import get_trade_store
+
+from geodesy import route_length_km
+from route_geometry import build_lods
+from lane_results import GeometryBuffer, LaneRecord, RouteOption
+from emissions import build_emissions_frame, summarize_emissions, format_emissions_table
+
+# searoute is only needed for routes missing from the precomputed matrix
+try:
+    import searoute as sr
+except ImportError:
+    sr = None
+
+# The native one-to-many engine needs scipy on top of searoute's network data
+try:
+    from sea_network import get_sea_network
+except ImportError:
+    get_sea_network = None
+
+NETWORK_VERSION = sr.__version__ if sr is not None else None
+
+# Keyed on (origin, destination, normalized restriction set), so a scenario change
+# can never serve a stale route. The disk tier is wiped when searoute's network changes.
+_ROUTE_CACHE = RouteCache(
+    ROUTE_CACHE_PATH, ROUTE_CACHE_SIZE,
+    network_version=NETWORK_VERSION, memory_only_fields=("route_lods",)
+)
+
+# A matrix built against a different searoute network would serve outdated geometry
+_ROUTE_MATRIX = load_route_matrix(ROUTE_MATRIX_PATH)
+if _ROUTE_MATRIX is not None and NETWORK_VERSION is not None and _ROUTE_MATRIX.network_version != NETWORK_VERSION:
+    _ROUTE_MATRIX = None
+
+
+# Which passages every known route crosses, so a scenario change only re-routes affected pairs
+_PASSAGE_INDEX = PassageIndex()
+
+# Failed (pair, restriction set) results, so reruns skip the pairs that just failed
+_NEGATIVE_CACHE = NegativeCache(ROUTE_NEGATIVE_TTL_S, max_entries=ROUTE_CACHE_SIZE * 4)
+
+# --- ROUTING FAILURES ---
+# error_kind of a failed route result
+TIMEOUT = "timeout"      # the call timeout or the batch budget ran out
+NO_PATH = "no_path"      # no sea path under the restrictions
+BAD_INPUT = "bad_input"  # coordinates or passage names the router cannot take
+ERROR = "error"          # anything else, including searoute missing
+ERROR_KINDS = (TIMEOUT, NO_PATH, BAD_INPUT, ERROR)
+# May succeed on a retry, so the scenario cache never keeps results that have them
+TRANSIENT_ERRORS = frozenset([TIMEOUT, ERROR])
+
+
+def get_route_cache():
+    return _ROUTE_CACHE
+
+
+def get_negative_cache():
+    return _NEGATIVE_CACHE
+
+
+def _use_native_engine():
+    return ROUTING_ENGINE == "native" and get_sea_network is not None and sr is not None
+
+
+def _lookup_known_route(origin_coords, dest_coords, restrictions):
+    """
+    Resolve a route without searching: precomputed matrix, then the route cache, then a
+    route from another restriction set that the passage index proves is still optimal,
+    then a failure the negative cache still remembers.
+    Returns (result, source) with source in {"precomputed", "cached", "reused", "unroutable"},
+    or (None, None).
+    """
+    key = make_route_key(origin_coords, dest_coords, restrictions)
+
+    precomputed = _stored_route(origin_coords, dest_coords, restrictions, key, cache=False)
+    if precomputed is not None:
+        _PASSAGE_INDEX.record(key, precomputed)
+        return _with_error_kind(dict(precomputed)), "precomputed"
+
+    cached = _stored_route(origin_coords, dest_coords, restrictions, key, matrix=False)
+    if cached is not None:
+        _PASSAGE_INDEX.record(key, cached)
+        return dict(cached), "cached"
+
+    def fetch(routed_under):
+        return _stored_route(
+            origin_coords, dest_coords, sorted(routed_under),
+            make_route_key(origin_coords, dest_coords, routed_under),
+        )
+
+    reusable = _PASSAGE_INDEX.find_reusable(key, fetch)
+    if reusable is not None:
+        _ROUTE_CACHE.put(key, reusable)
+        _PASSAGE_INDEX.record(key, reusable)
+        return dict(reusable), "reused"
+
+    failed = _NEGATIVE_CACHE.get(key)
+    if failed is not None:
+        return dict(failed), "unroutable"
+    return None, None
+
+
+def _stored_route(origin_coords, dest_coords, restrictions, key, matrix=True, cache=True):
+    """The route stored for a pair in the precomputed matrix and/or the route cache, or None."""
+    if matrix and _ROUTE_MATRIX is not None:
+        precomputed = _ROUTE_MATRIX.lookup(origin_coords, dest_coords, restrictions)
+        if precomputed is not None:
+            _ensure_lods(precomputed)
+            return precomputed
+    if cache:
+        cached = _ROUTE_CACHE.get(key)
+        if cached is not None:
+            _ensure_lods(cached)
+            return cached
+    return None
+
+
+def _ensure_lods(result):
+    """Attach simplified render geometries once per stored result (never written to disk)."""
+    if result["success"] and "route_lods" not in result:
+        result["route_lods"] = build_lods(result["route_coords"])
+
+
+def _store_route(key, result):
+    if result["success"]:
+        _ROUTE_CACHE.put(key, result)
+        _ensure_lods(result)
+        _PASSAGE_INDEX.record(key, result)
+    else:
+        _NEGATIVE_CACHE.put(key, result)
 
 
-# REMOVED @st.cache_data TO FORCE UPDATES ON SCENARIO CHANGE
 def calculate_route_between_points(origin_coords, dest_coords, restrictions):
-    """Calculate route between two points with given restrictions."""
+    """Calculate route between two points with given restrictions (precomputed, then cached, then live)."""
+    return calculate_routes_from_origin(origin_coords, [dest_coords], restrictions)[0]
+
+
+def calculate_routes_from_origin(origin_coords, dest_coords_list, restrictions):
+    """
+    Route one origin to many destinations.
+    Misses are computed together: the native engine answers all of them with one search.
+    """
+    results = [_lookup_known_route(origin_coords, dest, restrictions)[0] for dest in dest_coords_list]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    restriction_list = sorted(normalize_restrictions(restrictions))
+    computed = _search_bounded((origin_coords, [dest_coords_list[i] for i in missing], restriction_list),
+                               ROUTE_CALL_TIMEOUT_S)
+
+    with _ROUTE_CACHE.batch():
+        for i, result in zip(missing, computed):
+            _store_route(make_route_key(origin_coords, dest_coords_list[i], restrictions), result)
+            results[i] = dict(result)
+    return results
+
+
+def _route_failure(error, kind=ERROR):
+    return {
+        "success": False,
+        "distance_nm": float('inf'),
+        "distance_km": float('inf'),
+        "route_coords": [],
+        "error": error,
+        "error_kind": kind
+    }
+
+
+def _with_error_kind(result):
+    """Tag a failed result of any engine with its kind; the engines report a missing path as "No route found"."""
+    if not result["success"] and not result.get("error_kind"):
+        result["error_kind"] = NO_PATH if result.get("error") == "No route found" else ERROR
+    return result
+
+
+def _valid_coords(coords):
     try:
-        route_geo = sr.searoute(
-            origin_coords,
-            dest_coords,
-            restrictions=restrictions
-        )
+        lon, lat = (float(c) for c in coords)
+    except (TypeError, ValueError):
+        return False
+    return math.isfinite(lon) and math.isfinite(lat) and -180 <= lon <= 180 and -90 <= lat <= 90
+
+
+def _search_missing(origin_coords, dest_coords_list, restrictions):
+    """
+    Live search for routes that are neither precomputed nor cached. Also runs inside pool workers.
+    Coordinates and passage names the router cannot take fail as BAD_INPUT without a search.
+    """
+    unknown = normalize_restrictions(restrictions) - set(AVAILABLE_RESTRICTIONS)
+    if unknown:
+        return [_route_failure(f"Unknown passages: {', '.join(sorted(unknown))}", BAD_INPUT) for _ in dest_coords_list]
+    if not _valid_coords(origin_coords):
+        return [_route_failure(f"Invalid origin coordinates: {origin_coords!r}", BAD_INPUT) for _ in dest_coords_list]
+
+    results = [
+        None if _valid_coords(dest) else _route_failure(f"Invalid destination coordinates: {dest!r}", BAD_INPUT)
+        for dest in dest_coords_list
+    ]
+    todo = [i for i, result in enumerate(results) if result is None]
+    if todo:
+        dests = [dest_coords_list[i] for i in todo]
+        if _use_native_engine():
+            found = _search_routes_native(origin_coords, dests, restrictions)
+        else:
+            found = [_search_route(origin_coords, dest, restrictions) for dest in dests]
+        for i, result in zip(todo, found):
+            results[i] = _with_error_kind(result)
+    return results
+
+
+def _search_routes_native(origin_coords, dest_coords_list, restrictions):
+    try:
+        return get_sea_network().route_many(origin_coords, dest_coords_list, restrictions)
+    except Exception as e:
+        return [_route_failure(str(e)) for _ in dest_coords_list]
+
+
+# --- LATENCY BUDGET ---
+# In-process searches run on these threads so the caller can stop waiting at the call
+# timeout; a search that overruns finishes in the background and its result is dropped
+_SEARCH_THREADS = None
+_SEARCH_THREADS_LOCK = threading.Lock()
+
+# searoute applies restrictions by setting them on its global network before each search,
+# so two in-process searches at once could route under each other's closures. One at a
+# time, including searches still running after their caller gave up on them.
+_SEAROUTE_LOCK = threading.Lock()
+
+
+def _get_search_threads():
+    global _SEARCH_THREADS
+    with _SEARCH_THREADS_LOCK:
+        if _SEARCH_THREADS is None:
+            _SEARCH_THREADS = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="route-search")
+        return _SEARCH_THREADS
+
+
+def _remaining(timeout, deadline):
+    """Seconds to wait on one search: the call timeout, cut short by the batch deadline (time.monotonic())."""
+    if deadline is None:
+        return timeout
+    left = deadline - time.monotonic()
+    return left if timeout is None else min(timeout, left)
+
+
+def _traced_search(trace, args):
+    perf.attach(trace)
+    try:
+        return _search_missing(*args)
+    finally:
+        perf.attach(None)
+
+
+def _search_bounded(args, timeout, deadline=None):
+    """
+    _search_missing(*args) given up after `timeout` seconds or at `deadline`, whichever
+    comes first. None when the deadline has already passed.
+    """
+    wait = _remaining(timeout, deadline)
+    if wait is not None and wait <= 0:
+        return None
+    future = _get_search_threads().submit(_traced_search, perf.current_trace(), args)
+    try:
+        return future.result(timeout=wait)
+    except concurrent.futures.TimeoutError:
+        # What it finds after we stop waiting is still stored, so the next batch looks it up
+        future.add_done_callback(functools.partial(_store_late, args))
+        return [_route_failure(f"Timed out after {wait:.3g}s", TIMEOUT) for _ in args[1]]
+    except Exception as e:
+        return [_route_failure(str(e)) for _ in args[1]]
 
-        if route_geo and 'geometry' in route_geo:
-            route_coords = route_geo['geometry']['coordinates']
+
+def _store_late(args, future):
+    """Store the results of a search whose caller gave up on it, once it finishes."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    origin_coords, dest_coords_list, restrictions = args
+    with _ROUTE_CACHE.batch():
+        for dest, result in zip(dest_coords_list, future.result()):
+            _store_route(make_route_key(origin_coords, dest, restrictions), result)
+
+
+# --- PARALLEL EXECUTION ---
+# Workers only run live searches; matrix/cache lookups and cache writes stay in this process.
+# "spawn" keeps the children clear of locks and SQLite handles held by Streamlit's threads.
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(workers):
+    global _POOL, _POOL_WORKERS
+    if _POOL is None or _POOL_WORKERS != workers:
+        if _POOL is not None:
+            _POOL.terminate()
+        _POOL = multiprocessing.get_context("spawn").Pool(workers)
+        _POOL_WORKERS = workers
+    return _POOL
+
+
+def shutdown_route_pool():
+    """Terminate the worker pool (e.g. after a timeout left a worker stuck)."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.terminate()
+        _POOL = None
+        _POOL_WORKERS = 0
+
+
+def _run_parallel(jobs, workers, timeout, deadline=None):
+    """
+    Run (origin_coords, dest_coords_list, restrictions) search jobs on a process pool.
+    Results come back in job order. A job still running `timeout` seconds after we start
+    waiting on it, or at `deadline`, fails with a timeout error; a job not done when the
+    deadline has passed gives None. Either way the pool is recycled so stuck workers die.
+    """
+    with _POOL_LOCK:
+        pool = _get_pool(workers)
+        pending = [pool.apply_async(_search_missing, job) for job in jobs]
+
+        outputs = []
+        timed_out = False
+        for job, handle in zip(jobs, pending):
+            wait = _remaining(timeout, deadline)
+            if wait is not None and wait <= 0 and not handle.ready():
+                timed_out = True
+                outputs.append(None)
+                continue
+            try:
+                outputs.append(handle.get(timeout=max(wait, 0) if wait is not None else None))
+            except multiprocessing.TimeoutError:
+                timed_out = True
+                outputs.append([_route_failure(f"Timed out after {wait:.3g}s", TIMEOUT) for _ in job[1]])
+            except Exception as e:
+                outputs.append([_route_failure(str(e)) for _ in job[1]])
+
+    if timed_out:
+        shutdown_route_pool()
+    return outputs
+
+
+def _search_route(origin_coords, dest_coords, restrictions):
+    if sr is None:
+        return _route_failure("searoute is not installed and the route is not in the precomputed matrix")
+
+    perf.count("searoute_calls")
+    try:
+        with _SEAROUTE_LOCK:
+            route_geo = sr.searoute(
+                origin_coords,
+                dest_coords,
+                restrictions=restrictions,
+                return_passages=True
+            )
+
+        # searoute reports an unreachable destination as an empty LineString
+        if route_geo and 'geometry' in route_geo and route_geo['geometry']['coordinates']:
+            route_coords = [list(c) for c in route_geo['geometry']['coordinates']]
             distance_km = route_geo.get('properties', {}).get('length', 0)
 
             if distance_km <= 0:
-                total_km = 0
-                for k in range(len(route_coords) - 1):
-                    start = (route_coords[k][1], route_coords[k][0])
-                    end = (route_coords[k + 1][1], route_coords[k + 1][0])
-                    total_km += geodesic(start, end).km
-                distance_km = total_km
+                perf.count("geodesic_fallbacks")
+                distance_km = route_length_km(route_coords)
 
             dist_nm = distance_km * 0.539957
 
@@ -33,111 +385,264 @@ def calculate_route_between_points(origin_coords, dest_coords, restrictions):
                 "distance_nm": dist_nm,
                 "distance_km": distance_km,
                 "route_coords": route_coords,
+                "passages": sorted(route_geo['properties'].get('traversed_passages', [])),
                 "error": None
             }
         else:
-            return {
-                "success": False,
-                "distance_nm": float('inf'),
-                "distance_km": float('inf'),
-                "route_coords": [],
-                "error": "No route found"
-            }
+            return _route_failure("No route found", NO_PATH)
+    except (TypeError, ValueError) as e:
+        return _route_failure(str(e), BAD_INPUT)
     except Exception as e:
-        return {
-            "success": False,
-            "distance_nm": float('inf'),
-            "distance_km": float('inf'),
-            "route_coords": [],
-            "error": str(e)
-        }
+        return _route_failure(str(e))
 
 
-def calculate_routes_for_product(selected_product, active_restrictions, active_origins):
-    results = []
-    product_volumes = EXPORT_VOLUMES.get(selected_product, {})
+def _product_lanes(selected_product, active_origins):
+    """Yield (dest_name, dest_coords, volume_kg, [(origin_name, origin_coords), ...]) for a product."""
+    store = get_trade_store()
+    product_volumes = store.destination_volumes(selected_product, TRADE_PERIODS)
 
     # Logic to handle Port Strikes (Origins)
     specialized_ports = PRODUCT_ORIGINS.get(selected_product, list(active_origins.keys()))
     valid_origin_names = [p for p in specialized_ports if p in active_origins]
 
-    for i, (dest_name, dest_coords) in enumerate(DESTINATIONS.items()):
-        volume_kg = product_volumes.get(dest_name, 0)
-
+    for dest_name, volume_kg in product_volumes.items():
         if volume_kg <= 0:
             continue
 
-        route_options = []
+        # Destinations without coordinates cannot be routed
+        dest_coords = store.destination_coords(dest_name)
+        if dest_coords is None:
+            continue
+
+        yield dest_name, dest_coords, volume_kg, [(o, active_origins[o]) for o in valid_origin_names]
 
-        for org_name in valid_origin_names:
-            org_coords = active_origins[org_name]
 
-            route_result = calculate_route_between_points(
-                org_coords,
-                dest_coords,
-                active_restrictions
-            )
+def _select_best_route(route_options):
+    best_route = None
+    shortest_distance = float('inf')
 
-            route_options.append({
-                "origin_name": org_name,
-                "origin_coords": org_coords,
-                "dest_name": dest_name,
-                "dest_coords": dest_coords,
-                "success": route_result["success"],
-                "distance_nm": route_result["distance_nm"],
-                "distance_km": route_result["distance_km"],
-                "route_coords": route_result["route_coords"],
-                "error": route_result["error"]
-            })
-
-        best_route = None
-        shortest_distance = float('inf')
-
-        for route in route_options:
-            if route["success"] and route["distance_nm"] < shortest_distance:
-                shortest_distance = route["distance_nm"]
-                best_route = route
-
-        if best_route:
-            best_data = {
-                **best_route,
-                "route_options": route_options,
-                "selected": True,
-                "volume_kg": volume_kg,
-                "volume_tons": volume_kg / 1000,
-                "product": selected_product
-            }
-            results.append(best_data)
+    for route in route_options:
+        if route["success"] and route["distance_nm"] < shortest_distance:
+            shortest_distance = route["distance_nm"]
+            best_route = route
+
+    return best_route
+
+
+def _assemble_product_routes(selected_product, active_origins, route_lookup, geometry, reference=None, stats=None,
+                             option_geometry=False, failures=None):
+    """
+    Pick the shortest successful origin for every destination, using route_lookup(org, dest) for distances.
+    Returns LaneRecords whose winning geometry is stored in `geometry` (a GeometryBuffer);
+    their route options keep geometry too only with option_geometry=True. Failed route
+    options are tallied by error kind into the `failures` dict when given.
+
+    `reference` is this product's result from a scenario with the same restrictions and a
+    superset of origins (e.g. the baseline of a port closure). Lanes whose best origin is
+    still open are carried over; only lanes served by a closed port are reselected.
+    """
+    results = []
+    reference_lanes = {lane.dest_name: lane for lane in reference} if reference is not None else None
+
+    for dest_name, dest_coords, volume_kg, origins in _product_lanes(selected_product, active_origins):
+        if reference_lanes is not None:
+            lane = reference_lanes.get(dest_name)
+            if lane is None:
+                # Unreachable with more ports open, so unreachable now
+                continue
+            open_names = {org_name for org_name, _ in origins}
+            route_options = [o for o in lane.route_options if o.origin_name in open_names]
+            _count_failures(failures, route_options)
+            if lane.origin_name in open_names:
+                _count(stats, "lanes_carried")
+                buffer, ranges = lane.geometry
+                results.append(LaneRecord(
+                    selected_product, lane.origin_name, lane.origin_coords, dest_name, dest_coords,
+                    lane, volume_kg, route_options, buffer, ranges
+                ))
+                continue
+            best_option = _select_best_route(route_options)
+            _count(stats, "lanes_reselected")
+            best_route = route_lookup(best_option.origin_coords, dest_coords) if best_option else None
+        else:
+            route_options = []
+            routes_by_origin = {}
+
+            for org_name, org_coords in origins:
+                route_result = route_lookup(org_coords, dest_coords)
+                routes_by_origin[org_name] = route_result
+                route_options.append(RouteOption(org_name, org_coords, route_result, geometry if option_geometry else None))
+            _count_failures(failures, route_options)
+
+            best_option = _select_best_route(route_options)
+            best_route = routes_by_origin[best_option.origin_name] if best_option else None
+
+        if best_option:
+            results.append(LaneRecord(
+                selected_product, best_option.origin_name, best_option.origin_coords, dest_name, dest_coords,
+                best_route, volume_kg, route_options, geometry
+            ))
 
     return results
 
 
+def _count(stats, name, n=1):
+    perf.count(name, n)
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + n
+
+
+def _count_failures(failures, route_options):
+    if failures is not None:
+        for option in route_options:
+            if not option.success:
+                kind = option.error_kind or ERROR
+                failures[kind] = failures.get(kind, 0) + 1
+
+
+def calculate_routes_for_product(selected_product, active_restrictions, active_origins):
+    scenarios = {"active": (active_restrictions, active_origins)}
+    return calculate_routes_batch([selected_product], scenarios)["active"][selected_product]
+
+
+# --- BATCH PLANNING ---
+def plan_route_requests(products, scenarios):
+    """
+    Collect the unique routing requests needed by every product in every scenario.
+
+    scenarios maps a scenario name to (restrictions, active_origins).
+    Returns {route_key: (origin_coords, dest_coords, restrictions)}; lanes that share an
+    origin, destination and restriction set (across products or scenarios) appear once.
+    """
+    requests = {}
+    for restrictions, active_origins in scenarios.values():
+        for product in products:
+            for _, dest_coords, _, origins in _product_lanes(product, active_origins):
+                for _, org_coords in origins:
+                    key = make_route_key(org_coords, dest_coords, restrictions)
+                    if key not in requests:
+                        requests[key] = (org_coords, dest_coords, sorted(key[2]))
+    return requests
+
+
+def calculate_routes_batch(products, scenarios, workers=ROUTE_WORKERS, timeout=ROUTE_CALL_TIMEOUT_S, stats=None,
+                           option_geometry=False, budget=ROUTE_BATCH_BUDGET_S, failures=None, deadline=None):
+    """
+    Route every product under every scenario, computing each unique request once.
+
+    Returns {scenario_name: {product: [LaneRecord, ...]}} with the same per-product
+    results calculate_routes_for_product would give. The lanes of a product share one
+    geometry buffer across scenarios; losing route options keep their geometry only with
+    option_geometry=True. With workers > 0 the live searches run on a process pool.
+    Each search is bounded by `timeout` seconds, and all of them by `budget` seconds from
+    the start of the batch: pairs left when it runs out fail as timeouts unsearched.
+    A `deadline` (a time.monotonic() value) replaces `budget`, for callers whose budget
+    started before the batch.
+
+    If `stats` is a dict it receives counts of routes that were precomputed, cached,
+    reused via the passage index, remembered as unroutable, recomputed or skipped by the
+    budget, and of lanes carried over or reselected. If `failures` is a dict it receives
+    {scenario_name: {product: {error kind: failed route options}}}.
+    """
+    if deadline is None and budget is not None:
+        deadline = time.monotonic() + budget
+    with perf.span("routing.plan"):
+        requests = plan_route_requests(products, scenarios)
+
+    # One search per (origin, restriction set) reaches all of its destinations
+    groups = {}
+    for key, (org, dest, restrictions) in requests.items():
+        groups.setdefault((key[0], key[2]), (org, restrictions, []))[2].append((key, dest))
+
+    # Smaller restriction sets first, so their routes can be reused for the larger ones
+    stages = {}
+    for (_, restriction_key), group in groups.items():
+        stages.setdefault(restriction_key, []).append(group)
+
+    computed = {}
+    # Every stage's cache writes reach the disk tier in one transaction, at the end
+    with _ROUTE_CACHE.batch():
+        for restriction_key in sorted(stages, key=lambda r: (len(r), sorted(r))):
+            with perf.span("routing.lookup"):
+                jobs = []
+                for org, restrictions, items in stages[restriction_key]:
+                    missing = []
+                    for key, dest in items:
+                        known, source = _lookup_known_route(org, dest, restrictions)
+                        if known is not None:
+                            computed[key] = known
+                            _count(stats, "routes_" + source)
+                        else:
+                            missing.append((key, dest))
+                    if not missing:
+                        continue
+                    if _use_native_engine():
+                        jobs.append((org, restrictions, missing))
+                    else:
+                        # searoute is one search per pair, so each pair is its own job and its own timeout
+                        jobs.extend((org, restrictions, [item]) for item in missing)
+
+            search_args = [(org, [dest for _, dest in missing], restrictions) for org, restrictions, missing in jobs]
+            perf.count("search_jobs", len(search_args))
+            with perf.span("routing.search", jobs=len(search_args)):
+                if workers and len(jobs) > 1:
+                    outputs = _run_parallel(search_args, workers, timeout, deadline)
+                else:
+                    outputs = [_search_bounded(args, timeout, deadline) for args in search_args]
+
+            with perf.span("routing.store"):
+                for (_, _, missing), routed in zip(jobs, outputs):
+                    if routed is None:
+                        # Never searched, so not remembered as unroutable either
+                        _count(stats, "routes_skipped", len(missing))
+                        for key, _ in missing:
+                            computed[key] = _route_failure("Routing budget spent", TIMEOUT)
+                        continue
+                    for (key, _), result in zip(missing, routed):
+                        _store_route(key, result)
+                        computed[key] = dict(result)
+                        _count(stats, "routes_recomputed")
+
+    # Scenarios with more open ports go first so port closures can start from their lanes
+    with perf.span("routing.assemble"):
+        results = {}
+        assembled = {}
+        geometry = {product: GeometryBuffer() for product in products}
+        for name, (restrictions, active_origins) in sorted(scenarios.items(), key=lambda item: -len(item[1][1])):
+            def lookup(org, dest, restrictions=restrictions):
+                return computed[make_route_key(org, dest, restrictions)]
+
+            restriction_key = normalize_restrictions(restrictions)
+            reference = assembled.get(restriction_key)
+            if reference is not None and not _origins_within(active_origins, reference[0]):
+                reference = None
+
+            results[name] = {}
+            for product in products:
+                product_failures = {}
+                results[name][product] = _assemble_product_routes(
+                    product, active_origins, lookup, geometry[product],
+                    reference=reference[1][product] if reference is not None else None,
+                    stats=stats, option_geometry=option_geometry, failures=product_failures
+                )
+                if failures is not None:
+                    failures.setdefault(name, {})[product] = product_failures
+            if reference is None:
+                assembled[restriction_key] = (active_origins, results[name])
+
+        for buffer in geometry.values():
+            buffer.freeze()
+
+    return {name: results[name] for name in scenarios}
+
+
+def _origins_within(origins, other):
+    """True when every origin in `origins` is also open, at the same coordinates, in `other`."""
+    return all(name in other and list(other[name]) == list(coords) for name, coords in origins.items())
+
+
 def calculate_total_emissions(route_results, selected_product):
-    emission_results = []
-    total_product_kg = 0
-    total_co2_kg = 0
-
-    avg_co2_per_kg = 0.0
-    co2_factor = CO2_FACTORS.get(selected_product, 0.00463)
-
-    for route in route_results:
-        if route.get("selected") and route.get("volume_kg", 0) > 0:
-            volume_tons = route["volume_tons"]
-            total_co2_for_route = route["distance_nm"] * co2_factor * volume_tons
-
-            emission_results.append({
-                "Destination": route["dest_name"],
-                "Origin": route["origin_name"],
-                "Distance (NM)": route["distance_nm"],
-                "Export Volume (kg)": route["volume_kg"],
-                "Export Volume (tons)": volume_tons,
-                "CO₂ Emissions (tons)": total_co2_for_route / 1000
-            })
-
-            total_product_kg += route["volume_kg"]
-            total_co2_kg += total_co2_for_route
-
-    if total_product_kg > 0:
-        avg_co2_per_kg = total_co2_kg / total_product_kg
-
-    return emission_results, avg_co2_per_kg, total_co2_kg, total_product_kg
\ No newline at end of file
+    """Emissions for one product's routes. Thin wrapper over the columnar engine in emissions.py."""
+    frame = build_emissions_frame({selected_product: route_results})
+    totals = summarize_emissions(frame)
+    return format_emissions_table(frame), totals["efficiency"], totals["co2_kg"], totals["volume_kg"]
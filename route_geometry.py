@@ -0,0 +1,69 @@
+# route_geometry.py
+"""
+Route polyline simplification for rendering.
+
+Douglas-Peucker in plain lon/lat degrees, precomputed at a few tolerances (levels of
+detail) per route. Only the drawn polyline is reduced; distances and emissions always
+come from the full geometry.
+"""
+import numpy as np
+from config import ROUTE_LOD_TOLERANCES_DEG, MAP_WIDTH_PX
+
+
+def simplify_coords(coords, tolerance_deg):
+    """Douglas-Peucker simplification; keeps both endpoints. Returns a [[lon, lat], ...] list."""
+    points = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if tolerance_deg <= 0 or len(points) < 3:
+        return points.tolist()
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        a, b = points[start], points[end]
+        inner = points[start + 1:end]
+        ab = b - a
+        length = np.hypot(ab[0], ab[1])
+        if length == 0:
+            dist = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            # Perpendicular distance of every inner point to the chord a-b
+            dist = np.abs(ab[0] * (inner[:, 1] - a[1]) - ab[1] * (inner[:, 0] - a[0])) / length
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_deg:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep].tolist()
+
+
+def build_lods(coords, tolerances=ROUTE_LOD_TOLERANCES_DEG):
+    """{tolerance_deg: simplified coords} for every positive tolerance."""
+    return {t: simplify_coords(coords, t) for t in tolerances if t > 0}
+
+
+def select_lod_tolerance(projection_scale, width_px=MAP_WIDTH_PX, tolerances=ROUTE_LOD_TOLERANCES_DEG):
+    """
+    Largest tolerance that stays below one screen pixel at this zoom.
+    A world map spans roughly 360 degrees over width_px * projection_scale pixels.
+    """
+    degrees_per_px = 360.0 / (width_px * max(projection_scale, 1e-6))
+    usable = [t for t in tolerances if t <= degrees_per_px]
+    return max(usable) if usable else 0.0
+
+
+def render_coords(route, tolerance_deg):
+    """The polyline to draw for a route result: its precomputed LOD, or the full geometry."""
+    if tolerance_deg > 0:
+        lod = (route.get('route_lods') or {}).get(tolerance_deg)
+        if lod is not None:
+            return lod
+    return route.get('route_coords', [])
@@ -0,0 +1,184 @@
+# route_matrix.py
+"""
+Precomputed origin x destination route matrix, one slice per restriction set.
+
+Build offline (needs searoute):
+    python route_matrix.py
+    python route_matrix.py --restrictions northwest,northeast,bering,suez --out data/custom.npz
+
+The file is a single .npz holding:
+    distance_km   (S, O, D) float64, inf where no route exists
+    coords        (N, 2)    float32, every route geometry concatenated
+    offsets       (S*O*D+1) int64, route i is coords[offsets[i]:offsets[i + 1]]
+    passage_bits  (S, O, D) int64, bit k set when the route crosses passage_names[k]
+plus the origin/destination coordinates, restriction keys and the searoute network version.
+"""
+import argparse
+import os
+import numpy as np
+from config import ORIGINS, DESTINATIONS, SCENARIO_RESTRICTIONS, ROUTE_MATRIX_PATH
+from route_cache import normalize_restrictions
+
+FORMAT_VERSION = 2
+
+
+def restriction_key(restrictions):
+    return ",".join(sorted(normalize_restrictions(restrictions)))
+
+
+def _coord_key(coords):
+    return round(float(coords[0]), 6), round(float(coords[1]), 6)
+
+
+class RouteMatrix:
+    """Read-only lookup over a loaded route matrix file."""
+
+    def __init__(self, arrays):
+        self.distance_km = arrays["distance_km"]
+        self.coords = arrays["coords"]
+        self.offsets = arrays["offsets"]
+        self.network_version = str(arrays["network_version"])
+        self.restriction_keys = [str(k) for k in arrays["restriction_keys"]]
+        self.passage_bits = arrays["passage_bits"]
+        self.passage_names = [str(p) for p in arrays["passage_names"]]
+
+        self._set_index = {k: i for i, k in enumerate(self.restriction_keys)}
+        self._origin_index = {_coord_key(c): i for i, c in enumerate(arrays["origin_coords"])}
+        self._dest_index = {_coord_key(c): i for i, c in enumerate(arrays["dest_coords"])}
+        self._results = {}
+
+    def lookup(self, origin_coords, dest_coords, restrictions):
+        """
+        Return the route result dict, or None when the request is outside the matrix.
+        The dict is built once per cell and shared between calls; callers copy before mutating.
+        """
+        s = self._set_index.get(restriction_key(restrictions))
+        o = self._origin_index.get(_coord_key(origin_coords))
+        d = self._dest_index.get(_coord_key(dest_coords))
+        if s is None or o is None or d is None:
+            return None
+
+        cell = (s, o, d)
+        if cell not in self._results:
+            self._results[cell] = self._build_result(s, o, d)
+        return self._results[cell]
+
+    def _build_result(self, s, o, d):
+
+        distance_km = float(self.distance_km[s, o, d])
+        if not np.isfinite(distance_km):
+            return {
+                "success": False,
+                "distance_nm": float('inf'),
+                "distance_km": float('inf'),
+                "route_coords": [],
+                "error": "No route found"
+            }
+
+        n_orig, n_dest = self.distance_km.shape[1:]
+        i = (s * n_orig + o) * n_dest + d
+        route_coords = self.coords[self.offsets[i]:self.offsets[i + 1]].astype(float).tolist()
+        bits = int(self.passage_bits[s, o, d])
+        passages = [name for k, name in enumerate(self.passage_names) if bits >> k & 1]
+
+        return {
+            "success": True,
+            "distance_nm": distance_km * 0.539957,
+            "distance_km": distance_km,
+            "route_coords": route_coords,
+            "passages": passages,
+            "error": None
+        }
+
+
+def load_route_matrix(path=ROUTE_MATRIX_PATH):
+    """Load a matrix file, or return None if it does not exist or is from another format version."""
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    if int(arrays.get("format_version", -1)) != FORMAT_VERSION:
+        return None
+    return RouteMatrix(arrays)
+
+
+def build_route_matrix(restriction_sets=None, path=ROUTE_MATRIX_PATH, origins=ORIGINS, destinations=DESTINATIONS, progress=None):
+    """
+    Route every origin x destination pair under each restriction set with searoute and save the result.
+    Defaults to the distinct restriction sets of the built-in scenarios.
+    """
+    import searoute as sr
+    from route_calculator import _search_route
+
+    if restriction_sets is None:
+        restriction_sets = SCENARIO_RESTRICTIONS.values()
+    keys = sorted({restriction_key(r) for r in restriction_sets})
+
+    origin_coords = np.array(list(origins.values()), dtype=float)
+    dest_coords = np.array(list(destinations.values()), dtype=float)
+    distance_km = np.full((len(keys), len(origin_coords), len(dest_coords)), np.inf)
+    passage_bits = np.zeros(distance_km.shape, dtype=np.int64)
+    passage_names = []
+    offsets = [0]
+    chunks = []
+
+    total = distance_km.size
+    for s, key in enumerate(keys):
+        restrictions = key.split(",") if key else []
+        for o, org in enumerate(origin_coords.tolist()):
+            for d, dest in enumerate(dest_coords.tolist()):
+                result = _search_route(org, dest, restrictions)
+                route = np.asarray(result["route_coords"], dtype=np.float32).reshape(-1, 2)
+                if result["success"]:
+                    distance_km[s, o, d] = result["distance_km"]
+                    for name in result.get("passages", []):
+                        if name not in passage_names:
+                            passage_names.append(name)
+                        passage_bits[s, o, d] |= 1 << passage_names.index(name)
+                chunks.append(route)
+                offsets.append(offsets[-1] + len(route))
+                if progress:
+                    progress(len(offsets) - 1, total)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(
+        path,
+        format_version=np.int64(FORMAT_VERSION),
+        network_version=np.str_(sr.__version__),
+        restriction_keys=np.array(keys, dtype=str),
+        origin_names=np.array(list(origins.keys()), dtype=str),
+        dest_names=np.array(list(destinations.keys()), dtype=str),
+        origin_coords=origin_coords,
+        dest_coords=dest_coords,
+        distance_km=distance_km,
+        coords=np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.float32),
+        offsets=np.array(offsets, dtype=np.int64),
+        passage_bits=passage_bits,
+        passage_names=np.array(passage_names, dtype=str)
+    )
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the origin x destination route matrix.")
+    parser.add_argument("--out", default=ROUTE_MATRIX_PATH, help="output .npz path")
+    parser.add_argument(
+        "--restrictions", action="append", default=None,
+        help="comma-separated restriction set; repeatable. Defaults to every built-in scenario"
+    )
+    args = parser.parse_args(argv)
+
+    restriction_sets = None
+    if args.restrictions:
+        restriction_sets = [[r for r in item.split(",") if r] for item in args.restrictions]
+
+    def progress(done, total):
+        print(f"\r{done}/{total} routes", end="", flush=True)
+
+    path = build_route_matrix(restriction_sets, args.out, progress=progress)
+    print(f"\nSaved {path} ({os.path.getsize(path) / 1024:,.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
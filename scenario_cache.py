@@ -0,0 +1,265 @@
+# scenario_cache.py
+"""
+Process-wide cache of assembled scenario results, shared by every dashboard session.
+
+Entries are one product's route results for one (restriction set, active origins)
+pair, exactly as calculate_routes_batch returns them. On top of them, scenario_result()
+keeps each built-in scenario's full run_scenario result (emissions, deltas, lanes), so
+views of a single product are slices of it. Cached results are shared between sessions
+and must be treated as read-only. Results with transient routing failures (timeouts,
+errors) are never kept, so a later rerun retries them.
+
+start_prewarm() fills both for the built-in scenarios on a background thread, so the
+first page load on a warm server routes and computes nothing.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from config import PRODUCTS, SCENARIO_RESTRICTIONS, SCENARIO_CACHE_SIZE, ROUTE_BATCH_BUDGET_S, INLAND_PORT_CHOICE
+from route_cache import normalize_restrictions
+from route_calculator import TRANSIENT_ERRORS, calculate_routes_batch
+import perf
+
+
+def make_scenario_key(restrictions, active_origins, product):
+    origins = tuple(sorted(
+        (name, tuple(round(float(c), 6) for c in coords)) for name, coords in active_origins.items()
+    ))
+    return normalize_restrictions(restrictions), origins, product
+
+
+def _approx_bytes(obj, seen):
+    """Deep size of nested dicts/lists/tuples and slotted records, counting shared objects once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_approx_bytes(k, seen) + _approx_bytes(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_approx_bytes(v, seen) for v in obj)
+    elif hasattr(type(obj), "__slots__"):
+        # Lane records and their geometry buffer (a NumPy array, counted with its data)
+        size += sum(_approx_bytes(getattr(obj, name, None), seen) for name in type(obj).__slots__)
+    return size
+
+
+class ScenarioCache:
+    """Bounded LRU of per-product route results, safe to share between threads."""
+
+    def __init__(self, max_entries=SCENARIO_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._sizes = {}
+        # Failed route options by error kind, per entry, as calculate_routes_batch reports them
+        self._failures = {}
+        self._lock = threading.Lock()
+        # One computation at a time: a session asking for what the prewarm is
+        # routing waits for it and then hits, instead of routing it again
+        self._compute_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key, value, failures):
+        size = _approx_bytes(value, set())
+        with self._lock:
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._failures[key] = failures
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                del self._sizes[evicted]
+                del self._failures[evicted]
+
+    def routes_batch(self, products, scenarios, stats=None, failures=None, budget=ROUTE_BATCH_BUDGET_S,
+                     **batch_options):
+        """
+        Drop-in for calculate_routes_batch: serves cached (scenario, product) results and
+        routes only the missing ones, in one batch; `stats` also counts the entries served
+        ("scenario_cache_hits"). Results with transient failures are
+        returned but not cached. `budget` covers the whole call, including any wait for a
+        computation already running (e.g. the prewarm); if that wait uses it up, only routes
+        that are already known are looked up and the rest fail as timeouts.
+        """
+        deadline = time.monotonic() + budget if budget is not None else None
+        products = list(products)
+        results = {name: {} for name in scenarios}
+        found = {name: {} for name in scenarios}
+        missing = self._fill(products, scenarios, results, found)
+        if stats is not None:
+            served = sum(len(by_product) for by_product in results.values())
+            stats["scenario_cache_hits"] = stats.get("scenario_cache_hits", 0) + served
+
+        if missing:
+            with perf.span("scenario_cache.compute"):
+                wait = -1 if deadline is None else max(deadline - time.monotonic(), 0)
+                locked = self._compute_lock.acquire(timeout=wait)
+                try:
+                    # Another session may have computed them while we waited
+                    before = sum(len(by_product) for by_product in results.values())
+                    missing = self._fill(products, scenarios, results, found, count=False)
+                    served = sum(len(by_product) for by_product in results.values()) - before
+                    if served:
+                        with self._lock:
+                            self.hits += served
+                            self.misses -= served
+                        perf.count("scenario_cache_hits", served)
+                        perf.count("scenario_cache_misses", -served)
+                        if stats is not None:
+                            stats["scenario_cache_hits"] += served
+                    if missing:
+                        self._compute(products, scenarios, missing, results, found, stats, deadline, batch_options)
+                finally:
+                    if locked:
+                        self._compute_lock.release()
+
+        if failures is not None:
+            for name in scenarios:
+                failures[name] = {product: found[name][product] for product in products}
+        return {name: {product: results[name][product] for product in products} for name in scenarios}
+
+    def _compute(self, products, scenarios, missing, results, found, stats, deadline, batch_options):
+        needed = sorted({p for product_names in missing.values() for p in product_names}, key=products.index)
+        computed_failures = {}
+        computed = calculate_routes_batch(
+            needed, {name: scenarios[name] for name in missing}, stats=stats,
+            failures=computed_failures, deadline=deadline, **batch_options
+        )
+        for name, product_names in missing.items():
+            restrictions, active_origins = scenarios[name]
+            for product in product_names:
+                results[name][product] = computed[name][product]
+                found[name][product] = computed_failures[name][product]
+                if not found[name][product].keys() & TRANSIENT_ERRORS:
+                    self._put(
+                        make_scenario_key(restrictions, active_origins, product),
+                        computed[name][product], found[name][product]
+                    )
+
+    def _fill(self, products, scenarios, results, failures, count=True):
+        """Copy cached entries into `results` and their failures into `failures`; return {scenario: [missing products]}."""
+        missing = {}
+        for name, (restrictions, active_origins) in scenarios.items():
+            for product in products:
+                if product in results[name]:
+                    continue
+                key = make_scenario_key(restrictions, active_origins, product)
+                value = self._get(key)
+                if value is not None:
+                    results[name][product] = value
+                    failures[name][product] = self._failures.get(key, {})
+                else:
+                    missing.setdefault(name, []).append(product)
+                if count:
+                    perf.count("scenario_cache_hits" if value is not None else "scenario_cache_misses")
+                    with self._lock:
+                        if value is not None:
+                            self.hits += 1
+                        else:
+                            self.misses += 1
+        return missing
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._failures.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "approx_bytes": sum(self._sizes.values()),
+                "scenario_results": len(_RESULTS),
+                "prewarm": _PREWARM_STATE["status"]
+            }
+
+
+_CACHE = ScenarioCache()
+# (scenario name, products, inland) -> run_scenario result; one entry per built-in scenario
+# and inland setting in practice
+_RESULTS = {}
+_RESULTS_LOCK = threading.Lock()
+_PREWARM_STATE = {"status": "idle", "thread": None}
+_PREWARM_LOCK = threading.Lock()
+
+
+def get_scenario_cache():
+    return _CACHE
+
+
+def scenario_result(name, products=PRODUCTS, stats=None, cache=None, inland=INLAND_PORT_CHOICE):
+    """
+    run_scenario(name, products, inland=inland) through the shared route cache, computed once per
+    process. Narrow it with scenarios.select_products rather than asking for fewer
+    products, which would compute a second result. A result with transient routing
+    failures is returned but computed again next time. `stats` gets the routing counts
+    of a computation, or "scenario_result_hits" when the stored result was returned.
+    """
+    from scenarios import run_scenario, routing_failures
+
+    key = (name, tuple(products), inland)
+    with _RESULTS_LOCK:
+        result = _RESULTS.get(key)
+    if result is not None:
+        perf.count("scenario_result_hits")
+        if stats is not None:
+            stats["scenario_result_hits"] = stats.get("scenario_result_hits", 0) + 1
+        return result
+
+    perf.count("scenario_result_misses")
+    result = run_scenario(name, products, stats=stats, cache=cache or _CACHE, inland=inland)
+    if any(routing_failures(result, key).keys() & TRANSIENT_ERRORS for key in ("current", "baseline")):
+        return result
+    with _RESULTS_LOCK:
+        # Two sessions may race to the first computation; keep the first result
+        return _RESULTS.setdefault(key, result)
+
+
+def prewarm(scenario_names=None, products=PRODUCTS, cache=None):
+    """Compute every built-in scenario (and the baseline) into the cache, then their results."""
+    from scenarios import BASELINE, scenario_definition
+
+    cache = cache or _CACHE
+    names = list(scenario_names or SCENARIO_RESTRICTIONS)
+    scenarios = {name: scenario_definition(name) for name in dict.fromkeys([BASELINE] + names)}
+    # One batch first, so lanes shared between scenarios are routed once; in the
+    # background, so without a budget (sessions waiting on it are bounded by their own)
+    cache.routes_batch(products, scenarios, budget=None)
+    for name in scenarios:
+        scenario_result(name, products, cache=cache)
+
+
+def _prewarm_worker(scenario_names, products):
+    try:
+        prewarm(scenario_names, products)
+        _PREWARM_STATE["status"] = "done"
+    except Exception as e:
+        # A failed prewarm only means sessions route on demand
+        _PREWARM_STATE["status"] = f"failed: {e}"
+
+
+def start_prewarm(scenario_names=None, products=PRODUCTS):
+    """Start the background prewarm once per process; later calls are no-ops."""
+    with _PREWARM_LOCK:
+        if _PREWARM_STATE["thread"] is not None:
+            return _PREWARM_STATE["thread"]
+        thread = threading.Thread(
+            target=_prewarm_worker, args=(scenario_names, products), name="scenario-prewarm", daemon=True
+        )
+        _PREWARM_STATE["status"] = "running"
+        _PREWARM_STATE["thread"] = thread
+        thread.start()
+        return thread
@@ -0,0 +1,335 @@
+# scenarios.py
+"""
+Headless scenario runner.
+
+Routes a scenario and the baseline for a set of products and reports what the
+dashboard shows: CO2, volume and efficiency with their deltas against the baseline,
+plus a per-lane comparison table. Lane volumes are allocated over ports within their
+throughput capacities (allocation.py), and volume no port can take is reported as
+unshipped. With inland legs, ports are chosen by the road or rail leg from the production
+regions plus the sea leg (inland.py), and the inland CO2 is reported next to the sea
+CO2. Imports neither Streamlit nor Plotly, so it can run from cron jobs and
+worker processes:
+
+    python scenarios.py --scenario "THE GREAT CANAL COLLAPSE" --out canal.json
+    python scenarios.py --restrict suez,panama --close-port "Santos Port (São Paulo)" --out custom.parquet
+"""
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import (
+    PRODUCTS, ORIGINS, BASELINE_RESTRICTIONS, SCENARIO_RESTRICTIONS, SCENARIO_CLOSED_PORTS, PORT_CAPACITY_KG,
+    ALLOCATION_OBJECTIVE, INLAND_PORT_CHOICE
+)
+from route_calculator import calculate_routes_batch, calculate_route_between_points
+from emissions import build_emissions_frame, summarize_emissions
+from allocation import UNSHIPPED_COLUMNS, INLAND_COLUMNS, Allocator, allocate_routes, shipped_lanes
+from inland import port_flows
+import perf
+
+BASELINE = "BUSINESS AS USUAL"
+
+LANE_COLUMNS = [
+    "product", "destination",
+    "origin_baseline", "origin_current",
+    "distance_km_baseline", "distance_km_current",
+    "volume_kg_baseline", "volume_kg_current",
+    "co2_kg_baseline", "co2_kg_current", "co2_kg_delta"
+]
+
+
+# --- SCENARIO DEFINITIONS ---
+def scenario_definition(name=None, restrictions=None, closed_ports=None):
+    """
+    (restrictions, active_origins) for a named scenario, optionally extended with extra
+    restricted passages and closed origin ports. With no name, starts from the baseline.
+    """
+    if name is not None and name not in SCENARIO_RESTRICTIONS:
+        raise ValueError(f"Unknown scenario: {name}")
+
+    active_restrictions = list(SCENARIO_RESTRICTIONS[name] if name is not None else BASELINE_RESTRICTIONS)
+    active_restrictions += [r for r in (restrictions or []) if r not in active_restrictions]
+
+    closed = set(SCENARIO_CLOSED_PORTS.get(name, [])) | set(closed_ports or [])
+    unknown = closed - set(ORIGINS)
+    if unknown:
+        raise ValueError(f"Unknown origin ports: {', '.join(sorted(unknown))}")
+    active_origins = {port: coords for port, coords in ORIGINS.items() if port not in closed}
+    return active_restrictions, active_origins
+
+
+# --- DELTAS ---
+def _delta(current, baseline):
+    diff = current - baseline
+    return {
+        "current": current,
+        "baseline": baseline,
+        "diff": diff,
+        "percent": diff / baseline * 100 if baseline > 0 else 0
+    }
+
+
+def compute_deltas(current_totals, baseline_totals):
+    """
+    Current-vs-baseline CO2 (kg), shipped volume (kg), efficiency (kg CO2 per kg cargo),
+    unshipped volume (kg) and inland-leg CO2 (kg).
+    """
+    return {
+        "co2_kg": _delta(current_totals["co2_kg"], baseline_totals["co2_kg"]),
+        "volume_kg": _delta(current_totals["volume_kg"], baseline_totals["volume_kg"]),
+        "efficiency": _delta(current_totals["efficiency"], baseline_totals["efficiency"]),
+        "unshipped_kg": _delta(current_totals["unshipped_kg"], baseline_totals["unshipped_kg"]),
+        "inland_co2_kg": _delta(current_totals["inland_co2_kg"], baseline_totals["inland_co2_kg"])
+    }
+
+
+def summarize(frame, unshipped, inland):
+    """summarize_emissions() of the shipped lanes, plus the unshipped volume (kg) and inland CO2 (kg)."""
+    totals = summarize_emissions(frame)
+    totals["unshipped_kg"] = float(unshipped["unshipped_kg"].sum())
+    totals["inland_co2_kg"] = float(inland["inland_co2_kg"].sum())
+    return totals
+
+
+def _per_lane(frame, keep):
+    """
+    One row per (product, destination): lanes split over several ports are merged, with
+    their origins joined by volume and the volume-weighted distance.
+    """
+    frame = frame[keep].astype({"product": object})
+    if not frame.duplicated(["product", "destination"]).any():
+        return frame
+    frame = frame.sort_values("volume_kg", ascending=False, kind="stable")
+    grouped = frame.assign(weighted_km=frame["distance_km"] * frame["volume_kg"]).groupby(
+        ["product", "destination"], sort=False
+    )
+    merged = grouped.agg(
+        origin=("origin", " + ".join), weighted_km=("weighted_km", "sum"),
+        volume_kg=("volume_kg", "sum"), co2_kg=("co2_kg", "sum")
+    ).reset_index()
+    merged["distance_km"] = merged["weighted_km"] / merged["volume_kg"]
+    return merged[keep]
+
+
+def lane_table(current_frame, baseline_frame):
+    """One row per (product, destination) served in either scenario, baseline next to current."""
+    keep = ["product", "destination", "origin", "distance_km", "volume_kg", "co2_kg"]
+    current = _per_lane(current_frame, keep)
+    baseline = _per_lane(baseline_frame, keep)
+    lanes = baseline.merge(current, on=["product", "destination"], how="outer", suffixes=("_baseline", "_current"))
+    lanes["co2_kg_delta"] = lanes["co2_kg_current"].fillna(0) - lanes["co2_kg_baseline"].fillna(0)
+    return lanes[LANE_COLUMNS].reset_index(drop=True)
+
+
+# --- RUNNER ---
+def run_scenario(name=None, products=PRODUCTS, restrictions=None, closed_ports=None, stats=None, cache=None,
+                 capacities=PORT_CAPACITY_KG, inland=INLAND_PORT_CHOICE):
+    """
+    Route the scenario and the baseline for `products` in one batch, through
+    `cache` (a scenario_cache.ScenarioCache) when given, and allocate their volumes
+    over ports within `capacities` (None ships every lane from its nearest port). With
+    `inland`, ports are chosen by inland plus sea cost from each production region.
+
+    Returns a dict with the scenario inputs, the raw route results ("routes") and their
+    failed route options by error kind ("failures"), the lanes as shipped after allocation,
+    one per product, port and destination ("shipped"), their emissions frames ("frames"),
+    the unshipped volume per lane ("unshipped"), the inland-leg CO2 per product ("inland"),
+    the totals and deltas, and the per-lane table.
+    """
+    products = list(products)
+    active_restrictions, active_origins = scenario_definition(name, restrictions, closed_ports)
+    baseline_restrictions, baseline_origins = scenario_definition(BASELINE)
+
+    routes_batch = cache.routes_batch if cache is not None else calculate_routes_batch
+    failures = {}
+    routes = routes_batch(products, {
+        "current": (active_restrictions, active_origins),
+        "baseline": (baseline_restrictions, baseline_origins)
+    }, stats=stats, failures=failures)
+
+    shipped, frames, unshipped, inland_co2 = {}, {}, {}, {}
+    side_restrictions = {"current": active_restrictions, "baseline": baseline_restrictions}
+    # This run's own, so its flows never depend on what other sessions solved before
+    allocator = Allocator()
+    for key in ("baseline", "current"):
+        def route_lookup(origin_coords, dest_coords, restrictions=side_restrictions[key]):
+            return calculate_route_between_points(origin_coords, dest_coords, restrictions)
+
+        if capacities is None and not inland:
+            shipped[key] = routes[key]
+            with perf.span("emissions"):
+                frames[key] = build_emissions_frame(routes[key])
+            unshipped[key] = pd.DataFrame(columns=UNSHIPPED_COLUMNS)
+            inland_co2[key] = pd.DataFrame(columns=INLAND_COLUMNS)
+        elif capacities is None:
+            # Every region through its best combined port: the min-plus composition of inland.py
+            with perf.span("inland"):
+                flows, inland_co2[key] = port_flows(routes[key], ALLOCATION_OBJECTIVE)
+                shipped[key] = shipped_lanes(routes[key], flows, route_lookup)
+            with perf.span("emissions"):
+                frames[key] = build_emissions_frame(shipped[key])
+            unshipped[key] = pd.DataFrame(columns=UNSHIPPED_COLUMNS)
+        else:
+            # The baseline goes first, so the scenario's solve starts from its flows
+            with perf.span("allocation"):
+                allocation = allocate_routes(
+                    routes[key], capacities, allocator=allocator, route_lookup=route_lookup, inland=inland
+                )
+            shipped[key] = allocation["routes"]
+            frames[key] = allocation["frame"]
+            unshipped[key] = allocation["unshipped"]
+            inland_co2[key] = allocation["inland"]
+
+    with perf.span("emissions"):
+        totals = {key: summarize(frames[key], unshipped[key], inland_co2[key]) for key in ("current", "baseline")}
+        deltas = compute_deltas(totals["current"], totals["baseline"])
+        lanes = lane_table(frames["current"], frames["baseline"])
+
+    return {
+        "scenario": name or "CUSTOM",
+        "products": products,
+        "restrictions": sorted(active_restrictions),
+        "active_origins": list(active_origins),
+        "routes": routes,
+        "failures": failures,
+        "shipped": shipped,
+        "frames": frames,
+        "unshipped": unshipped,
+        "inland": inland_co2,
+        "totals": totals,
+        "deltas": deltas,
+        "lanes": lanes
+    }
+
+
+def select_products(result, products):
+    """
+    A run_scenario result narrowed to `products`, without routing or rebuilding
+    emissions: route results, frames and lanes are filtered and the totals re-summed.
+    Equal to running the same scenario for just those products, except that the port
+    allocation stays the one of every product, which share port capacity.
+    """
+    products = list(products)
+    unknown = set(products) - set(result["products"])
+    if unknown:
+        raise ValueError(f"Products not in this result: {', '.join(sorted(unknown))}")
+
+    routes = {key: {p: by_product[p] for p in products} for key, by_product in result["routes"].items()}
+    failures = {key: {p: by_product[p] for p in products} for key, by_product in result["failures"].items()}
+    shipped = {key: {p: by_product[p] for p in products} for key, by_product in result["shipped"].items()}
+    frames = {
+        key: frame[frame["product"].isin(products)].reset_index(drop=True)
+        for key, frame in result["frames"].items()
+    }
+    unshipped = {
+        key: frame[frame["product"].isin(products)].reset_index(drop=True)
+        for key, frame in result["unshipped"].items()
+    }
+    inland_co2 = {
+        key: frame[frame["product"].isin(products)].reset_index(drop=True)
+        for key, frame in result["inland"].items()
+    }
+    totals = {key: summarize(frames[key], unshipped[key], inland_co2[key]) for key in frames}
+    lanes = result["lanes"]
+
+    return {
+        **result,
+        "products": products,
+        "routes": routes,
+        "failures": failures,
+        "shipped": shipped,
+        "frames": frames,
+        "unshipped": unshipped,
+        "inland": inland_co2,
+        "totals": totals,
+        "deltas": compute_deltas(totals["current"], totals["baseline"]),
+        "lanes": lanes[lanes["product"].isin(products)].reset_index(drop=True)
+    }
+
+
+def routing_failures(result, key="current"):
+    """Failed route options of one side of a result, by error kind, over all its products."""
+    counts = {}
+    for by_kind in result["failures"][key].values():
+        for kind, n in by_kind.items():
+            counts[kind] = counts.get(kind, 0) + n
+    return counts
+
+
+# --- OUTPUT ---
+def summary(result):
+    """The JSON-serializable part of a run_scenario result (no route geometry)."""
+    return {
+        **{key: result[key] for key in ("scenario", "products", "restrictions", "active_origins", "totals", "deltas")},
+        "routing_failures": routing_failures(result)
+    }
+
+
+def write_result(result, path, fmt=None):
+    """
+    Write a run_scenario result as JSON (summary, lanes, unshipped) or Parquet (lanes, with the
+    summary as JSON in the file's schema metadata). The format follows the extension
+    unless `fmt` is given.
+    """
+    fmt = fmt or ("parquet" if path.lower().endswith(".parquet") else "json")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if fmt == "parquet":
+        table = pa.Table.from_pandas(result["lanes"], preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"scenario_summary"] = json.dumps(summary(result)).encode()
+        pq.write_table(table.replace_schema_metadata(metadata), path)
+    elif fmt == "json":
+        lanes = result["lanes"].astype(object).where(result["lanes"].notna(), None)
+        with open(path, "w", encoding="utf-8") as f:
+            unshipped = result["unshipped"]["current"].astype(object).to_dict("records")
+            json.dump({**summary(result), "lanes": lanes.to_dict("records"), "unshipped": unshipped},
+                      f, ensure_ascii=False, indent=2)
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return path
+
+
+def read_summary(path):
+    """The summary dict stored in a Parquet file written by write_result."""
+    return json.loads(pq.read_schema(path).metadata[b"scenario_summary"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a routing scenario against the baseline without the dashboard.")
+    parser.add_argument("--scenario", choices=list(SCENARIO_RESTRICTIONS), default=None,
+                        help="built-in scenario; defaults to the baseline")
+    parser.add_argument("--product", action="append", default=None, help="product to route; repeatable. Defaults to all")
+    parser.add_argument("--restrict", action="append", default=[], help="comma-separated extra passages to close; repeatable")
+    parser.add_argument("--close-port", action="append", default=[], help="origin port to take offline; repeatable")
+    parser.add_argument("--out", required=True, help="output path (.json or .parquet)")
+    parser.add_argument("--format", choices=["json", "parquet"], default=None, help="overrides the extension")
+    parser.add_argument("--inland", action=argparse.BooleanOptionalAction, default=INLAND_PORT_CHOICE,
+                        help="choose ports by inland plus sea cost from the production regions")
+    args = parser.parse_args(argv)
+
+    restrictions = [r for item in args.restrict for r in item.split(",") if r]
+    stats = {}
+    result = run_scenario(args.scenario, args.product or PRODUCTS, restrictions, args.close_port, stats=stats,
+                          inland=args.inland)
+    write_result(result, args.out, args.format)
+
+    co2 = result["deltas"]["co2_kg"]
+    unshipped = result["totals"]["current"]["unshipped_kg"]
+    inland_co2 = result["totals"]["current"]["inland_co2_kg"]
+    print(f"{result['scenario']}: CO2 {co2['current'] / 1e9:,.2f} M t ({co2['percent']:+.1f}%), "
+          + (f"inland legs {inland_co2 / 1e9:,.2f} M t, " if args.inland else "")
+          + f"{unshipped / 1e9:,.1f} B kg unshipped, {len(result['lanes'])} lanes, "
+          + "".join(f"{n} {kind} failures, " for kind, n in routing_failures(result).items())
+          + f"{stats.get('routes_recomputed', 0)} routes recomputed -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
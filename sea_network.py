@@ -0,0 +1,187 @@
+# sea_network.py
+"""
+Native one-to-many maritime routing on searoute's marine network.
+
+The network is loaded once into a compressed sparse-row (CSR) adjacency.
+Every passage name (e.g. 'suez') becomes a boolean mask over the edges, so a
+restriction set is just the OR of a few masks. One Dijkstra run per origin
+reaches every destination, instead of one full search per origin/destination pair.
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from route_cache import normalize_restrictions
+
+# searoute measures route length with a mean Earth radius of 6371.0088 km
+EARTH_RADIUS_KM = 6371.0088
+
+# Weighted graphs kept per restriction set (about 0.4 MB each); sweeps touch hundreds of sets
+GRAPH_CACHE_SIZE = 32
+
+
+def _haversine_path_km(coords):
+    if len(coords) < 2:
+        return 0.0
+    lon = np.radians(coords[:, 0])
+    lat = np.radians(coords[:, 1])
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return float(np.sum(2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))) * EARTH_RADIUS_KM)
+
+
+def _normalize_longitudes(coords):
+    """Unwrap the antimeridian the way searoute does, so lines never jump across the map."""
+    out = coords.copy()
+    for i in range(1, len(out)):
+        step = out[i - 1, 0] - out[i, 0]
+        if step < -180:
+            out[i, 0] -= 360
+        elif step > 180:
+            out[i, 0] += 360
+    return out
+
+
+class SeaNetwork:
+    """CSR view of the marine network with per-passage edge masks."""
+
+    def __init__(self, node_coords, indptr, indices, weights, edge_passages, reported_passages=None):
+        self.node_coords = np.asarray(node_coords, dtype=float)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=float)
+
+        # Passage names become small integer codes; code 0 means "no passage"
+        self.passage_names = [""] + sorted({p for p in edge_passages if p})
+        codes = {name: i for i, name in enumerate(self.passage_names)}
+        self.edge_passage = np.array([codes.get(p or "", 0) for p in edge_passages], dtype=np.int16)
+        # Edge labels that count as traversed passages in results (default: all of them)
+        self.reported_passages = frozenset(reported_passages if reported_passages is not None else self.passage_names[1:])
+
+        self._graphs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_searoute(cls):
+        """Build the network from the marine graph bundled with searoute."""
+        from searoute.classes.passages import Passage
+        from searoute.data.marnet_dict import node_list, edge_list
+
+        nodes = list(node_list.keys())
+        node_index = {n: i for i, n in enumerate(nodes)}
+
+        indptr = [0]
+        indices, weights, passages = [], [], []
+        for u in nodes:
+            for v, attrs in edge_list.get(u, {}).items():
+                indices.append(node_index[v])
+                weights.append(attrs.get("weight", 0.0))
+                passages.append(attrs.get("passage"))
+            indptr.append(len(indices))
+
+        # searoute labels some edges with regions (e.g. 'pacific_ocean') it never reports as traversed
+        return cls(nodes, indptr, indices, weights, passages, reported_passages=Passage.valid_passages())
+
+    # --- RESTRICTIONS ---
+    def restriction_mask(self, restrictions):
+        """Boolean mask of the edges closed by `restrictions`.
+
+        Names that label no edge in the network (e.g. 'northeast', 'babelmandeb'
+        in this searoute release) mask nothing, exactly as in searoute itself.
+        """
+        codes = [self.passage_names.index(r) for r in normalize_restrictions(restrictions) if r in self.passage_names]
+        return np.isin(self.edge_passage, codes)
+
+    def effective_restrictions(self, restrictions):
+        """The subset of `restrictions` that closes at least one edge; equal subsets route identically."""
+        return frozenset(r for r in normalize_restrictions(restrictions) if r in self.passage_names[1:])
+
+    def _graph_for(self, restrictions):
+        key = normalize_restrictions(restrictions)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+            else:
+                # Closed edges stay in the structure at infinite cost, so every
+                # restriction set shares one indptr/indices layout
+                weights = np.where(self.restriction_mask(key), np.inf, self.weights)
+                n = len(self.node_coords)
+                graph = csr_matrix((weights, self.indices, self.indptr), shape=(n, n))
+                self._graphs[key] = graph
+                while len(self._graphs) > GRAPH_CACHE_SIZE:
+                    self._graphs.popitem(last=False)
+            return graph
+
+    # --- ROUTING ---
+    def nearest_node(self, coords):
+        """Closest network node in plain lon/lat distance (searoute's snapping rule)."""
+        d2 = np.sum((self.node_coords - np.asarray(coords, dtype=float)) ** 2, axis=1)
+        return int(np.argmin(d2))
+
+    def passages_on_path(self, path):
+        """Sorted names of the passages whose edges a node path traverses."""
+        found = set()
+        for u, v in zip(path[:-1], path[1:]):
+            start = self.indptr[u]
+            hit = np.nonzero(self.indices[start:self.indptr[u + 1]] == v)[0]
+            if len(hit):
+                code = self.edge_passage[start + hit[0]]
+                if code and self.passage_names[code] in self.reported_passages:
+                    found.add(self.passage_names[code])
+        return sorted(found)
+
+    def route_many(self, origin_coords, dest_coords_list, restrictions):
+        """
+        Route one origin to many destinations with a single shortest-path search.
+        Returns one result dict per destination, in the same shape as
+        route_calculator.calculate_route_between_points.
+        """
+        graph = self._graph_for(restrictions)
+        source = self.nearest_node(origin_coords)
+        dist, pred = dijkstra(graph, directed=True, indices=source, return_predecessors=True)
+
+        results = []
+        for dest_coords in dest_coords_list:
+            target = self.nearest_node(dest_coords)
+            if not np.isfinite(dist[target]):
+                results.append({
+                    "success": False,
+                    "distance_nm": float('inf'),
+                    "distance_km": float('inf'),
+                    "route_coords": [],
+                    "error": "No route found"
+                })
+                continue
+
+            path = [target]
+            while path[-1] != source:
+                path.append(int(pred[path[-1]]))
+            path.reverse()
+
+            coords = _normalize_longitudes(self.node_coords[path])
+            distance_km = _haversine_path_km(coords)
+            results.append({
+                "success": True,
+                "distance_nm": distance_km * 0.539957,
+                "distance_km": distance_km,
+                "route_coords": coords.tolist(),
+                "passages": self.passages_on_path(path),
+                "error": None
+            })
+        return results
+
+
+_NETWORK = None
+_NETWORK_LOCK = threading.Lock()
+
+
+def get_sea_network():
+    """Process-wide network, built on first use."""
+    global _NETWORK
+    with _NETWORK_LOCK:
+        if _NETWORK is None:
+            _NETWORK = SeaNetwork.from_searoute()
+        return _NETWORK
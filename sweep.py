@@ -0,0 +1,305 @@
+# sweep.py
+"""
+Chokepoint-closure sweep.
+
+Evaluates every combination of closures from SWEEP_PASSAGES (or a given list of
+restriction sets) for all products and ranks them by damage against the baseline.
+Every set is closed on top of BASELINE_RESTRICTIONS, as scenarios.py --restrict does,
+so the empty set ("BASELINE") is the network the dashboard shows and the reference
+row: damage is volume that can no longer be shipped, then added CO2. Volumes
+are allocated over ports within PORT_CAPACITY_KG as in the dashboard (allocation.py),
+so lost volume includes what no port has room for; --uncapped ranks nearest-port
+routing instead. Ports are chosen by the sea leg only: the ranking compares sea
+networks, so inland legs (INLAND_PORT_CHOICE) are left out whatever the default.
+
+Routing work is shared three ways:
+  * names that close no edge in the network ('northeast', 'babelmandeb' in this
+    searoute release) are dropped, so sets that differ only by them are routed once;
+  * sets are evaluated smallest first, in chunks through calculate_routes_batch, so
+    the passage index serves every lane whose path avoids the added closures;
+  * the remaining searches run on the routing process pool (--workers).
+
+Each evaluated set is appended to a JSONL checkpoint; rerunning the same command
+skips sets already in it.
+
+    python sweep.py --out sweep.csv
+    python sweep.py --passages suez,panama,gibraltar,malacca,ormuz --max-closed 3 --out top.parquet
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+
+import pandas as pd
+
+from config import AVAILABLE_RESTRICTIONS, BASELINE_RESTRICTIONS, PRODUCTS, ORIGINS, PORT_CAPACITY_KG
+from route_cache import normalize_restrictions
+from route_calculator import calculate_routes_batch, shutdown_route_pool, NETWORK_VERSION, get_sea_network
+from emissions import build_emissions_frame, summarize_emissions
+from allocation import Allocator, allocate_routes
+
+# Restriction sets per calculate_routes_batch call (and per checkpoint flush)
+SWEEP_CHUNK_SIZE = 32
+
+RANK_COLUMNS = [
+    "rank", "restrictions", "closed", "routed_as",
+    "volume_lost_kg", "co2_delta_kg", "co2_delta_pct", "lane_km_delta",
+    "co2_kg", "volume_kg", "lane_km", "tonne_km", "lanes"
+]
+
+
+# Passages the sweep combines by default: those the baseline leaves open
+SWEEP_PASSAGES = [p for p in AVAILABLE_RESTRICTIONS if p not in BASELINE_RESTRICTIONS]
+BASELINE_LABEL = "BASELINE"
+
+
+# --- RESTRICTION SETS ---
+# A sweep set is the closures added to BASELINE_RESTRICTIONS; keys and labels name only those
+def set_key(restrictions):
+    return ",".join(sorted(normalize_restrictions(restrictions)))
+
+
+def set_label(restrictions):
+    """The closures `restrictions` adds to the baseline, or BASELINE when it adds none."""
+    return set_key(added_closures(restrictions)) or BASELINE_LABEL
+
+
+def parse_set_key(key):
+    """The restriction set of a key or label."""
+    return frozenset() if key == BASELINE_LABEL else frozenset(r for r in key.split(",") if r)
+
+
+def added_closures(restrictions):
+    """The part of a restriction set beyond BASELINE_RESTRICTIONS."""
+    return normalize_restrictions(restrictions) - normalize_restrictions(BASELINE_RESTRICTIONS)
+
+
+def with_baseline(restrictions):
+    """The full restriction list a sweep set is routed with."""
+    return sorted(normalize_restrictions(restrictions) | normalize_restrictions(BASELINE_RESTRICTIONS))
+
+
+def power_set(passages=SWEEP_PASSAGES, max_closed=None):
+    """Every combination of `passages` (including none), smallest first."""
+    passages = sorted(normalize_restrictions(passages))
+    top = len(passages) if max_closed is None else min(max_closed, len(passages))
+    return [frozenset(c) for k in range(top + 1) for c in itertools.combinations(passages, k)]
+
+
+def effective_restrictions(restrictions):
+    """Drop names that close no network edge; without the native network, leave the set as is."""
+    if get_sea_network is None:
+        return normalize_restrictions(restrictions)
+    return get_sea_network().effective_restrictions(restrictions)
+
+
+# --- EVALUATION ---
+def _set_row(key, routes_by_product, products, capacities, allocator):
+    if capacities is None:
+        frame = build_emissions_frame(routes_by_product)
+    else:
+        frame = allocate_routes(routes_by_product, capacities, allocator=allocator, inland=False)["frame"]
+    totals = summarize_emissions(frame)
+    row = {
+        "restrictions": key,
+        "co2_kg": totals["co2_kg"],
+        "volume_kg": totals["volume_kg"],
+        "lane_km": float(frame["distance_km"].sum()),
+        "tonne_km": float((frame["distance_km"] * frame["volume_tons"]).sum()),
+        "lanes": totals["lanes"]
+    }
+    by_product = frame.groupby("product", observed=True)["co2_kg"].sum()
+    for product in products:
+        row[f"co2_kg[{product}]"] = float(by_product.get(product, 0.0))
+    return row
+
+
+def evaluate_sets(restriction_sets, products=PRODUCTS, workers=0, stats=None, capacities=PORT_CAPACITY_KG,
+                  allocator=None):
+    """
+    Route and total every restriction set (closed on top of the baseline) in one batch,
+    allocating volumes within `capacities` (None: nearest port). Returns {set_key: row}.
+    """
+    scenarios = {set_key(s): (with_baseline(s), ORIGINS) for s in restriction_sets}
+    # Offline: no page to keep responsive, so no batch budget (each search keeps its timeout)
+    routes = calculate_routes_batch(list(products), scenarios, workers=workers, stats=stats, budget=None)
+    allocator = allocator or Allocator()
+    return {key: _set_row(key, by_product, products, capacities, allocator) for key, by_product in routes.items()}
+
+
+# --- CHECKPOINT ---
+def _checkpoint_header(products, capacities):
+    return {
+        "checkpoint": "sweep", "products": list(products), "network_version": NETWORK_VERSION,
+        "baseline": with_baseline([]), "capacities": capacities
+    }
+
+
+def load_checkpoint(path, products, capacities=PORT_CAPACITY_KG):
+    """Rows already evaluated for these products and capacities on this network; {} if absent or stale."""
+    if not path or not os.path.exists(path):
+        return {}
+    rows = {}
+    with open(path, encoding="utf-8") as f:
+        lines = iter(f)
+        try:
+            header = json.loads(next(lines))
+        except (StopIteration, json.JSONDecodeError):
+            return {}
+        if header != _checkpoint_header(products, capacities):
+            return {}
+        for line in lines:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interruption; that set is simply evaluated again
+                continue
+            rows[row["restrictions"]] = row
+    return rows
+
+
+def _append_checkpoint(path, rows, products, capacities, fresh):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w" if fresh else "a", encoding="utf-8") as f:
+        if fresh:
+            f.write(json.dumps(_checkpoint_header(products, capacities)) + "\n")
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+# --- SWEEP ---
+def run_sweep(restriction_sets=None, products=PRODUCTS, workers=0, checkpoint=None,
+              chunk_size=SWEEP_CHUNK_SIZE, progress=None, stats=None, capacities=PORT_CAPACITY_KG):
+    """
+    Evaluate `restriction_sets` (default: the full power set of SWEEP_PASSAGES), each
+    closed on top of BASELINE_RESTRICTIONS, with volumes allocated within `capacities`
+    (None: nearest port) and return the ranked table (see rank_sweep). Baseline
+    passages in a set change nothing; the baseline itself is always evaluated.
+
+    progress(done, total, elapsed_s) is called after every chunk, counting distinct
+    routed sets. With `checkpoint`, finished sets are appended there and skipped on rerun.
+    """
+    products = list(products)
+    requested = [added_closures(s) for s in (restriction_sets if restriction_sets is not None else power_set())]
+    requested = list(dict.fromkeys([frozenset()] + requested))
+
+    routed_as = {s: added_closures(effective_restrictions(with_baseline(s))) for s in requested}
+    distinct = sorted(set(routed_as.values()), key=lambda s: (len(s), sorted(s)))
+
+    done = load_checkpoint(checkpoint, products, capacities)
+    fresh = not done
+    pending = [s for s in distinct if set_key(s) not in done]
+
+    # One warm start across the sweep: each set starts from the flows of the one before
+    allocator = Allocator()
+    start = time.perf_counter()
+    total = len(distinct)
+    if progress:
+        progress(total - len(pending), total, 0.0)
+
+    for i in range(0, len(pending), chunk_size):
+        rows = evaluate_sets(
+            pending[i:i + chunk_size], products, workers=workers, stats=stats, capacities=capacities, allocator=allocator
+        )
+        done.update(rows)
+        if checkpoint:
+            _append_checkpoint(checkpoint, rows.values(), products, capacities, fresh)
+            fresh = False
+        if progress:
+            progress(total - len(pending) + min(i + chunk_size, len(pending)), total, time.perf_counter() - start)
+
+    table = pd.DataFrame([
+        {**done[set_key(routed_as[s])], "restrictions": set_label(s), "routed_as": set_label(routed_as[s])}
+        for s in requested
+    ])
+    return rank_sweep(table)
+
+
+def rank_sweep(table):
+    """
+    Deltas against the BASELINE row, ranked most damaging first: lost volume
+    (lanes left without any route, or beyond port capacity), then added CO2.
+    """
+    reference = table.loc[table["restrictions"] == BASELINE_LABEL].iloc[0]
+    table = table.copy()
+    table["closed"] = table["restrictions"].map(lambda key: len(parse_set_key(key)))
+    table["volume_lost_kg"] = reference["volume_kg"] - table["volume_kg"]
+    table["co2_delta_kg"] = table["co2_kg"] - reference["co2_kg"]
+    table["co2_delta_pct"] = table["co2_delta_kg"] / reference["co2_kg"] * 100 if reference["co2_kg"] > 0 else 0.0
+    table["lane_km_delta"] = table["lane_km"] - reference["lane_km"]
+
+    table = table.sort_values(["volume_lost_kg", "co2_delta_kg", "closed"], ascending=[False, False, True], kind="stable")
+    table.insert(0, "rank", range(1, len(table) + 1))
+    extra = [c for c in table.columns if c not in RANK_COLUMNS]
+    return table[RANK_COLUMNS + extra].reset_index(drop=True)
+
+
+def write_table(table, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.lower().endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+    return path
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def print_progress(done, total, elapsed):
+    rate = elapsed / max(done, 1)
+    eta = _format_duration(rate * (total - done)) if elapsed > 0 else "--"
+    print(f"\r{done}/{total} restriction sets · {_format_duration(elapsed)} elapsed · ETA {eta}   ", end="", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank every combination of chokepoint closures by impact.")
+    parser.add_argument("--passages", default=",".join(SWEEP_PASSAGES),
+                        help="comma-separated passages to close on top of the baseline, in every combination "
+                             "(default: those the baseline leaves open)")
+    parser.add_argument("--max-closed", type=int, default=None, help="largest number of simultaneous closures")
+    parser.add_argument("--set", action="append", default=None,
+                        help="comma-separated restriction set to evaluate instead of the power set; repeatable")
+    parser.add_argument("--product", action="append", default=None, help="product to include; repeatable. Defaults to all")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="routing processes")
+    parser.add_argument("--checkpoint", default=None, help="JSONL checkpoint (default: <out>.progress.jsonl)")
+    parser.add_argument("--uncapped", action="store_true",
+                        help="ship every lane from its nearest port instead of allocating within PORT_CAPACITY_KG")
+    parser.add_argument("--out", required=True, help="ranked table (.csv or .parquet)")
+    parser.add_argument("--top", type=int, default=10, help="rows to print")
+    args = parser.parse_args(argv)
+
+    if args.set:
+        restriction_sets = [parse_set_key(item) for item in args.set]
+    else:
+        restriction_sets = power_set([p for p in args.passages.split(",") if p], args.max_closed)
+
+    stats = {}
+    try:
+        table = run_sweep(
+            restriction_sets, args.product or PRODUCTS,
+            workers=args.workers if args.workers > 1 else 0,
+            checkpoint=args.checkpoint or args.out + ".progress.jsonl",
+            progress=print_progress, stats=stats, capacities=None if args.uncapped else PORT_CAPACITY_KG
+        )
+    finally:
+        shutdown_route_pool()
+    print()
+
+    write_table(table, args.out)
+    reused = sum(stats.get(k, 0) for k in ("routes_precomputed", "routes_cached", "routes_reused"))
+    print(f"{len(table)} restriction sets -> {args.out} "
+          f"(routes reused: {reused}, recomputed: {stats.get('routes_recomputed', 0)})")
+    with pd.option_context("display.width", 160, "display.max_columns", 8):
+        print(table.head(args.top)[["rank", "restrictions", "volume_lost_kg", "co2_delta_kg", "co2_delta_pct"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# tests/test_allocation.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from allocation import Allocator, allocate_routes
+from benchmarks.synthetic import offline_routing
+from config import BASELINE_RESTRICTIONS, ORIGINS, PORT_CAPACITY_KG, PRODUCTS
+from route_calculator import calculate_routes_batch, calculate_route_between_points
+
+
+@pytest.fixture(scope="module")
+def routes():
+    with offline_routing():
+        yield calculate_routes_batch(PRODUCTS, {"baseline": (BASELINE_RESTRICTIONS, ORIGINS)}, workers=0)["baseline"]
+
+
+def _demand(routes):
+    return {
+        (lane["product"], lane["dest_name"]): lane["volume_kg"]
+        for lanes in routes.values() for lane in lanes if lane["volume_kg"] > 0
+    }
+
+
+def test_uncapped_ships_every_lane_from_its_nearest_port(routes):
+    allocation = allocate_routes(routes, capacities=None)
+    nearest = {(lane["product"], lane["dest_name"]): lane["origin_name"] for lanes in routes.values() for lane in lanes}
+    flows = allocation["flows"]
+    assert len(allocation["unshipped"]) == 0
+    assert all(nearest[(p, d)] == o for p, d, o in zip(flows["product"], flows["destination"], flows["origin"]))
+
+
+@pytest.mark.parametrize("share", [1.0, 0.5, 0.2])
+def test_capacities_respected_and_volume_conserved(routes, share):
+    capacities = {port: kg * share for port, kg in PORT_CAPACITY_KG.items()}
+    allocation = allocate_routes(routes, capacities)
+
+    ports = allocation["ports"]
+    assert (ports["load_kg"] <= ports["capacity_kg"] * (1 + 1e-6)).all()
+
+    shipped = allocation["flows"].groupby(["product", "destination"])["volume_kg"].sum()
+    unshipped = allocation["unshipped"].set_index(["product", "destination"])["unshipped_kg"]
+    for key, kg in _demand(routes).items():
+        assert shipped.get(key, 0.0) + unshipped.get(key, 0.0) == pytest.approx(kg, rel=1e-6)
+
+
+def test_shipped_lanes_match_flows(routes):
+    with offline_routing():
+        def lookup(origin_coords, dest_coords):
+            return calculate_route_between_points(origin_coords, dest_coords, BASELINE_RESTRICTIONS)
+
+        capacities = {port: kg * 0.2 for port, kg in PORT_CAPACITY_KG.items()}
+        allocation = allocate_routes(routes, capacities, route_lookup=lookup)
+
+    lanes = [lane for by_product in allocation["routes"].values() for lane in by_product]
+    keys = [(lane["product"], lane["dest_name"], lane["origin_name"]) for lane in lanes]
+    flows = allocation["flows"]
+    assert len(set(keys)) == len(keys) == len(flows)
+    assert sum(lane["volume_kg"] for lane in lanes) == pytest.approx(flows["volume_kg"].sum())
+    assert allocation["frame"]["co2_kg"].sum() > 0
+    assert all(len(lane["route_coords"]) > 0 for lane in lanes)
+    # lanes moved off their nearest port are drawn from the port they ship from
+    nearest = {(lane["product"], lane["dest_name"]): lane["origin_name"] for by_product in routes.values() for lane in by_product}
+    assert any(nearest[key[:2]] != key[2] for key in keys)
+    for lane in lanes:
+        assert np.allclose(lane["route_coords"][0], lane["origin_coords"])
+
+
+def test_default_solve_does_not_depend_on_earlier_solves(routes):
+    capacities = {port: kg * 0.5 for port, kg in PORT_CAPACITY_KG.items()}
+    first = allocate_routes(routes, capacities)["flows"]
+    warm = Allocator()
+    allocate_routes(routes, {port: kg * 0.2 for port, kg in PORT_CAPACITY_KG.items()}, allocator=warm)
+    allocate_routes(routes, capacities, allocator=warm)
+    again = allocate_routes(routes, capacities)["flows"]
+    pd.testing.assert_frame_equal(first, again)
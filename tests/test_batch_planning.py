@@ -0,0 +1,50 @@
+# tests/test_batch_planning.py
+from benchmarks.synthetic import FakeRouter, offline_routing
+from config import BASELINE_RESTRICTIONS, ORIGINS, PRODUCT_ORIGINS, PRODUCTS
+from route_cache import make_route_key
+from route_calculator import _product_lanes, calculate_routes_batch, plan_route_requests
+
+CLOSED = {port: coords for port, coords in ORIGINS.items() if port != "Santos Port (São Paulo)"}
+
+
+def _lane_pairs(products, scenarios):
+    """Every (origin, destination, restrictions) request of every lane, duplicates included."""
+    return [
+        make_route_key(org_coords, dest_coords, restrictions)
+        for restrictions, origins in scenarios.values()
+        for product in products
+        for _, dest_coords, _, lane_origins in _product_lanes(product, origins)
+        for _, org_coords in lane_origins
+    ]
+
+
+def test_requests_shared_between_products_and_scenarios_appear_once():
+    scenarios = {
+        "baseline": (BASELINE_RESTRICTIONS, ORIGINS),
+        # Same restrictions in another order, fewer ports: nothing new to route
+        "closure": (list(reversed(BASELINE_RESTRICTIONS)), CLOSED),
+        "canal": (BASELINE_RESTRICTIONS + ["suez", "panama"], ORIGINS)
+    }
+    requests = plan_route_requests(PRODUCTS, scenarios)
+    pairs = _lane_pairs(PRODUCTS, scenarios)
+
+    assert set(requests) == set(pairs)
+    assert len(requests) < len(pairs)
+    assert set(plan_route_requests(PRODUCTS, {k: scenarios[k] for k in ("baseline", "closure")})) == set(
+        plan_route_requests(PRODUCTS, {"baseline": scenarios["baseline"]})
+    )
+    for key, (org, dest, restrictions) in requests.items():
+        assert make_route_key(org, dest, restrictions) == key
+        assert restrictions == sorted(key[2])
+
+
+def test_a_batch_routes_every_unique_request_once():
+    scenarios = {"baseline": (BASELINE_RESTRICTIONS, ORIGINS), "closure": (BASELINE_RESTRICTIONS, CLOSED)}
+    with offline_routing(FakeRouter()) as router:
+        results = calculate_routes_batch(PRODUCTS, scenarios, workers=0)
+
+    assert router.routes == len(plan_route_requests(PRODUCTS, scenarios))
+    for name, (_, origins) in scenarios.items():
+        for product, lanes in results[name].items():
+            allowed = set(PRODUCT_ORIGINS.get(product, origins)) & set(origins)
+            assert all(lane["origin_name"] in allowed for lane in lanes)
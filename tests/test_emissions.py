@@ -0,0 +1,50 @@
+# tests/test_emissions.py
+import pytest
+
+from emissions import DEFAULT_CO2_FACTOR, build_emissions_frame, format_emissions_table, summarize_emissions
+
+
+def lane(product, dest, km, kg, selected=True):
+    return {"product": product, "origin_name": "Santos", "dest_name": dest, "distance_km": km,
+            "volume_kg": kg, "selected": selected}
+
+
+ROUTES = {
+    "Iron Ore": [lane("Iron Ore", "China", 20_000.0, 5_000_000.0), lane("Iron Ore", "Japan", 21_000.0, 0.0)],
+    "Beef": [lane("Beef", "UAE", 12_000.0, 250_000.0), lane("Beef", "Chile", 4_000.0, 9.0, selected=False)],
+    "Copper": [lane("Copper", "Korea", 18_000.0, 1_000.0)]
+}
+
+
+def test_co2_is_km_times_tonnes_times_factor():
+    frame = build_emissions_frame(ROUTES).set_index("destination")
+
+    assert list(frame.index) == ["China", "UAE", "Korea"]
+    # 20,000 km * 5,000 t * 0.00253 kg CO2e per tonne-km
+    assert frame.loc["China", "volume_tons"] == 5_000
+    assert frame.loc["China", "co2_kg"] == pytest.approx(20_000 * 5_000 * 0.00253)
+    assert frame.loc["UAE", "co2_kg"] == pytest.approx(12_000 * 250 * 0.01306)
+    assert frame.loc["Korea", "co2_factor"] == DEFAULT_CO2_FACTOR
+    assert frame.loc["Korea", "co2_kg"] == pytest.approx(18_000 * 1 * DEFAULT_CO2_FACTOR)
+    assert (frame["co2_tons"] == frame["co2_kg"] / 1000).all()
+    assert frame.loc["China", "distance_nm"] == pytest.approx(20_000 * 0.539957)
+
+
+def test_totals_and_intensity():
+    frame = build_emissions_frame(ROUTES)
+    totals = summarize_emissions(frame)
+    co2 = 20_000 * 5_000 * 0.00253 + 12_000 * 250 * 0.01306 + 18_000 * DEFAULT_CO2_FACTOR
+
+    assert totals["co2_kg"] == pytest.approx(co2)
+    assert totals["volume_kg"] == 5_251_000
+    assert totals["efficiency"] == pytest.approx(co2 / 5_251_000)
+    assert totals["lanes"] == 3
+    assert summarize_emissions(build_emissions_frame({}))["efficiency"] == 0.0
+
+
+def test_display_records():
+    records = format_emissions_table(build_emissions_frame(ROUTES), group_by_product=True)
+    assert records[0]["CO₂ Emissions (tons)"] == pytest.approx(20_000 * 5_000 * 0.00253 / 1000)
+    assert records[0]["Export Volume (tons)"] == 5_000
+    assert [r["product_group"] for r in records] == ["Iron Ore", "Beef", "Copper"]
+    assert "product_group" not in format_emissions_table(build_emissions_frame(ROUTES))[0]
@@ -0,0 +1,71 @@
+# tests/test_export.py
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.synthetic import offline_routing
+from export import GEOPARQUET_METADATA, export_bytes, export_scenarios
+from scenarios import LANE_COLUMNS, run_scenario
+
+
+@pytest.fixture(scope="module")
+def results():
+    with offline_routing():
+        yield [(name, run_scenario(name)) for name in (None, "TOTAL PORT BLACKOUT")]
+
+
+def _shipped(result):
+    return [lane for lanes in result["shipped"]["current"].values() for lane in lanes if lane["volume_kg"] > 0]
+
+
+def _read_wkb(blob):
+    order, kind, count = struct.unpack_from("<BII", blob)
+    assert (order, kind) == (1, 2)
+    return np.frombuffer(blob, dtype="<f8", offset=9, count=count * 2).reshape(-1, 2)
+
+
+def test_lane_table_round_trips(results, tmp_path):
+    path = tmp_path / "lanes.parquet"
+    counts = export_scenarios(results, lanes=path)
+    table = pq.read_table(path).to_pandas()
+
+    assert counts == {"scenarios": 2, "lanes": len(table), "routes": 0}
+    for label, result in results:
+        rows = table[table["scenario"] == (label or result["scenario"])].reset_index(drop=True)
+        pd.testing.assert_frame_equal(rows[LANE_COLUMNS], result["lanes"][LANE_COLUMNS], check_dtype=False)
+        assert (rows["restrictions"] == ",".join(result["restrictions"])).all()
+
+
+def test_geojsonl_round_trips(results):
+    _, result = results[1]
+    features = [json.loads(line) for line in export_bytes(result, "routes").decode("utf-8").splitlines()]
+    lanes = _shipped(result)
+    frame = result["frames"]["current"]
+
+    assert len(features) == len(lanes)
+    for feature, lane in zip(features, lanes):
+        props = feature["properties"]
+        assert (props["product"], props["origin"], props["destination"]) == (
+            lane["product"], lane["origin_name"], lane["dest_name"]
+        )
+        assert props["volume_kg"] == pytest.approx(lane["volume_kg"])
+        assert np.allclose(feature["geometry"]["coordinates"], lane["route_coords"])
+    # Split lanes export one row per port, so the file adds up to the scenario totals
+    assert sum(f["properties"]["volume_kg"] for f in features) == pytest.approx(frame["volume_kg"].sum())
+    assert sum(f["properties"]["co2_kg"] for f in features) == pytest.approx(frame["co2_kg"].sum())
+
+
+def test_geoparquet_round_trips(results, tmp_path):
+    path = tmp_path / "routes.parquet"
+    counts = export_scenarios(results, routes=path)
+    table = pq.read_table(path)
+
+    assert json.loads(table.schema.metadata[b"geo"]) == GEOPARQUET_METADATA
+    assert counts["routes"] == table.num_rows == sum(len(_shipped(result)) for _, result in results)
+    lanes = [lane for _, result in results for lane in _shipped(result)]
+    for blob, lane in zip(table.column("geometry").to_pylist(), lanes):
+        assert np.allclose(_read_wkb(blob), lane["route_coords"])
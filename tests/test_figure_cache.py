@@ -0,0 +1,64 @@
+# tests/test_figure_cache.py
+import json
+
+import plotly.graph_objects as go
+import plotly.io as pio
+import plotly.tools
+import pytest
+
+import figure_cache
+from figure_cache import FigureCache, SerializedFigure, cached_figure
+
+
+def bar_chart(values, title="volumes"):
+    bar_chart.builds += 1
+    return go.Figure(go.Bar(y=values), layout={"title": title})
+
+
+bar_chart.builds = 0
+
+
+@pytest.fixture(autouse=True)
+def reset_builds():
+    bar_chart.builds = 0
+
+
+def test_a_hit_serves_the_stored_dict_without_parsing(monkeypatch):
+    cache = FigureCache()
+    built = cached_figure(bar_chart, [1, 2, 3], cache=cache)
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("a hit parsed JSON")
+
+    monkeypatch.setattr(figure_cache.json, "loads", no_parsing)
+    first = cached_figure(bar_chart, [1, 2, 3], cache=cache)
+    second = cached_figure(bar_chart, [1, 2, 3], cache=cache)
+    monkeypatch.undo()
+
+    assert bar_chart.builds == 1
+    assert isinstance(first, SerializedFigure)
+    assert first.to_dict() is second.to_dict()
+    # What st.plotly_chart reads and sends
+    assert plotly.tools.return_figure_from_figure_or_data(first, validate_figure=True) is first.to_dict()
+    assert json.loads(pio.to_json(first, validate=False)) == json.loads(pio.to_json(built, validate=False))
+
+
+def test_other_inputs_build_again():
+    cache = FigureCache()
+    cached_figure(bar_chart, [1, 2, 3], cache=cache)
+    cached_figure(bar_chart, [1, 2, 4], cache=cache)
+    cached_figure(bar_chart, [1, 2, 3], title="other", cache=cache)
+    assert bar_chart.builds == 3
+
+
+def test_entries_are_bounded_by_json_size():
+    cache = FigureCache(max_bytes=100)
+    cache.put("a", {"a": 1}, 60)
+    cache.put("b", {"b": 1}, 30)
+    cache.get("a")
+    cache.put("c", {"c": 1}, 30)
+    cache.put("huge", {}, 101)
+
+    assert cache.get("b") is None and cache.get("huge") is None
+    assert cache.get("a") == {"a": 1} and cache.get("c") == {"c": 1}
+    assert cache.stats()["bytes"] == 90
@@ -0,0 +1,42 @@
+# tests/test_geodesy.py
+import numpy as np
+import pytest
+
+from geodesy import route_length_km, route_lengths_km, segment_lengths_km
+
+geodesic = pytest.importorskip("geopy.distance").geodesic
+
+
+def test_segments_match_geopy_within_a_millimetre():
+    rng = np.random.default_rng(0)
+    lon1, lon2 = rng.uniform(-180, 180, (2, 500))
+    lat1, lat2 = rng.uniform(-80, 80, (2, 500))
+    # Dateline crossings, equatorial, meridional and zero-length segments
+    lon1 = np.r_[lon1, 179.5, -30.0, 10.0, 5.0]
+    lon2 = np.r_[lon2, -179.5, 30.0, 10.0, 5.0]
+    lat1 = np.r_[lat1, 10.0, 0.0, -60.0, 45.0]
+    lat2 = np.r_[lat2, 12.0, 0.0, 70.0, 45.0]
+
+    km = segment_lengths_km(lon1, lat1, lon2, lat2)
+    expected = np.array([geodesic((a, b), (c, d)).km for a, b, c, d in zip(lat1, lon1, lat2, lon2)])
+    assert np.abs(km - expected).max() < 1e-6
+
+
+def test_near_antipodal_segments_fall_back_within_half_a_percent():
+    km = segment_lengths_km([0.0], [0.0], [179.7], [0.3])
+    expected = geodesic((0.0, 0.0), (0.3, 179.7)).km
+    assert abs(km[0] - expected) / expected < 0.005
+
+
+def test_route_lengths_sum_each_route_on_its_own():
+    routes = [
+        [[-46.3, -24.0], [-30.0, -10.0], [4.4, 51.9]],
+        [[121.5, 31.2]],
+        [],
+        [[-44.4, -2.6], [-20.0, 0.0]]
+    ]
+    expected = [
+        sum(geodesic((a[1], a[0]), (b[1], b[0])).km for a, b in zip(route, route[1:])) for route in routes
+    ]
+    assert np.allclose(route_lengths_km(routes), expected, atol=1e-6)
+    assert [route_length_km(route) for route in routes] == pytest.approx(expected, abs=1e-6)
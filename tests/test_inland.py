@@ -0,0 +1,75 @@
+# tests/test_inland.py
+import numpy as np
+import pytest
+
+from allocation import allocate_routes
+from benchmarks.synthetic import offline_routing
+from config import BASELINE_RESTRICTIONS, INLAND_RAIL_LINKS, ORIGINS, PORT_CAPACITY_KG, PRODUCTION_REGIONS, PRODUCTS
+from inland import inland_legs, min_plus, port_flows, sea_legs
+from route_calculator import calculate_routes_batch
+
+
+@pytest.fixture(scope="module")
+def routes():
+    with offline_routing():
+        yield calculate_routes_batch(PRODUCTS, {"baseline": (BASELINE_RESTRICTIONS, ORIGINS)}, workers=0)["baseline"]
+
+
+def test_rail_only_on_linked_pairs():
+    regions, ports = list(PRODUCTION_REGIONS), list(ORIGINS)
+    _, _, mode = inland_legs(regions, ports)
+    links = set(INLAND_RAIL_LINKS)
+    for r, region in enumerate(regions):
+        for p, port in enumerate(ports):
+            assert mode[r, p] == "road" or (region, port) in links
+
+
+def test_sea_legs_read_successful_options(routes):
+    lanes = routes["Soybean"]
+    ports = list(ORIGINS)
+    km, destinations = sea_legs(lanes, ports)
+    assert destinations == [lane["dest_name"] for lane in lanes]
+    for j, lane in enumerate(lanes):
+        expected = np.full(len(ports), np.inf)
+        for option in lane["route_options"]:
+            if option["success"]:
+                expected[ports.index(option["origin_name"])] = option["distance_km"]
+        assert np.array_equal(km[:, j], expected)
+
+
+def test_min_plus_matches_brute_force():
+    rng = np.random.default_rng(0)
+    a, b = rng.uniform(0, 10, (7, 5)), rng.uniform(0, 10, (5, 3))
+    b[2, 1] = np.inf
+    cost, arg = min_plus(a, b, max_cells=20)
+    brute = a[:, :, None] + b[None, :, :]
+    assert np.allclose(cost, brute.min(axis=1))
+    assert np.array_equal(arg, brute.argmin(axis=1))
+
+
+def test_allocation_without_capacity_limits_matches_the_min_plus_choice(routes):
+    flows, inland_co2 = port_flows(routes)
+    allocation = allocate_routes(routes, {port: np.inf for port in PORT_CAPACITY_KG}, inland=True)
+
+    key = ["product", "origin", "destination"]
+    expected = flows.set_index(key)["volume_kg"].sort_index()
+    allocated = allocation["flows"].set_index(key)["volume_kg"].sort_index()
+    assert expected.index.equals(allocated.index)
+    assert np.allclose(allocated, expected)
+    assert np.allclose(allocation["inland"].set_index("product")["inland_co2_kg"].sort_index(),
+                       inland_co2.set_index("product")["inland_co2_kg"].sort_index())
+
+
+def test_inland_choice_keeps_volume_within_capacity(routes):
+    capacities = {port: kg * 0.5 for port, kg in PORT_CAPACITY_KG.items()}
+    allocation = allocate_routes(routes, capacities, inland=True)
+    demand = sum(lane["volume_kg"] for lanes in routes.values() for lane in lanes)
+    shipped = allocation["flows"]["volume_kg"].sum()
+    assert shipped + allocation["unshipped"]["unshipped_kg"].sum() == pytest.approx(demand)
+    assert not allocation["flows"].duplicated(["product", "origin", "destination"]).any()
+    assert (allocation["ports"]["load_kg"] <= allocation["ports"]["capacity_kg"] * (1 + 1e-9)).all()
+    assert allocation["inland"]["inland_co2_kg"].sum() > 0
+
+
+def test_sea_only_choice_reports_no_inland_co2(routes):
+    assert allocate_routes(routes, inland=False)["inland"].empty
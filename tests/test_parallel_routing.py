@@ -0,0 +1,46 @@
+# tests/test_parallel_routing.py
+import time
+
+import pytest
+
+import route_calculator
+from route_calculator import TIMEOUT, _run_parallel, shutdown_route_pool
+
+
+def sleepy_search(origin_coords, dest_coords_list, restrictions):
+    """Stand-in for _search_missing in the pool's workers: sleeps origin_coords[0] seconds, fails on a negative one."""
+    if origin_coords[0] < 0:
+        raise ValueError("bad origin")
+    time.sleep(origin_coords[0])
+    return [{"success": True, "distance_km": float(origin_coords[0]), "route_coords": [], "error": None}
+            for _ in dest_coords_list]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(route_calculator, "_search_missing", sleepy_search)
+    # Start the workers first, so the timeouts below measure searches, not process start-up
+    _run_parallel([((0, 0), [(1, 1)], []), ((0, 0), [(1, 1)], [])], 2, None)
+    yield
+    shutdown_route_pool()
+
+
+def test_a_hung_job_times_out_alone_and_order_is_kept(pool):
+    jobs = [((0, 0), [(1, 1)], []), ((60, 0), [(1, 1), (2, 2)], []), ((0.2, 0), [(1, 1)], []), ((-1, 0), [(1, 1)], [])]
+    started = time.monotonic()
+    outputs = _run_parallel(jobs, 2, timeout=1)
+
+    assert time.monotonic() - started < 10
+    assert outputs[0][0]["success"] and outputs[0][0]["distance_km"] == 0
+    assert [r["error_kind"] for r in outputs[1]] == [TIMEOUT, TIMEOUT]
+    assert not any(r["success"] for r in outputs[1])
+    assert outputs[2][0]["distance_km"] == 0.2
+    assert not outputs[3][0]["success"] and "bad origin" in outputs[3][0]["error"]
+    # The stuck worker's pool was recycled
+    assert route_calculator._POOL is None
+
+
+def test_jobs_not_done_at_the_deadline_are_not_searched(pool):
+    outputs = _run_parallel([((30, 0), [(1, 1)], [])], 2, timeout=60, deadline=time.monotonic() - 1)
+    assert outputs == [None]
+    assert route_calculator._POOL is None
@@ -0,0 +1,65 @@
+# tests/test_passage_index.py
+import pytest
+
+import route_calculator
+from benchmarks.synthetic import FakeRouter, offline_routing
+from passage_index import PassageIndex
+from route_cache import make_route_key
+
+ORIGIN = (-46.3, -24.0)
+VIA_SUEZ = (121.5, 31.2)
+VIA_GOOD_HOPE = (4.4, 51.9)
+
+
+class PassageRouter(FakeRouter):
+    """FakeRouter that reports Suez on the way to VIA_SUEZ."""
+
+    def __call__(self, origin_coords, dest_coords_list, restrictions):
+        results = super().__call__(origin_coords, dest_coords_list, restrictions)
+        for dest, result in zip(dest_coords_list, results):
+            if tuple(dest) == VIA_SUEZ and "suez" not in restrictions:
+                result["passages"] = ["suez"]
+        return results
+
+
+def _route(passages):
+    return {"success": True, "route_coords": [[0, 0], [1, 1]], "passages": passages}
+
+
+def test_reuse_needs_a_superset_that_avoids_the_route():
+    index = PassageIndex()
+    stored = _route(["gibraltar"])
+    index.record(make_route_key(ORIGIN, VIA_GOOD_HOPE, ["northwest"]), stored)
+
+    def fetch(routed_under):
+        assert routed_under == frozenset(["northwest"])
+        return stored
+
+    assert index.find_reusable(make_route_key(ORIGIN, VIA_GOOD_HOPE, ["northwest", "suez"]), fetch) is stored
+    # the route crosses the newly closed passage
+    assert index.find_reusable(make_route_key(ORIGIN, VIA_GOOD_HOPE, ["northwest", "gibraltar"]), fetch) is None
+    # fewer closures may open a shorter path
+    assert index.find_reusable(make_route_key(ORIGIN, VIA_GOOD_HOPE, []), fetch) is None
+    assert index.find_reusable(make_route_key(ORIGIN, VIA_SUEZ, ["northwest", "suez"]), fetch) is None
+
+
+def test_index_keeps_passages_only_and_drops_evicted_routes():
+    index = PassageIndex()
+    index.record(make_route_key(ORIGIN, VIA_GOOD_HOPE, []), _route([]))
+    assert list(index._entries.values()) == [{frozenset(): frozenset()}]
+
+    assert index.find_reusable(make_route_key(ORIGIN, VIA_GOOD_HOPE, ["suez"]), lambda routed_under: None) is None
+    assert len(index) == 0
+
+
+@pytest.mark.parametrize("closed, searched", [(["panama"], 0), (["suez"], 1)])
+def test_only_routes_through_a_newly_closed_passage_are_searched_again(closed, searched):
+    with offline_routing(PassageRouter()) as router:
+        route_calculator.calculate_routes_from_origin(ORIGIN, [VIA_SUEZ, VIA_GOOD_HOPE], [])
+        routes = router.routes
+
+        results = route_calculator.calculate_routes_from_origin(ORIGIN, [VIA_SUEZ, VIA_GOOD_HOPE], closed)
+
+        assert router.routes - routes == searched
+        assert "suez" not in results[0]["passages"] or "suez" not in closed
+        assert len(route_calculator._PASSAGE_INDEX) == 4
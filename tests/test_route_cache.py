@@ -0,0 +1,76 @@
+# tests/test_route_cache.py
+import route_calculator
+from benchmarks.synthetic import offline_routing
+from config import BASELINE_RESTRICTIONS, ORIGINS
+from route_cache import RouteCache, make_route_key
+from route_calculator import calculate_routes_batch
+
+KEY = make_route_key((-46.3, -24.0), (121.5, 31.2), ["suez"])
+ROUTE = {"success": True, "distance_km": 20_000.0, "route_coords": [[-46.3, -24.0], [121.5, 31.2]],
+         "passages": [], "route_lods": {"low": []}}
+
+
+def test_routes_survive_a_restart_without_memory_only_fields(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    RouteCache(path, network_version="v1", memory_only_fields=("route_lods",)).put(KEY, ROUTE)
+
+    restarted = RouteCache(path, network_version="v1")
+    assert restarted.get(KEY) == {k: v for k, v in ROUTE.items() if k != "route_lods"}
+    assert restarted.disk_hits == 1
+
+
+def test_a_new_network_version_empties_the_disk_tier(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    RouteCache(path, network_version="v1").put(KEY, ROUTE)
+
+    assert RouteCache(path, network_version="v2").get(KEY) is None
+    # and the old version's routes are gone for good
+    assert RouteCache(path, network_version="v1").get(KEY) is None
+
+
+def test_invalidate_restamps_the_disk_tier(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    cache = RouteCache(path, network_version="v1")
+    cache.put(KEY, ROUTE)
+    cache.invalidate(network_version="v2")
+
+    assert cache.get(KEY) is None
+    cache.put(KEY, ROUTE)
+    assert RouteCache(path, network_version="v2").get(KEY) == ROUTE
+
+
+def test_batched_writes_are_committed_once_at_the_end(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    cache = RouteCache(path, max_entries=1, network_version="v1")
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    other = make_route_key((-40.3, -20.3), (4.4, 51.9), [])
+
+    with cache.batch():
+        cache.put(KEY, ROUTE)
+        cache.put(other, ROUTE)
+        # Evicted from memory, not yet on disk: still served
+        assert cache.get(KEY) == ROUTE
+        assert RouteCache(path, network_version="v1").get(KEY) is None
+
+    assert statements.count("COMMIT") == 1
+    assert RouteCache(path, network_version="v1").get(other) == ROUTE
+
+
+def test_a_routing_batch_writes_its_routes_in_one_transaction(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    scenarios = {"baseline": (BASELINE_RESTRICTIONS, ORIGINS)}
+    with offline_routing() as router:
+        route_calculator._ROUTE_CACHE = RouteCache(path, network_version="v1", memory_only_fields=("route_lods",))
+        statements = []
+        route_calculator._ROUTE_CACHE._conn.set_trace_callback(statements.append)
+        calculate_routes_batch(["Coffee", "Soybean"], scenarios, workers=0)
+        routed = router.routes
+
+    assert routed and statements.count("COMMIT") == 1
+    with offline_routing() as router:
+        route_calculator._ROUTE_CACHE = RouteCache(path, network_version="v1", memory_only_fields=("route_lods",))
+        stats = {}
+        calculate_routes_batch(["Coffee", "Soybean"], scenarios, workers=0, stats=stats)
+        assert router.routes == 0
+        assert stats["routes_cached"] == routed
@@ -0,0 +1,130 @@
+# tests/test_route_failures.py
+import threading
+import time
+
+import route_calculator as rc
+from benchmarks.synthetic import FakeRouter, offline_routing
+from config import BASELINE_RESTRICTIONS, ORIGINS, PRODUCTS
+from scenario_cache import ScenarioCache
+
+SCENARIOS = {"current": (BASELINE_RESTRICTIONS, ORIGINS)}
+
+
+class NoPathMatrix:
+    """Route matrix whose every cell is a pair with no sea path, as route_matrix builds them."""
+
+    def lookup(self, origin_coords, dest_coords, restrictions):
+        return {
+            "success": False,
+            "distance_nm": float('inf'),
+            "distance_km": float('inf'),
+            "route_coords": [],
+            "error": "No route found"
+        }
+
+
+class NoPathRouter(FakeRouter):
+    def __call__(self, origin_coords, dest_coords_list, restrictions):
+        super().__call__(origin_coords, dest_coords_list, restrictions)
+        return [rc._route_failure("No route found", rc.NO_PATH) for _ in dest_coords_list]
+
+
+def _route(**options):
+    failures = {}
+    out = rc.calculate_routes_batch(PRODUCTS[:1], SCENARIOS, workers=0, failures=failures, **options)
+    return out["current"][PRODUCTS[0]], failures["current"][PRODUCTS[0]]
+
+
+def test_matrix_failure_is_no_path():
+    with offline_routing() as router:
+        rc._ROUTE_MATRIX = NoPathMatrix()
+        routes, failures = _route()
+    assert router.calls == 0
+    assert failures and set(failures) == {rc.NO_PATH}
+    assert all(option.error_kind == rc.NO_PATH for lane in routes for option in lane.route_options)
+
+
+def test_negative_cache_hit_keeps_kind():
+    with offline_routing(NoPathRouter()) as router:
+        _, first = _route()
+        calls = router.calls
+        stats = {}
+        _, second = _route(stats=stats)
+    assert set(first) == {rc.NO_PATH}
+    assert second == first
+    assert router.calls == calls
+    assert stats["routes_unroutable"] == sum(first.values())
+
+
+def test_successful_routes_report_no_failures():
+    with offline_routing():
+        routes, failures = _route()
+    assert failures == {}
+    assert all(lane.success for lane in routes)
+
+
+def test_bad_input_is_classified_before_searching():
+    results = rc._search_missing([0, 0], [[1, 2], [float("nan"), 0]], ["atlantis"])
+    assert [r["error_kind"] for r in results] == [rc.BAD_INPUT, rc.BAD_INPUT]
+    results = rc._search_missing([0, 0], [[float("nan"), 0]], BASELINE_RESTRICTIONS)
+    assert results[0]["error_kind"] == rc.BAD_INPUT
+
+
+class OverlapProbe:
+    """Stands in for the searoute module and records how many searches ran at once."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def searoute(self, origin, destination, restrictions=None, return_passages=False):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return {"geometry": {"coordinates": []}}
+
+
+def test_searoute_calls_never_overlap(monkeypatch):
+    probe = OverlapProbe()
+    monkeypatch.setattr(rc, "sr", probe)
+    monkeypatch.setattr(rc, "ROUTING_ENGINE", "searoute")
+    # the first search is abandoned at its timeout and keeps running in the background
+    args = ([0, 0], [[1, 1]], ["suez"])
+    assert rc._search_bounded(args, 0.01)[0]["error_kind"] == rc.TIMEOUT
+    threads = [threading.Thread(target=rc._search_missing, args=args) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert probe.peak == 1
+
+
+def test_search_finishing_after_timeout_is_stored():
+    with offline_routing(FakeRouter(latency_s=0.2)):
+        args = (ORIGINS["Santos Port (São Paulo)"], [[10.0, 50.0]], BASELINE_RESTRICTIONS)
+        assert rc._search_bounded(args, 0.01)[0]["error_kind"] == rc.TIMEOUT
+        time.sleep(0.4)
+        result, source = rc._lookup_known_route(args[0], args[1][0], args[2])
+    assert source == "cached" and result["success"]
+
+
+def test_scenario_cache_budget_includes_lock_wait():
+    cache = ScenarioCache()
+    with offline_routing() as router:
+        # a computation already running (e.g. the prewarm) holds the lock past the budget
+        cache._compute_lock.acquire()
+        try:
+            failures = {}
+            started = time.monotonic()
+            cache.routes_batch(PRODUCTS[:1], SCENARIOS, failures=failures, workers=0, budget=0.2)
+            elapsed = time.monotonic() - started
+        finally:
+            cache._compute_lock.release()
+    assert elapsed < 1
+    assert router.calls == 0
+    assert set(failures["current"][PRODUCTS[0]]) == {rc.TIMEOUT}
+    assert cache.stats()["entries"] == 0
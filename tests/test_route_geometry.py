@@ -0,0 +1,59 @@
+# tests/test_route_geometry.py
+import numpy as np
+import pytest
+
+from route_geometry import build_lods, render_coords, select_lod_tolerance, simplify_coords
+
+TOLERANCES = [0.05, 0.15, 0.5]
+
+
+@pytest.mark.parametrize("scale, expected", [
+    (0.5, 0.5),     # 0.6 degrees per pixel
+    (1.0, 0.15),    # 0.3
+    (1.1, 0.15),    # 0.27, the dashboard's map
+    (5.0, 0.05),    # 0.06
+    (10.0, 0.0),    # 0.03: finer than every LOD, draw the full geometry
+    (0.0, 0.5)
+])
+def test_largest_tolerance_below_one_pixel(scale, expected):
+    assert select_lod_tolerance(scale, width_px=1200, tolerances=TOLERANCES) == expected
+
+
+def test_tolerance_never_grows_when_zooming_in():
+    chosen = [select_lod_tolerance(s, width_px=1200, tolerances=TOLERANCES) for s in np.linspace(0.1, 20, 200)]
+    assert all(a >= b for a, b in zip(chosen, chosen[1:]))
+    assert select_lod_tolerance(1.0, width_px=1200, tolerances=[]) == 0.0
+
+
+def _deviation(coords, simplified):
+    """Largest distance of an original vertex to the simplified polyline."""
+    points, line = np.asarray(coords), np.asarray(simplified)
+    worst = 0.0
+    for p in points:
+        a, b = line[:-1], line[1:]
+        ab = b - a
+        t = np.clip(((p - a) * ab).sum(axis=1) / np.maximum((ab ** 2).sum(axis=1), 1e-300), 0, 1)
+        worst = max(worst, np.hypot(*(a + t[:, None] * ab - p).T).min())
+    return worst
+
+
+def test_simplified_routes_stay_within_tolerance_and_keep_endpoints():
+    rng = np.random.default_rng(0)
+    coords = np.c_[np.linspace(-46, 121, 400), np.cumsum(rng.normal(0, 0.1, 400))].tolist()
+    lods = build_lods(coords, TOLERANCES + [0])
+
+    assert sorted(lods) == TOLERANCES
+    sizes = [len(lods[t]) for t in TOLERANCES]
+    assert sizes == sorted(sizes, reverse=True) and sizes[0] < len(coords)
+    for t, simplified in lods.items():
+        assert simplified[0] == coords[0] and simplified[-1] == coords[-1]
+        assert _deviation(coords, simplified) <= t + 1e-9
+
+
+def test_render_coords_falls_back_to_the_full_geometry():
+    coords = [[0.0, 0.0], [1.0, 0.01], [2.0, 0.0]]
+    route = {"route_coords": coords, "route_lods": build_lods(coords, TOLERANCES)}
+    assert render_coords(route, 0.15) == [[0.0, 0.0], [2.0, 0.0]]
+    assert render_coords(route, 0.0) is coords
+    assert render_coords({"route_coords": coords}, 0.15) is coords
+    assert simplify_coords(coords, 0) == coords
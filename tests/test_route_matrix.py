@@ -0,0 +1,70 @@
+# tests/test_route_matrix.py
+import numpy as np
+import pytest
+
+import route_calculator
+from route_matrix import FORMAT_VERSION, build_route_matrix, load_route_matrix, restriction_key
+
+ORIGINS = {"Santos": [-46.3, -24.0], "Itaqui": [-44.37, -2.57]}
+DESTINATIONS = {"Shanghai": [121.5, 31.2], "Rotterdam": [4.4, 51.9]}
+SETS = [[], ["suez", "panama"]]
+
+
+def fake_search(origin_coords, dest_coords, restrictions):
+    """A straight line crossing Suez to Shanghai; unroutable to Shanghai with Suez closed."""
+    if dest_coords == DESTINATIONS["Shanghai"] and "suez" in restrictions:
+        return {"success": False, "distance_km": float("inf"), "route_coords": [], "error": "No route found"}
+    km = 1000.0 * (1 + len(restrictions)) + origin_coords[1]
+    return {
+        "success": True, "distance_km": km, "distance_nm": km * 0.539957,
+        "route_coords": [list(origin_coords), [0.0, 0.0], list(dest_coords)],
+        "passages": ["suez"] if dest_coords == DESTINATIONS["Shanghai"] else [], "error": None
+    }
+
+
+@pytest.fixture
+def matrix_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(route_calculator, "_search_route", fake_search)
+    return build_route_matrix(SETS, str(tmp_path / "matrix.npz"), ORIGINS, DESTINATIONS)
+
+
+def test_lookups_match_the_searches_it_was_built_from(matrix_path):
+    matrix = load_route_matrix(matrix_path)
+    assert matrix.restriction_keys == sorted(restriction_key(s) for s in SETS)
+    for restrictions in SETS:
+        for org in ORIGINS.values():
+            for dest in DESTINATIONS.values():
+                expected = fake_search(org, dest, restrictions)
+                # Restriction order and tuple coordinates do not matter
+                found = matrix.lookup(tuple(org), tuple(dest), list(reversed(restrictions)))
+                assert found["success"] == expected["success"]
+                if expected["success"]:
+                    assert found["distance_km"] == expected["distance_km"]
+                    assert found["passages"] == expected["passages"]
+                    assert np.allclose(found["route_coords"], expected["route_coords"], atol=1e-5)
+                else:
+                    assert found["distance_km"] == float("inf") and found["route_coords"] == []
+
+
+def test_requests_outside_the_matrix_miss(matrix_path):
+    matrix = load_route_matrix(matrix_path)
+    assert matrix.lookup(ORIGINS["Santos"], DESTINATIONS["Rotterdam"], ["gibraltar"]) is None
+    assert matrix.lookup([-40.3, -20.3], DESTINATIONS["Rotterdam"], []) is None
+
+
+def test_cells_are_built_once(matrix_path):
+    matrix = load_route_matrix(matrix_path)
+    first = matrix.lookup(ORIGINS["Santos"], DESTINATIONS["Rotterdam"], [])
+    assert matrix.lookup(ORIGINS["Santos"], DESTINATIONS["Rotterdam"], []) is first
+
+
+def test_missing_files_and_other_format_versions_are_not_loaded(matrix_path, tmp_path):
+    assert load_route_matrix(str(tmp_path / "absent.npz")) is None
+
+    with np.load(matrix_path) as data:
+        arrays = {name: data[name] for name in data.files}
+    assert int(arrays["format_version"]) == FORMAT_VERSION
+    arrays["format_version"] = np.int64(FORMAT_VERSION - 1)
+    old = str(tmp_path / "old.npz")
+    np.savez_compressed(old, **arrays)
+    assert load_route_matrix(old) is None
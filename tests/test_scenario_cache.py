@@ -0,0 +1,57 @@
+# tests/test_scenario_cache.py
+import threading
+import time
+
+from benchmarks.synthetic import FakeRouter, offline_routing
+from config import BASELINE_RESTRICTIONS, ORIGINS, PRODUCTS
+from scenario_cache import ScenarioCache
+
+SCENARIOS = {"current": (BASELINE_RESTRICTIONS + ["suez"], ORIGINS), "baseline": (BASELINE_RESTRICTIONS, ORIGINS)}
+
+
+def test_second_batch_is_served_from_the_cache():
+    cache = ScenarioCache()
+    with offline_routing() as router:
+        first, second = {}, {}
+        cold = cache.routes_batch(PRODUCTS, SCENARIOS, stats=first, workers=0)
+        calls = router.calls
+        warm = cache.routes_batch(PRODUCTS, SCENARIOS, stats=second, workers=0)
+    assert first["routes_recomputed"] > 0 and first["scenario_cache_hits"] == 0
+    assert router.calls == calls
+    assert second == {"scenario_cache_hits": len(PRODUCTS) * len(SCENARIOS)}
+    assert all(warm[name][p] is cold[name][p] for name in SCENARIOS for p in PRODUCTS)
+
+
+def test_partial_hit_routes_only_missing_products():
+    cache = ScenarioCache()
+    with offline_routing():
+        cache.routes_batch(PRODUCTS[:1], SCENARIOS, workers=0)
+        stats = {}
+        cache.routes_batch(PRODUCTS[:2], SCENARIOS, stats=stats, workers=0)
+    assert stats["scenario_cache_hits"] == len(SCENARIOS)
+    assert cache.stats()["entries"] == 2 * len(SCENARIOS)
+
+
+class GatedRouter(FakeRouter):
+    """Signals its first search, then takes `latency_s` per pair like FakeRouter."""
+
+    def __init__(self, latency_s):
+        super().__init__(latency_s)
+        self.started = threading.Event()
+
+    def __call__(self, origin_coords, dest_coords_list, restrictions):
+        self.started.set()
+        return super().__call__(origin_coords, dest_coords_list, restrictions)
+
+
+def test_entries_computed_while_waiting_count_as_hits():
+    cache = ScenarioCache()
+    with offline_routing(GatedRouter(latency_s=0.02)) as router:
+        prewarm = threading.Thread(target=cache.routes_batch, args=(PRODUCTS, SCENARIOS), kwargs={"workers": 0})
+        prewarm.start()
+        assert router.started.wait(5)
+        stats = {}
+        cache.routes_batch(PRODUCTS, SCENARIOS, stats=stats, workers=0)
+        prewarm.join()
+    assert stats == {"scenario_cache_hits": len(PRODUCTS) * len(SCENARIOS)}
+    assert cache.stats()["hits"] == len(PRODUCTS) * len(SCENARIOS)
@@ -0,0 +1,40 @@
+# tests/test_sea_network.py
+import pytest
+
+sr = pytest.importorskip("searoute")
+pytest.importorskip("scipy")
+
+from config import BASELINE_RESTRICTIONS, DESTINATIONS, ORIGINS
+from sea_network import get_sea_network
+
+ORIGIN_NAMES = list(ORIGINS)[:3]
+DESTINATION_NAMES = list(DESTINATIONS)[:6]
+RESTRICTION_SETS = [
+    BASELINE_RESTRICTIONS,
+    BASELINE_RESTRICTIONS + ["suez"],
+    BASELINE_RESTRICTIONS + ["suez", "gibraltar", "panama"],
+]
+
+
+@pytest.mark.filterwarnings("ignore:No path found")
+@pytest.mark.parametrize("restrictions", RESTRICTION_SETS, ids=lambda r: ",".join(r[len(BASELINE_RESTRICTIONS):]) or "baseline")
+@pytest.mark.parametrize("origin", ORIGIN_NAMES)
+def test_route_many_matches_searoute(origin, restrictions):
+    dests = [DESTINATIONS[name] for name in DESTINATION_NAMES]
+    native = get_sea_network().route_many(ORIGINS[origin], dests, restrictions)
+    for dest, result in zip(dests, native):
+        expected = sr.searoute(ORIGINS[origin], dest, restrictions=restrictions, return_passages=True)
+        if not expected["geometry"]["coordinates"]:
+            assert not result["success"]
+            continue
+        assert result["success"]
+        assert result["distance_km"] == pytest.approx(expected["properties"]["length"], rel=1e-6)
+        assert result["passages"] == sorted(expected["properties"].get("traversed_passages", []))
+
+
+def test_closed_passage_is_avoided():
+    origin, dest = ORIGINS[ORIGIN_NAMES[0]], [DESTINATIONS["Oman (Sohar Port)"]]
+    shortest = get_sea_network().route_many(origin, dest, BASELINE_RESTRICTIONS)[0]
+    around = get_sea_network().route_many(origin, dest, BASELINE_RESTRICTIONS + ["suez"])[0]
+    assert "suez" not in around["passages"]
+    assert around["distance_km"] >= shortest["distance_km"]
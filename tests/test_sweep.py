@@ -0,0 +1,119 @@
+# tests/test_sweep.py
+import json
+
+import pandas as pd
+import pytest
+
+import sweep
+from benchmarks.synthetic import FakeRouter, offline_routing
+from config import BASELINE_RESTRICTIONS
+from sweep import BASELINE_LABEL, run_sweep, set_key, set_label
+
+
+class RecordingRouter(FakeRouter):
+    """FakeRouter that remembers the restriction set of every search."""
+
+    def __init__(self):
+        super().__init__()
+        self.restriction_sets = []
+
+    def __call__(self, origin_coords, dest_coords_list, restrictions):
+        self.restriction_sets.append(frozenset(restrictions))
+        return super().__call__(origin_coords, dest_coords_list, restrictions)
+
+
+@pytest.fixture(autouse=True)
+def routing():
+    with offline_routing(RecordingRouter()) as router:
+        yield router
+
+
+def test_baseline_only_sets_have_zero_deltas():
+    table = run_sweep([frozenset(), frozenset(BASELINE_RESTRICTIONS[:1]), frozenset(["suez"])], products=["Iron Ore"])
+    baseline = table.set_index("restrictions").loc[BASELINE_LABEL]
+    assert baseline[["volume_lost_kg", "co2_delta_kg", "lane_km_delta"]].tolist() == [0.0, 0.0, 0.0]
+    # a set of baseline passages is the baseline itself
+    assert set(table["restrictions"]) == {BASELINE_LABEL, "suez"}
+
+
+def test_sets_are_closed_on_top_of_the_baseline(routing):
+    run_sweep([frozenset(["suez"])], products=["Iron Ore"])
+    assert routing.restriction_sets
+    assert all(frozenset(BASELINE_RESTRICTIONS) <= s for s in routing.restriction_sets)
+
+
+def test_labels():
+    assert set_label([]) == set_label(BASELINE_RESTRICTIONS) == BASELINE_LABEL
+    assert set_label(BASELINE_RESTRICTIONS + ["suez", "panama"]) == "panama,suez"
+
+
+SETS = [frozenset(["suez"]), frozenset(["panama"]), frozenset(["suez", "panama"])]
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def evaluated(monkeypatch):
+    """Every restriction set evaluate_sets is asked for, in order."""
+    sets = []
+    evaluate_sets = sweep.evaluate_sets
+
+    def recording(restriction_sets, *args, **kwargs):
+        sets.extend(restriction_sets)
+        return evaluate_sets(restriction_sets, *args, **kwargs)
+
+    monkeypatch.setattr(sweep, "evaluate_sets", recording)
+    return sets
+
+
+def _interrupt_after(chunks):
+    def progress(done, total, elapsed_s):
+        if elapsed_s and done >= chunks:
+            raise Interrupted
+
+    return progress
+
+
+def test_an_interrupted_sweep_resumes_from_its_checkpoint(tmp_path, evaluated):
+    checkpoint = str(tmp_path / "sweep.jsonl")
+    with pytest.raises(Interrupted):
+        run_sweep(SETS, products=["Iron Ore"], checkpoint=checkpoint, chunk_size=1, progress=_interrupt_after(2))
+    first = list(evaluated)
+    assert len(first) == 2
+
+    evaluated.clear()
+    resumed = run_sweep(SETS, products=["Iron Ore"], checkpoint=checkpoint, chunk_size=1)
+
+    assert set(first).isdisjoint(evaluated) and len(first) + len(evaluated) == len(SETS) + 1
+    with open(checkpoint, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1 + len(SETS) + 1
+    fresh = run_sweep(SETS, products=["Iron Ore"])
+    pd.testing.assert_frame_equal(resumed, fresh)
+
+
+def test_a_cut_short_line_is_evaluated_again(tmp_path, evaluated):
+    checkpoint = str(tmp_path / "sweep.jsonl")
+    run_sweep(SETS, products=["Iron Ore"], checkpoint=checkpoint)
+    with open(checkpoint, encoding="utf-8") as f:
+        lines = f.readlines()
+    last = json.loads(lines[-1])["restrictions"]
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        f.writelines(lines[:-1] + [lines[-1][:10]])
+
+    evaluated.clear()
+    run_sweep(SETS, products=["Iron Ore"], checkpoint=checkpoint)
+    assert [set_key(s) for s in evaluated] == [last]
+
+
+@pytest.mark.parametrize("changed", [{"products": ["Iron Ore", "Coffee"]}, {"capacities": None}])
+def test_a_checkpoint_for_other_inputs_is_ignored(tmp_path, evaluated, changed):
+    checkpoint = str(tmp_path / "sweep.jsonl")
+    run_sweep(SETS, products=["Iron Ore"], checkpoint=checkpoint)
+
+    evaluated.clear()
+    run_sweep(SETS, **{"products": ["Iron Ore"], **changed}, checkpoint=checkpoint)
+    assert len(evaluated) == len(SETS) + 1
+    with open(checkpoint, encoding="utf-8") as f:
+        assert json.loads(f.readline())["products"] == changed.get("products", ["Iron Ore"])
@@ -0,0 +1,97 @@
+# tests/test_trade_data.py
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+from trade_data import TradeFlowStore
+
+FLOWS = pa.table({
+    "product": ["Soybean", "Soybean", "Soybean", "Coffee", "Coffee", "Beef"],
+    "origin": ["Santos"] * 6,
+    "destination": ["China", "China", "Vietnam", "Germany", "Germany", "UAE"],
+    "period": ["2024-01", "2024-02", "2024-01", "2024-01", "2024-02", "2024-02"],
+    "volume_kg": [10.0, 20.0, 5.0, 1.0, 2.0, 7.0],
+    "dest_lon": [121.5, 121.5, 106.7, 10.0, 10.0, 55.0],
+    "dest_lat": [31.2, 31.2, 10.8, 53.5, 53.5, 25.0]
+})
+
+
+class ScanSpy:
+    """Wraps a dataset and records what every to_table() call asked the scan for."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(self.dataset, name)
+
+    def to_table(self, columns=None, filter=None):
+        self.calls.append((columns, filter))
+        return self.dataset.to_table(columns=columns, filter=filter)
+
+
+@pytest.fixture(params=["table", "parquet", "csv"])
+def store(request, tmp_path):
+    if request.param == "table":
+        return TradeFlowStore(FLOWS)
+    path = str(tmp_path / f"flows.{request.param}")
+    if request.param == "parquet":
+        pq.write_table(FLOWS, path, row_group_size=2)
+    else:
+        pa_csv.write_csv(FLOWS, path)
+    return TradeFlowStore(path, cache_dir=str(tmp_path / "cache"))
+
+
+def test_product_and_period_filters_reach_the_scan(store):
+    store._dataset = spy = ScanSpy(store._open_source())
+
+    table = store.scan(products=["Soybean"], periods=["2024-01"], columns=["destination", "volume_kg", "absent"])
+
+    assert table.column_names == ["destination", "volume_kg"]
+    assert sorted(zip(table["destination"].cast(pa.string()).to_pylist(), table["volume_kg"].to_pylist())) == [
+        ("China", 10.0), ("Vietnam", 5.0)
+    ]
+    (columns, expression), = spy.calls
+    assert columns == ["destination", "volume_kg"]
+    assert "product" in str(expression) and "period" in str(expression)
+
+
+def test_destination_volumes_sum_periods_and_are_memoized(store):
+    volumes = store.destination_volumes("Soybean")
+    assert volumes == {"China": 30.0, "Vietnam": 5.0}
+    assert store.destination_volumes("Soybean") is volumes
+    assert store.destination_volumes("Soybean", periods=["2024-02"]) == {"China": 20.0}
+    assert store.destination_volumes("Crude Oil") == {}
+
+
+def test_distinct_values_and_coordinates(store):
+    assert store.products() == ["Beef", "Coffee", "Soybean"]
+    assert store.periods() == ["2024-01", "2024-02"]
+    assert store.destination_coords("Vietnam") == [106.7, 10.8]
+    assert store.destination_coords("Atlantis") is None
+
+
+def test_csv_is_parsed_once_into_the_ipc_cache(tmp_path):
+    path = str(tmp_path / "flows.csv")
+    pa_csv.write_csv(FLOWS, path)
+    cache_dir = str(tmp_path / "cache")
+    TradeFlowStore(path, cache_dir=cache_dir).scan()
+    (cached,) = os.listdir(cache_dir)
+    stamp = os.stat(os.path.join(cache_dir, cached)).st_mtime_ns
+
+    assert TradeFlowStore(path, cache_dir=cache_dir).destination_volumes("Beef") == {"UAE": 7.0}
+    assert os.listdir(cache_dir) == [cached]
+    assert os.stat(os.path.join(cache_dir, cached)).st_mtime_ns == stamp
+
+
+def test_period_filter_needs_a_period_column():
+    store = TradeFlowStore(FLOWS.drop(["period"]))
+    assert store.periods() == []
+    with pytest.raises(ValueError):
+        store.scan(periods=["2024-01"])
+    with pytest.raises(ValueError):
+        TradeFlowStore(FLOWS.drop(["volume_kg"])).scan()
@@ -0,0 +1,222 @@
+# trade_data.py
+"""
+Columnar trade-flow store.
+
+Export flows are rows of (product, origin, destination, period, volume_kg), with
+optional dest_lon / dest_lat for destinations not listed in config.DESTINATIONS.
+Sources can be CSV or Parquet files, a directory of Parquet files or an in-memory
+pyarrow Table; without a source the store serves config.EXPORT_VOLUMES as a small
+built-in dataset.
+
+Nothing is read until the first query. Product, origin, destination and period are
+dictionary-encoded (categorical codes), so millions of rows stay compact. Product and
+period filters are pushed down to the scan, which lets Parquet skip whole row groups.
+CSV sources are parsed once into an uncompressed Arrow IPC file under TRADE_CACHE_DIR
+and memory-mapped on later runs.
+"""
+import hashlib
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.fs as pa_fs
+
+from config import EXPORT_VOLUMES, DESTINATIONS, TRADE_DATA_PATH, TRADE_CACHE_DIR
+
+CATEGORY_COLUMNS = ["product", "origin", "destination", "period"]
+REQUIRED_COLUMNS = ["product", "destination", "volume_kg"]
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+COLUMN_TYPES = {
+    "product": _CATEGORY,
+    "origin": _CATEGORY,
+    "destination": _CATEGORY,
+    "period": _CATEGORY,
+    "volume_kg": pa.float64(),
+    "dest_lon": pa.float64(),
+    "dest_lat": pa.float64()
+}
+
+
+def _check_columns(names):
+    missing = [c for c in REQUIRED_COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"Trade data is missing columns: {', '.join(missing)}")
+
+
+def _typed(table):
+    """Cast the known columns present in `table` to their store types."""
+    for name, col_type in COLUMN_TYPES.items():
+        if name in table.column_names and table.schema.field(name).type != col_type:
+            column = table[name]
+            if col_type == _CATEGORY:
+                column = pc.cast(column, pa.string()).dictionary_encode()
+            else:
+                column = pc.cast(column, col_type)
+            table = table.set_column(table.schema.get_field_index(name), name, column)
+    return table
+
+
+def volumes_table(volumes=EXPORT_VOLUMES):
+    """The nested {product: {destination: kg}} dict as a flow table (one row per lane)."""
+    # Destinations in config order, so lanes come out in the order the dashboard lists them
+    order = {name: i for i, name in enumerate(DESTINATIONS)}
+    rows = [
+        (product, dest, float(kg))
+        for product, by_dest in volumes.items()
+        for dest, kg in sorted(by_dest.items(), key=lambda item: order.get(item[0], len(order)))
+    ]
+    return _typed(pa.table({
+        "product": [r[0] for r in rows],
+        "destination": [r[1] for r in rows],
+        "volume_kg": [r[2] for r in rows]
+    }))
+
+
+class TradeFlowStore:
+    def __init__(self, source=None, cache_dir=TRADE_CACHE_DIR):
+        self.source = source
+        self.cache_dir = cache_dir
+        self._dataset = None
+        self._volumes = {}
+        self._coords = None
+        self._lock = threading.Lock()
+
+    # --- LOADING ---
+    def _open(self):
+        with self._lock:
+            if self._dataset is None:
+                dataset = self._open_source()
+                _check_columns(dataset.schema.names)
+                self._dataset = dataset
+            return self._dataset
+
+    def _open_source(self):
+        if self.source is None:
+            return ds.dataset(volumes_table())
+        if isinstance(self.source, pa.Table):
+            return ds.dataset(_typed(self.source))
+
+        path = os.fspath(self.source)
+        mmap_fs = pa_fs.LocalFileSystem(use_mmap=True)
+        if path.lower().endswith(".csv"):
+            return ds.dataset(self._ipc_cache_for(path), format="ipc", filesystem=mmap_fs)
+        return ds.dataset(path, format="parquet", filesystem=mmap_fs)
+
+    def _ipc_cache_for(self, csv_path):
+        """Parse a CSV once into a typed Arrow IPC file; reused until the CSV changes."""
+        stat = os.stat(csv_path)
+        tag = f"{os.path.abspath(csv_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        cache_path = os.path.join(self.cache_dir, hashlib.sha1(tag.encode()).hexdigest()[:16] + ".arrow")
+        if os.path.exists(cache_path):
+            return cache_path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        table = pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in CATEGORY_COLUMNS}
+        ))
+        _check_columns(table.column_names)
+        # Sorted by product and period, so filtered scans touch contiguous pages of the map
+        sort_keys = [(c, "ascending") for c in ("product", "period") if c in table.column_names]
+        table = _typed(table.sort_by(sort_keys))
+        tmp_path = cache_path + ".tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, cache_path)
+        return cache_path
+
+    # --- QUERIES ---
+    def scan(self, products=None, periods=None, columns=None):
+        """Flows for the given products and periods (None = all), as a pyarrow Table."""
+        dataset = self._open()
+        filters = []
+        if products is not None:
+            filters.append(pc.field("product").isin(list(products)))
+        if periods is not None:
+            if "period" not in dataset.schema.names:
+                raise ValueError("Trade data has no period column")
+            filters.append(pc.field("period").isin([str(p) for p in periods]))
+
+        expression = None
+        for f in filters:
+            expression = f if expression is None else expression & f
+        if columns is not None:
+            columns = [c for c in columns if c in dataset.schema.names]
+        return _typed(dataset.to_table(columns=columns, filter=expression))
+
+    def products(self):
+        return self._distinct("product")
+
+    def periods(self):
+        return self._distinct("period") if "period" in self._open().schema.names else []
+
+    def _distinct(self, column):
+        values = pc.unique(pc.cast(self.scan(columns=[column])[column], pa.string()))
+        return sorted(v for v in values.to_pylist() if v is not None)
+
+    def destination_volumes(self, product, periods=None):
+        """{destination: total volume_kg} for one product, in first-seen order. Memoized."""
+        key = (product, tuple(sorted(str(p) for p in periods)) if periods is not None else None)
+        with self._lock:
+            cached = self._volumes.get(key)
+        if cached is not None:
+            return cached
+
+        table = self.scan(products=[product], periods=periods, columns=["destination", "volume_kg"])
+        totals = table.group_by("destination", use_threads=False).aggregate([("volume_kg", "sum")])
+        volumes = dict(zip(
+            pc.cast(totals["destination"], pa.string()).to_pylist(),
+            totals["volume_kg_sum"].to_pylist()
+        ))
+        with self._lock:
+            self._volumes[key] = volumes
+        return volumes
+
+    def destination_coords(self, dest_name):
+        """[lon, lat] of a destination: config.DESTINATIONS first, then the data's own dest_lon/dest_lat."""
+        if dest_name in DESTINATIONS:
+            return DESTINATIONS[dest_name]
+        if self._coords is None:
+            self._coords = self._load_coords()
+        return self._coords.get(dest_name)
+
+    def _load_coords(self):
+        if not {"dest_lon", "dest_lat"} <= set(self._open().schema.names):
+            return {}
+        table = self.scan(columns=["destination", "dest_lon", "dest_lat"])
+        first = table.group_by("destination", use_threads=False).aggregate([
+            ("dest_lon", "first"), ("dest_lat", "first")
+        ])
+        return {
+            name: [lon, lat]
+            for name, lon, lat in zip(
+                pc.cast(first["destination"], pa.string()).to_pylist(),
+                first["dest_lon_first"].to_pylist(),
+                first["dest_lat_first"].to_pylist()
+            )
+            if lon is not None and lat is not None
+        }
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_trade_store():
+    """Process-wide store for TRADE_DATA_PATH (the built-in dataset when unset)."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = TradeFlowStore(TRADE_DATA_PATH)
+        return _STORE
+
+
+def set_trade_store(store):
+    """Swap the process-wide store (e.g. to load a different file); returns the previous one."""
+    global _STORE
+    with _STORE_LOCK:
+        previous, _STORE = _STORE, store
+        return previous
@@ -0,0 +1,161 @@
+# uncertainty.py
+"""
+Monte Carlo uncertainty on emissions.
+
+Every lane's CO2 (emissions.build_emissions_frame) is its point estimate times sampled
+multipliers with mean 1:
+
+    emission factor   one draw per product and sample   CO2_FACTOR_UNCERTAINTY
+    load factor       one draw per product and sample   LOAD_FACTOR_UNCERTAINTY
+    detour            one draw per lane and sample      DETOUR_UNCERTAINTY (0 = off)
+
+Multipliers are lognormal with the configured coefficient of variation. All samples are
+evaluated against the lane table at once as a (samples x lanes) array, in lane chunks of
+at most _CHUNK_CELLS cells; product and scenario totals are a matrix product with the
+lane-to-product indicator. Without detours, lanes of a product share one draw and the
+work shrinks to a (samples x products) array.
+
+Product draws depend only on the seed and config.PRODUCTS, so scenarios simulated with
+the same seed share them and their differences are meaningful.
+
+    python uncertainty.py --scenario "THE GREAT CANAL COLLAPSE" --samples 20000 --out lanes.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    PRODUCTS, CO2_FACTOR_UNCERTAINTY, DEFAULT_CO2_FACTOR_UNCERTAINTY, LOAD_FACTOR_UNCERTAINTY,
+    DETOUR_UNCERTAINTY, UNCERTAINTY_SAMPLES, UNCERTAINTY_PERCENTILES, UNCERTAINTY_SEED, SCENARIO_RESTRICTIONS
+)
+
+# Bounds the (samples x lanes) working array: 4M float64 cells is 32 MB
+_CHUNK_CELLS = 4_000_000
+
+
+# --- SAMPLING ---
+def _lognormal(rng, cv, size):
+    """Mean-1 lognormal draws with coefficient of variation `cv` (broadcast over the last axis)."""
+    sigma = np.sqrt(np.log1p(np.square(cv)))
+    return np.exp(rng.standard_normal(size) * sigma - sigma ** 2 / 2)
+
+
+def sample_product_multipliers(samples, products=PRODUCTS, seed=UNCERTAINTY_SEED, load_cv=LOAD_FACTOR_UNCERTAINTY):
+    """(samples x products) emission-factor times load-factor multipliers."""
+    rng = np.random.default_rng(seed)
+    factor_cv = np.array([CO2_FACTOR_UNCERTAINTY.get(p, DEFAULT_CO2_FACTOR_UNCERTAINTY) for p in products])
+    multipliers = _lognormal(rng, factor_cv, (samples, len(products)))
+    if load_cv > 0:
+        multipliers *= _lognormal(rng, load_cv, (samples, len(products)))
+    return multipliers
+
+
+def _labels(percentiles):
+    return [f"p{q:g}" for q in percentiles]
+
+
+# --- SIMULATION ---
+def simulate(frame, samples=UNCERTAINTY_SAMPLES, seed=UNCERTAINTY_SEED, percentiles=UNCERTAINTY_PERCENTILES,
+             load_cv=LOAD_FACTOR_UNCERTAINTY, detour_cv=DETOUR_UNCERTAINTY):
+    """
+    CO2 percentiles for an emissions frame, per lane, per product and in total.
+
+    Returns {"lanes": frame, "products": frame, "total": {"co2_kg": ..., "p5": ...},
+    "totals": the (samples,) array of sampled totals}.
+    """
+    products = list(PRODUCTS) + sorted(set(frame["product"].astype(object)) - set(PRODUCTS))
+    codes = pd.Categorical(frame["product"].astype(object), categories=products).codes
+    base = frame["co2_kg"].to_numpy(dtype=float)
+    labels = _labels(percentiles)
+
+    product_multipliers = sample_product_multipliers(samples, products, seed, load_cv)
+    indicator = np.eye(len(products))[codes]
+    detour_rng = np.random.default_rng([seed, 1])
+
+    if detour_cv > 0:
+        lane_bands = np.empty((len(percentiles), len(base)))
+        product_totals = np.zeros((samples, len(products)))
+        chunk = max(1, _CHUNK_CELLS // max(samples, 1))
+        for start in range(0, len(base), chunk):
+            lanes = slice(start, start + chunk)
+            # (samples x lanes): each lane's point estimate under every sampled multiplier
+            co2 = product_multipliers[:, codes[lanes]] * base[lanes]
+            co2 *= _lognormal(detour_rng, detour_cv, co2.shape)
+            lane_bands[:, lanes] = np.percentile(co2, percentiles, axis=0)
+            product_totals += co2 @ indicator[lanes]
+    else:
+        # Without a per-lane draw all lanes of a product move with the same multiplier:
+        # lane percentiles are the product's multiplier percentiles times the point
+        # estimate, and totals only need the (samples x products) array
+        lane_bands = np.percentile(product_multipliers, percentiles, axis=0)[:, codes] * base
+        product_totals = product_multipliers * (base @ indicator)
+
+    totals = product_totals.sum(axis=1)
+
+    lane_table = frame[["product", "origin", "destination", "co2_kg"]].reset_index(drop=True)
+    lane_table[labels] = lane_bands.T
+
+    served = np.unique(codes)
+    product_table = pd.DataFrame(
+        np.percentile(product_totals[:, served], percentiles, axis=0).T,
+        index=pd.Index([products[i] for i in served], name="product"), columns=labels
+    )
+    product_table.insert(0, "co2_kg", indicator[:, served].T @ base)
+
+    total = {"co2_kg": float(base.sum())}
+    total.update(zip(labels, (float(v) for v in np.percentile(totals, percentiles))))
+    return {"lanes": lane_table, "products": product_table, "total": total, "totals": totals}
+
+
+def simulate_scenario(result, samples=UNCERTAINTY_SAMPLES, seed=UNCERTAINTY_SEED, percentiles=UNCERTAINTY_PERCENTILES,
+                      **spreads):
+    """
+    simulate() for the current and baseline frames of a run_scenario result, with the
+    same product draws, plus percentiles of the CO2 difference (kg) and its percent.
+    """
+    current = simulate(result["frames"]["current"], samples, seed, percentiles, **spreads)
+    baseline = simulate(result["frames"]["baseline"], samples, seed, percentiles, **spreads)
+
+    diff = current["totals"] - baseline["totals"]
+    percent = np.divide(diff * 100, baseline["totals"], out=np.zeros_like(diff), where=baseline["totals"] > 0)
+    labels = _labels(percentiles)
+    return {
+        "current": current,
+        "baseline": baseline,
+        "co2_diff_kg": dict(zip(labels, (float(v) for v in np.percentile(diff, percentiles)))),
+        "co2_percent": dict(zip(labels, (float(v) for v in np.percentile(percent, percentiles))))
+    }
+
+
+def main(argv=None):
+    from scenarios import run_scenario
+
+    parser = argparse.ArgumentParser(description="CO2 confidence bands for a scenario.")
+    parser.add_argument("--scenario", choices=list(SCENARIO_RESTRICTIONS), default=None,
+                        help="built-in scenario; defaults to the baseline")
+    parser.add_argument("--samples", type=int, default=UNCERTAINTY_SAMPLES)
+    parser.add_argument("--seed", type=int, default=UNCERTAINTY_SEED)
+    parser.add_argument("--detour", type=float, default=DETOUR_UNCERTAINTY, help="per-lane detour spread (cv)")
+    parser.add_argument("--out", default=None, help="per-lane percentiles (.csv)")
+    args = parser.parse_args(argv)
+
+    result = run_scenario(args.scenario)
+    start = time.perf_counter()
+    bands = simulate_scenario(result, args.samples, args.seed, detour_cv=args.detour)
+    elapsed = time.perf_counter() - start
+
+    current = bands["current"]
+    print(current["products"].div(1e9).round(3).to_string())
+    total = current["total"]
+    print(f"{result['scenario']}: CO2 {total['co2_kg'] / 1e9:,.2f} M t, "
+          + ", ".join(f"{k} {v / 1e9:,.2f}" for k, v in total.items() if k != "co2_kg")
+          + " | vs baseline " + ", ".join(f"{k} {v:+.2f}%" for k, v in bands["co2_percent"].items())
+          + f" ({args.samples:,} samples x {len(current['lanes'])} lanes in {elapsed * 1000:,.0f} ms)")
+    if args.out:
+        current["lanes"].to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
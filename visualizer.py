@@ -3,9 +3,12 @@ import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 import pandas as pd
-from config import ORIGINS, MAP_STYLES, PRODUCT_COLORS, CO2_FACTORS, PRODUCT_VESSEL_MAPPING
+from config import ORIGINS, MAP_STYLES, PRODUCT_COLORS, CO2_FACTORS, PRODUCT_VESSEL_MAPPING, MAP_PROJECTION_SCALE
+from route_geometry import select_lod_tolerance, render_coords
+import perf
 
 
+@perf.timed("figure.factor_chart")
 def create_emissions_factor_chart():
     """
     Creates a horizontal bar chart comparing the carbon intensity
@@ -59,7 +62,81 @@ def create_emissions_factor_chart():
     return fig
 
 
-def create_route_map(route_results, map_style="Dark", show_all_routes=False, show_animation=False):
+@perf.timed("figure.route_map")
+def create_route_map(route_results, map_style="Dark", show_all_routes=False, show_animation=False, batched=True):
+    """
+    World map of the selected lanes.
+    batched=True draws one line trace per product (NaN-separated segments), one marker
+    trace for all destinations and one for all origins, instead of 2 traces per lane.
+    Lines use the route's level of detail that stays sub-pixel at the map's projection scale.
+    """
+    tolerance = select_lod_tolerance(MAP_PROJECTION_SCALE)
+    if batched:
+        fig = go.Figure(_batched_route_traces(route_results, tolerance))
+    else:
+        fig = _per_lane_route_figure(route_results, tolerance)
+
+    _style_route_map(fig)
+    return fig
+
+
+def _batched_route_traces(route_results, tolerance=0.0):
+    lanes = [
+        item for item in route_results
+        if item.get('volume_kg', 0) > 0 and len(item.get('route_coords', [])) > 0
+    ]
+    traces = []
+
+    # 1. ROUTES: one trace per product, lanes separated by NaN breaks
+    by_product = {}
+    for item in lanes:
+        by_product.setdefault(item.get('product_group', item.get('product', 'Unknown')), []).append(item)
+
+    for product_name, items in by_product.items():
+        arrays = [np.asarray(render_coords(item, tolerance), dtype=float) for item in items]
+        sizes = np.array([len(a) + 1 for a in arrays])
+        coords = np.vstack([np.vstack([a, [np.nan, np.nan]]) for a in arrays])
+        dest_names = np.repeat(np.array([item['dest_name'] for item in items], dtype=object), sizes)
+
+        traces.append(go.Scattergeo(
+            lon=coords[:, 0], lat=coords[:, 1],
+            mode='lines',
+            line=dict(width=1.5, color=PRODUCT_COLORS.get(product_name, '#FFFFFF')),
+            name=product_name, legendgroup=product_name, showlegend=True,
+            customdata=dest_names,
+            hovertemplate=f"<b>Route:</b> {product_name}<br><b>To:</b> %{{customdata}}<extra></extra>",
+            opacity=0.7
+        ))
+
+    # 2. DESTINATIONS: one marker trace, colored per lane
+    if lanes:
+        traces.append(go.Scattergeo(
+            lon=[item['dest_coords'][0] for item in lanes],
+            lat=[item['dest_coords'][1] for item in lanes],
+            mode='markers',
+            marker=dict(
+                size=4, symbol='square',
+                color=[PRODUCT_COLORS.get(item.get('product_group', item.get('product', 'Unknown')), '#FFFFFF') for item in lanes]
+            ),
+            customdata=[[item['dest_name'], item['volume_tons']] for item in lanes],
+            hovertemplate="<b>Destination:</b> %{customdata[0]}<br><b>Volume:</b> %{customdata[1]:,.0f} tons<extra></extra>",
+            showlegend=False
+        ))
+
+    # 3. ORIGINS: one marker trace
+    traces.append(go.Scattergeo(
+        lon=[coords[0] for coords in ORIGINS.values()],
+        lat=[coords[1] for coords in ORIGINS.values()],
+        mode='markers',
+        marker=dict(size=6, color='white', symbol='circle-dot'),
+        name="Origin Hub", showlegend=True, legendgroup="Origins",
+        customdata=list(ORIGINS.keys()),
+        hovertemplate="<b>Origin Hub:</b> %{customdata}<extra></extra>"
+    ))
+    return traces
+
+
+def _per_lane_route_figure(route_results, tolerance=0.0):
     fig = go.Figure()
     legend_products_seen = set()
 
@@ -67,9 +144,9 @@ def create_route_map(route_results, map_style="Dark", show_all_routes=False, sho
     for item in route_results:
         if item.get('volume_kg', 0) > 0:
             route_coords = item.get('route_coords', [])
-            if not route_coords: continue
+            if len(route_coords) == 0: continue
 
-            route_array = np.array(route_coords)
+            route_array = np.array(render_coords(item, tolerance))
             product_name = item.get('product_group', item.get('product', 'Unknown'))
             line_color = PRODUCT_COLORS.get(product_name, '#FFFFFF')
 
@@ -107,7 +184,10 @@ def create_route_map(route_results, map_style="Dark", show_all_routes=False, sho
         ))
         added_origin_legend = True
 
-    # 3. LAYOUT
+    return fig
+
+
+def _style_route_map(fig):
     fig.update_layout(
         margin={"r": 0, "t": 0, "l": 0, "b": 0},
         height=550,
@@ -121,7 +201,7 @@ def create_route_map(route_results, map_style="Dark", show_all_routes=False, sho
             oceancolor='#0f172a',
             coastlinewidth=0.5,
             center={"lat": 10, "lon": 10},
-            projection_scale=1.1,
+            projection_scale=MAP_PROJECTION_SCALE,
             bgcolor='#0f172a'
         ),
         showlegend=True,
@@ -130,35 +210,43 @@ def create_route_map(route_results, map_style="Dark", show_all_routes=False, sho
             bgcolor="rgba(0,0,0,0.5)", font=dict(color="white", size=10)
         )
     )
-    return fig
 
 
+def _chart_frame(chart_data):
+    """Emission records (list of dicts or DataFrame) as a DataFrame with short destination names and colors."""
+    df = pd.DataFrame(chart_data)
+    df['ShortDest'] = df['Destination'].str.split('(').str[0]
+    groups = df['product_group'] if 'product_group' in df.columns else pd.Series('Unknown', index=df.index)
+    df['Color'] = groups.map(PRODUCT_COLORS).fillna('#3b82f6')
+    return df
+
+
+@perf.timed("figure.sankey")
 def create_sankey_diagram(chart_data):
-    if not chart_data: return None
-    origins = list(set([d['Origin'] for d in chart_data]))
-    destinations = list(set([d['Destination'].split('(')[0] for d in chart_data]))
-    all_nodes = origins + destinations
-    node_map = {name: i for i, name in enumerate(all_nodes)}
-    sources, targets, values, colors = [], [], [], []
-    for d in chart_data:
-        sources.append(node_map[d['Origin']])
-        targets.append(node_map[d['Destination'].split('(')[0]])
-        values.append(d['Export Volume (tons)'])
-        colors.append(PRODUCT_COLORS.get(d.get('product_group', 'Unknown'), '#3b82f6'))
+    if chart_data is None or len(chart_data) == 0: return None
+    df = _chart_frame(chart_data)
+    origin_codes, origins = pd.factorize(df['Origin'])
+    dest_codes, destinations = pd.factorize(df['ShortDest'])
+    all_nodes = list(origins) + list(destinations)
 
     fig = go.Figure(data=[go.Sankey(
         node=dict(pad=15, thickness=15, line=dict(color="black", width=0.5), label=all_nodes, color="#94a3b8"),
-        link=dict(source=sources, target=targets, value=values, color=colors)
+        link=dict(
+            source=origin_codes,
+            target=dest_codes + len(origins),
+            value=df['Export Volume (tons)'].to_numpy(),
+            color=df['Color'].to_numpy()
+        )
     )])
     fig.update_layout(font=dict(size=10, color="#94a3b8"), height=350, paper_bgcolor='rgba(0,0,0,0)',
                       margin=dict(l=10, r=10, t=20, b=10))
     return fig
 
 
+@perf.timed("figure.heatmap")
 def create_heatmap(chart_data):
-    if not chart_data: return None
-    df = pd.DataFrame(chart_data)
-    df['ShortDest'] = df['Destination'].apply(lambda x: x.split('(')[0])
+    if chart_data is None or len(chart_data) == 0: return None
+    df = _chart_frame(chart_data)
     df['Intensity'] = df['CO₂ Emissions (tons)'] / df['Export Volume (tons)']
     if 'product_group' in df.columns:
         pivot = df.pivot_table(index='ShortDest', columns='product_group', values='Intensity', fill_value=0)
@@ -170,23 +258,26 @@ def create_heatmap(chart_data):
     return fig
 
 
+@perf.timed("figure.bubble_radar")
 def create_bubble_radar(chart_data):
-    if not chart_data: return None
-    fig = go.Figure()
-    for d in chart_data:
-        color = PRODUCT_COLORS.get(d.get('product_group', 'Unknown'), '#3b82f6')
-        fig.add_trace(go.Scatter(
-            x=[d['Distance (NM)']], y=[d['Export Volume (tons)']],
-            mode='markers',
-            marker=dict(size=d['CO₂ Emissions (tons)'] / max(x['CO₂ Emissions (tons)'] for x in chart_data) * 40 + 5,
-                        color=color, opacity=0.7, line=dict(width=0.5, color='white')),
-            name=d['Destination'].split('(')[0],
-            hovertemplate=f"<b>{d['Destination']}</b><br>Vol: {d['Export Volume (tons)']:,.0f}t<br>CO2: {d['CO₂ Emissions (tons)']:,.0f}t<extra></extra>"
-        ))
+    """One scatter trace for every lane: sizes, colors and hover text are arrays, scaled once."""
+    if chart_data is None or len(chart_data) == 0: return None
+    df = _chart_frame(chart_data)
+    co2 = df['CO₂ Emissions (tons)'].to_numpy(dtype=float)
+    max_co2 = co2.max()
+    sizes = (co2 / max_co2 if max_co2 > 0 else np.zeros_like(co2)) * 40 + 5
+
+    fig = go.Figure(go.Scatter(
+        x=df['Distance (NM)'], y=df['Export Volume (tons)'],
+        mode='markers',
+        marker=dict(size=sizes, color=df['Color'], opacity=0.7, line=dict(width=0.5, color='white')),
+        customdata=np.column_stack([df['Destination'].to_numpy(dtype=object), df['Export Volume (tons)'], co2]),
+        hovertemplate="<b>%{customdata[0]}</b><br>Vol: %{customdata[1]:,.0f}t<br>CO2: %{customdata[2]:,.0f}t<extra></extra>"
+    ))
     fig.update_layout(
         xaxis=dict(title="DISTANCE (NM)", gridcolor='#334155', tickfont=dict(size=10)),
         yaxis=dict(title="VOLUME (TONS)", gridcolor='#334155', tickfont=dict(size=10)),
         paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color="#94a3b8", size=10),
         height=350, showlegend=False, margin=dict(l=10, r=10, t=20, b=10)
     )
-    return fig
\ No newline at end of file
+    return fig